@@ -0,0 +1,446 @@
+"""
+Benchmark suite for the WALS data loaders
+Measures load time, memory footprint and per-call latency of every public
+WALSDataLoader and WALSStreamlitLoader method against a CLDF dataset
+
+Usage:
+    python benchmarks/bench_loaders.py --output bench.json
+    python benchmarks/bench_loaders.py --compare bench.json   # fail on regressions
+
+Case names are stable across commits, so two result files can be compared
+directly (see --compare).
+"""
+import argparse
+import gc
+import hashlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / 'wals_app'))
+sys.path.insert(0, str(REPO_ROOT / 'streamlit_app'))
+
+import cache
+from data_loader import WALSDataLoader
+
+try:
+    import streamlit as st
+    import streamlit.logger
+    import streamlit_data_loader
+    from streamlit_data_loader import WALSStreamlitLoader
+    # Caching outside `streamlit run` logs a warning per call
+    streamlit.logger.set_log_level('error')
+except ImportError:  # streamlit is only needed for the Streamlit app
+    st = None
+    WALSStreamlitLoader = None
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_fingerprint(cldf_path):
+    """Hash of file names and sizes, so results from different datasets are not compared"""
+    digest = hashlib.sha1()
+    for path in sorted(Path(cldf_path).glob('*.csv')):
+        digest.update(f'{path.name}:{path.stat().st_size};'.encode())
+    return digest.hexdigest()[:12]
+
+
+def time_call(func, min_time=0.05, repeat=5):
+    """Time a callable timeit-style; returns per-call seconds for each round"""
+    func()  # warm-up (also triggers lazy loading)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / (repeat * 10) else 2
+
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return rounds, number
+
+
+def _result_size(result):
+    if isinstance(result, dict) and 'items' in result:
+        return len(result['items'])
+    if isinstance(result, (list, tuple, set, dict)):
+        return len(result)
+    return None
+
+
+def _clear_streamlit_caches():
+    if st is not None:
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+
+def _cold(reset, func):
+    """Wrap a cached call so every run rebuilds it: ``reset()`` drops the in-memory
+    copy and the disk cache is disabled for the duration of the call"""
+    def call():
+        reset()
+        saved, cache.CACHE_DIR = cache.CACHE_DIR, ''
+        try:
+            return func()
+        finally:
+            cache.CACHE_DIR = saved
+    return call
+
+
+def _forget(loader, *attributes, containers=()):
+    """reset callable for _cold: sets cached WALSDataLoader attributes to None and
+    empties the per-key caches named in ``containers``"""
+    def reset():
+        for attribute in attributes:
+            setattr(loader, attribute, None)
+        for attribute in containers:
+            getattr(loader, attribute).clear()
+    return reset
+
+
+def _make_loader(kind, cldf_path):
+    if kind == 'wals':
+        return WALSDataLoader(cldf_path=cldf_path)
+    loader = WALSStreamlitLoader(cldf_path=cldf_path)
+    loader.get_statistics()  # force the lazy load
+    return loader
+
+
+def measure_load(kind, cldf_path, repeat):
+    """Cold load time (caches cleared) and retained/peak memory of one loader"""
+    timings = []
+    for _ in range(repeat):
+        _clear_streamlit_caches()
+        gc.collect()
+        start = time.perf_counter()
+        _make_loader(kind, cldf_path)
+        timings.append(time.perf_counter() - start)
+
+    _clear_streamlit_caches()
+    gc.collect()
+    tracemalloc.start()
+    loader = _make_loader(kind, cldf_path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return loader, {
+        'load_seconds_min': min(timings),
+        'load_seconds_median': statistics.median(timings),
+        'memory_retained_bytes': current,
+        'memory_peak_bytes': peak,
+    }
+
+
+def _pick_parameters(loader):
+    """Choose representative, data-dependent arguments for the call cases"""
+    languages = loader.get_languages(per_page=10 ** 9)['items'] if hasattr(loader, 'get_languages') \
+        else list(loader.get_all_languages())
+    features = loader.get_features(per_page=10 ** 9)['items'] if hasattr(loader, 'get_features') \
+        else list(loader.get_all_features())
+
+    def most_common(key):
+        counts = {}
+        for lang in languages:
+            value = lang.get(key, '')
+            if value:
+                counts[value] = counts.get(value, 0) + 1
+        return max(counts, key=counts.get) if counts else ''
+
+    values = getattr(loader, '_values', None) or []
+    by_feature, by_language = {}, {}
+    for value in values:
+        by_feature[value.get('Parameter_ID')] = by_feature.get(value.get('Parameter_ID'), 0) + 1
+        by_language[value.get('Language_ID')] = by_language.get(value.get('Language_ID'), 0) + 1
+
+    language_id = max(by_language, key=by_language.get) if by_language else \
+        (languages[0].get('ID') if languages else '')
+    feature_id = max(by_feature, key=by_feature.get) if by_feature else \
+        (features[0].get('ID') if features else '')
+    other_features = sorted((f for f in by_feature if f != feature_id), key=by_feature.get, reverse=True)
+    language = next((l for l in languages if l.get('ID') == language_id), languages[0] if languages else {})
+    return {
+        'language_id': language_id,
+        'feature_id': feature_id,
+        'other_feature_id': other_features[0] if other_features else feature_id,
+        'family': most_common('Family'),
+        'macroarea': most_common('Macroarea'),
+        'name_prefix': (language.get('Name') or 'a')[:3],
+        'feature_word': ((loader.get_feature(feature_id) or {}).get('Name') or 'order').split()[0],
+        'area': (loader.get_areas() or [{'ID': ''}])[0]['ID'] if hasattr(loader, 'get_areas') else '',
+        'lineage': _top_lineage(loader, language_id),
+    }
+
+
+def _top_lineage(loader, language_id):
+    """Topmost genealogy node above a language (e.g. its family), if the loader has a tree"""
+    node = loader.get_genealogy_node(language_id) if hasattr(loader, 'get_genealogy_node') else None
+    return node['ancestors'][-1]['id'] if node and node['ancestors'] else language_id
+
+
+def build_cases(kind, loader, p):
+    """Return {case_name: zero-argument callable}; names are stable across commits"""
+    cases = {
+        'get_statistics': lambda: loader.get_statistics(),
+        'get_detailed_statistics': lambda: loader.get_detailed_statistics(),
+        'get_language': lambda: loader.get_language(p['language_id']),
+        'get_language[missing]': lambda: loader.get_language('does-not-exist'),
+        'get_families': lambda: loader.get_families(),
+        'get_macroareas': lambda: loader.get_macroareas(),
+        'get_genealogy_nodes': lambda: loader.get_genealogy_nodes(),
+        'get_genealogy_nodes[genus]': lambda: loader.get_genealogy_nodes('genus'),
+        'get_feature': lambda: loader.get_feature(p['feature_id']),
+        'get_codes_for_feature': lambda: loader.get_codes_for_feature(p['feature_id']),
+        'get_values_for_language': lambda: loader.get_values_for_language(p['language_id']),
+        'get_values_for_feature': lambda: loader.get_values_for_feature(p['feature_id']),
+        'get_feature_values[page1]': lambda: loader.get_feature_values(p['feature_id']),
+        'get_feature_values[family,desc]': lambda: loader.get_feature_values(
+            p['feature_id'], page=2, sort='family', order='desc'),
+        'get_feature_values[search]': lambda: loader.get_feature_values(
+            p['feature_id'], search=p['name_prefix'][:1]),
+        'search_languages[prefix]': lambda: loader.search_languages(p['name_prefix']),
+        'search_languages[1char]': lambda: loader.search_languages(p['name_prefix'][:1]),
+        'search_languages[nomatch]': lambda: loader.search_languages('zzzzqqq'),
+        'search_features[word]': lambda: loader.search_features(p['feature_word']),
+        'search_features[nomatch]': lambda: loader.search_features('zzzzqqq'),
+    }
+    if kind == 'wals':
+        cases.update({
+            'get_languages[page1]': lambda: loader.get_languages(),
+            'get_languages[page10]': lambda: loader.get_languages(page=10),
+            'get_languages[search]': lambda: loader.get_languages(search=p['name_prefix']),
+            'get_languages[family]': lambda: loader.get_languages(family=p['family']),
+            'get_languages[macroarea]': lambda: loader.get_languages(macroarea=p['macroarea']),
+            'get_languages[query]': lambda: loader.get_languages(query=f"{p['feature_id']}:*"),
+            'get_languages[family+macroarea]': lambda: loader.get_languages(
+                family=p['family'], macroarea=p['macroarea']),
+            'get_languages[search+family+macroarea]': lambda: loader.get_languages(
+                search=p['name_prefix'][:1], family=p['family'], macroarea=p['macroarea']),
+            'get_features[page1]': lambda: loader.get_features(),
+            'get_features[search]': lambda: loader.get_features(search=p['feature_word']),
+            'get_features[area]': lambda: loader.get_features(area=p['area']),
+            'get_areas': lambda: loader.get_areas(),
+            'get_all_languages_geo': lambda: loader.get_all_languages_geo(),
+            'get_feature_distribution': lambda: loader.get_feature_distribution(p['feature_id']),
+            'get_feature_distribution[genus]': lambda: loader.get_feature_distribution(
+                p['feature_id'], unit='genus'),
+            'get_feature_distribution[family+proportional]': lambda: loader.get_feature_distribution(
+                p['feature_id'], unit='family', weighting='proportional'),
+            'get_feature_crosstab[language]': lambda: loader.get_feature_crosstab(
+                p['feature_id'], p['other_feature_id']),
+            'get_feature_crosstab[genus]': lambda: loader.get_feature_crosstab(
+                p['feature_id'], p['other_feature_id'], unit='genus'),
+            'get_detailed_statistics[genus]': lambda: loader.get_detailed_statistics(unit='genus'),
+            'get_code_matrix': lambda: loader.get_code_matrix(),
+            'get_stability_table': lambda: loader.get_stability_table(),
+            'get_feature_stability': lambda: loader.get_feature_stability(p['feature_id']),
+            'get_neighbour_graph': lambda: loader.get_neighbour_graph(),
+            'get_autocorrelation_table': lambda: loader.get_autocorrelation_table(),
+            'get_feature_autocorrelation': lambda: loader.get_feature_autocorrelation(p['feature_id']),
+            'get_bitset_index': lambda: loader.get_bitset_index(),
+            'query_languages': lambda: loader.query_languages(
+                f"{p['feature_id']}:1 AND NOT {p['other_feature_id']}:1,2 AND macroarea:\"{p['macroarea']}\""),
+            'get_universals': lambda: loader.get_universals(),
+            'get_universals[feature+genera]': lambda: loader.get_universals(
+                feature=p['feature_id'], min_genera=5, sort='genera'),
+            'get_clustering': lambda: loader.get_clustering(),
+            'get_clusters': lambda: loader.get_clusters(),
+            'get_clusters[features]': lambda: loader.get_clusters(
+                k=3, features=[p['feature_id'], p['other_feature_id']], min_coverage=1),
+            'get_nearest_languages': lambda: loader.get_nearest_languages(p['language_id']),
+            'get_languages_within[100km]': lambda: loader.get_languages_within(p['language_id'], 100),
+            'get_languages_within[2000km]': lambda: loader.get_languages_within(
+                p['language_id'], 2000, limit=50),
+            'get_sampler': lambda: loader.get_sampler(),
+            'sample_languages[genus]': lambda: loader.sample_languages(seed=1),
+            'sample_languages[family+feature]': lambda: loader.sample_languages(
+                by='family', features=[p['feature_id']], seed=1),
+            'get_genealogy_node[language]': lambda: loader.get_genealogy_node(p['language_id']),
+            'get_genealogy_node[lineage+lca]': lambda: loader.get_genealogy_node(
+                p['lineage'], other=p['language_id']),
+            'get_languages_under': lambda: loader.get_languages_under(p['lineage']),
+            # Cold builds of the cached analyses, without the in-memory or disk copy
+            'get_code_matrix[cold]': _cold(_forget(loader, '_code_matrix'), loader.get_code_matrix),
+            'get_sampler[cold]': _cold(_forget(loader, '_sampler'), loader.get_sampler),
+            'get_stability_table[cold]': _cold(_forget(loader, '_stability'), loader.get_stability_table),
+            'get_neighbour_graph[cold]': _cold(_forget(loader, '_neighbour_graph'), loader.get_neighbour_graph),
+            'get_autocorrelation_table[cold]': _cold(_forget(loader, '_areal'), loader.get_autocorrelation_table),
+            'get_feature_autocorrelation[cold]': _cold(
+                _forget(loader, '_areal', containers=('_areal_features',)),
+                lambda: loader.get_feature_autocorrelation(p['feature_id'])),
+            'get_bitset_index[cold]': _cold(_forget(loader, '_bitset_index'), loader.get_bitset_index),
+            'get_universals[cold]': _cold(_forget(loader, '_universals'), loader.get_universals),
+            'get_clustering[cold]': _cold(_forget(loader, containers=('_clusterings',)),
+                                          loader.get_clustering),
+        })
+    else:
+        sl = streamlit_data_loader
+        cases.update({
+            'get_all_languages': lambda: loader.get_all_languages(),
+            'get_all_features': lambda: loader.get_all_features(),
+            'get_languages_with_coordinates': lambda: loader.get_languages_with_coordinates(),
+            'languages_df': lambda: loader.languages_df(),
+            'features_df': lambda: loader.features_df(),
+            'codes_df': lambda: loader.codes_df(),
+            'values_df': lambda: loader.values_df(),
+            'feature_layer': lambda: loader.feature_layer(p['feature_id']),
+            'code_matrix': lambda: loader.code_matrix(),
+            'get_feature_stability': lambda: loader.get_feature_stability(p['feature_id']),
+            'neighbour_graph': lambda: loader.neighbour_graph(),
+            'get_feature_autocorrelation': lambda: loader.get_feature_autocorrelation(p['feature_id']),
+            'get_feature_distribution': lambda: loader.get_feature_distribution(p['feature_id']),
+            'get_feature_distribution[genus]': lambda: loader.get_feature_distribution(
+                p['feature_id'], unit='genus'),
+            'clustering': lambda: loader.clustering(),
+            'clustering[features]': lambda: loader.clustering(
+                3, (p['feature_id'], p['other_feature_id']), 1.0),
+            # Cold builds: the st.cache_resource entry is cleared and the disk cache disabled
+            'languages_df[cold]': _cold(sl._languages_frame.clear, loader.languages_df),
+            'values_df[cold]': _cold(sl._values_frame.clear, loader.values_df),
+            'feature_layer[cold]': _cold(sl._feature_layer.clear, lambda: loader.feature_layer(p['feature_id'])),
+            'code_matrix[cold]': _cold(sl._code_matrix.clear, loader.code_matrix),
+            'get_feature_stability[cold]': _cold(
+                sl._stability_table.clear, lambda: loader.get_feature_stability(p['feature_id'])),
+            'neighbour_graph[cold]': _cold(sl._neighbour_graph.clear, loader.neighbour_graph),
+            'get_feature_autocorrelation[cold]': _cold(
+                sl._feature_autocorrelation.clear, lambda: loader.get_feature_autocorrelation(p['feature_id'])),
+            'clustering[cold]': _cold(sl._clustering.clear, loader.clustering),
+        })
+    return cases
+
+
+def uncovered_methods(loader, cases):
+    """Public loader methods that have no benchmark case yet"""
+    covered = {name.split('[')[0] for name in cases}
+    public = {name for name in dir(type(loader))
+              if not name.startswith('_') and callable(getattr(loader, name))}
+    return sorted(public - covered)
+
+
+def run(cldf_path, kinds, load_repeat, min_time, repeat, only=None):
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cldf_path': str(cldf_path),
+            'dataset': dataset_fingerprint(cldf_path),
+        },
+        'loaders': {},
+    }
+
+    for kind in kinds:
+        loader, load_stats = measure_load(kind, cldf_path, load_repeat)
+        params = _pick_parameters(loader)
+        cases = build_cases(kind, loader, params)
+        missing = uncovered_methods(loader, cases)
+        if missing:
+            print(f'[{kind}] no benchmark case for: {", ".join(missing)}', file=sys.stderr)
+
+        calls, skipped = {}, {}
+        for name, func in cases.items():
+            if only and only not in name:
+                continue
+            try:
+                rounds, number = time_call(func, min_time=min_time, repeat=repeat)
+            except Exception as e:  # e.g. too little data in a small dataset for this case
+                skipped[name] = f'{type(e).__name__}: {e}'
+                print(f'[{kind}] {name:45s} skipped ({skipped[name]})', file=sys.stderr)
+                continue
+            calls[name] = {
+                'min_us': min(rounds) * 1e6,
+                'median_us': statistics.median(rounds) * 1e6,
+                'number': number,
+                'result_size': _result_size(func()),
+            }
+            print(f'[{kind}] {name:45s} {calls[name]["median_us"]:12.1f} us', file=sys.stderr)
+
+        results['loaders'][kind] = {'load': load_stats, 'parameters': params, 'calls': calls,
+                                    'skipped': skipped}
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Print a comparison table; returns the list of regressed case names"""
+    regressions = []
+    if current['meta']['dataset'] != baseline['meta']['dataset']:
+        print('warning: results were produced from different datasets', file=sys.stderr)
+
+    print(f'{"case":60s} {"baseline":>12s} {"current":>12s} {"ratio":>7s}')
+    for kind, data in current['loaders'].items():
+        base = baseline.get('loaders', {}).get(kind)
+        if not base:
+            continue
+        rows = [('load', base['load']['load_seconds_min'] * 1e6,
+                 data['load']['load_seconds_min'] * 1e6)]
+        # Compare best-of rounds: far less sensitive to scheduling noise than the median
+        rows += [(name, base['calls'][name]['min_us'], call['min_us'])
+                 for name, call in data['calls'].items() if name in base['calls']]
+        for name, before, after in rows:
+            ratio = after / before if before else float('inf')
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  REGRESSION'
+                regressions.append(f'{kind}.{name}')
+            print(f'{kind + "." + name:60s} {before:12.1f} {after:12.1f} {ratio:7.2f}{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cldf', default=str(REPO_ROOT / 'cldf'), help='CLDF directory to load')
+    parser.add_argument('--loader', choices=['wals', 'streamlit', 'all'], default='all')
+    parser.add_argument('--load-repeat', type=int, default=3, help='cold loads to time')
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds per case')
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per case (approx.)')
+    parser.add_argument('--only', help='run only cases whose name contains this string')
+    parser.add_argument('--output', help='write JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against a previous result file')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown reported as a regression (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    kinds = ['wals', 'streamlit'] if args.loader == 'all' else [args.loader]
+    if 'streamlit' in kinds and WALSStreamlitLoader is None:
+        print('streamlit is not installed; skipping WALSStreamlitLoader', file=sys.stderr)
+        kinds.remove('streamlit')
+
+    results = run(Path(args.cldf), kinds, args.load_repeat, args.min_time, args.repeat, args.only)
+
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) above {args.threshold:.0%}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,423 @@
+"""
+Synthetic CLDF StructureDataset generator for load testing
+Writes a WALS-shaped dataset (languages, genealogy nodes, parameters, codes,
+values, chapters, areas) whose size and fill rate are configurable
+
+The metadata is derived from cldf/StructureDataset-metadata.json, restricted
+to the tables written here, so the output validates as CLDF and loads with
+WALSDataLoader(cldf_path=...) / WALSStreamlitLoader(cldf_path=...).
+
+Usage:
+    python benchmarks/generate_cldf.py --scale 10 --output /tmp/wals-x10
+    python benchmarks/generate_cldf.py --languages 50000 --parameters 400 \\
+        --codes 2-12 --fill-rate 0.1 --seed 7 --output /tmp/wals-custom
+
+Distributions are modelled on WALS: Zipf-like family and genus sizes,
+geographically clustered lineages, skewed code frequencies, genealogically
+inherited values, uneven feature coverage and denser data for the
+Samples_100/Samples_200 languages.
+"""
+import argparse
+import bisect
+import copy
+import csv
+import itertools
+import json
+import math
+import random
+import string
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TEMPLATE_METADATA = REPO_ROOT / 'cldf' / 'StructureDataset-metadata.json'
+
+# Reference sizes of WALS (used by --scale)
+WALS_LANGUAGES = 2662
+WALS_PARAMETERS = 192
+WALS_FILL_RATE = 0.15
+LANGUAGES_PER_GENUS = 5.3
+GENERA_PER_FAMILY = 2.4
+
+# (name, weight, (lat_min, lat_max), (lon_min, lon_max)) roughly following WALS
+MACROAREAS = [
+    ('Africa', 0.20, (-34, 36), (-17, 51)),
+    ('Eurasia', 0.21, (0, 70), (-10, 150)),
+    ('Papunesia', 0.19, (-11, 20), (95, 180)),
+    ('North America', 0.15, (15, 70), (-165, -55)),
+    ('South America', 0.14, (-55, 12), (-81, -35)),
+    ('Australia', 0.11, (-39, -11), (113, 153)),
+]
+
+AREAS = ['Phonology', 'Morphology', 'Nominal Categories', 'Nominal Syntax', 'Verbal Categories',
+         'Word Order', 'Simple Clauses', 'Complex Sentences', 'Lexicon', 'Sign Languages', 'Other']
+
+TABLES = ['languages.csv', 'parameters.csv', 'codes.csv', 'values.csv',
+          'chapters.csv', 'areas.csv', 'contributors.csv']
+
+SYLLABLES = [c + v for c in 'bdfghklmnprstwyz' for v in 'aeiou'] + ['a', 'e', 'i', 'o', 'u']
+
+
+def _name(rng, syllables=(2, 3)):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(*syllables))).capitalize()
+
+
+def _unique_names(rng, count, syllables=(2, 3)):
+    seen, names = set(), []
+    while len(names) < count:
+        name = _name(rng, syllables)
+        if name in seen:
+            name = f'{name} {len(names)}'
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _slug(name):
+    return ''.join(ch for ch in name.lower() if ch.isalnum())
+
+
+def _zipf_weights(n, exponent):
+    return [1.0 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def _draw(rng, cum_weights):
+    return bisect.bisect_right(cum_weights, rng.random() * cum_weights[-1])
+
+
+def _dirichlet(rng, k, alpha):
+    draws = [rng.gammavariate(alpha, 1.0) for _ in range(k)]
+    total = sum(draws) or 1.0
+    return [d / total for d in draws]
+
+
+def _language_ids(count):
+    """Lowercase WALS-style codes: 3 letters while they last, then longer"""
+    width = 3
+    while 26 ** width < count:
+        width += 1
+    ids = (''.join(chars) for chars in itertools.product(string.ascii_lowercase, repeat=width))
+    return list(itertools.islice(ids, count))
+
+
+class Generator:
+    def __init__(self, languages, parameters, codes=(2, 9), fill_rate=WALS_FILL_RATE,
+                 inheritance=0.7, seed=1):
+        if languages < 1 or parameters < 1:
+            raise ValueError('need at least one language and one parameter')
+        self.n_languages = languages
+        self.n_parameters = parameters
+        self.codes_range = codes
+        self.fill_rate = fill_rate
+        self.inheritance = inheritance
+        self.rng = random.Random(seed)
+
+    # -- genealogy and geography -------------------------------------------------
+
+    def _build_lineages(self):
+        rng = self.rng
+        n_genera = max(1, min(self.n_languages, round(self.n_languages / LANGUAGES_PER_GENUS)))
+        n_families = max(1, min(n_genera, round(n_genera / GENERA_PER_FAMILY)))
+
+        area_cum = _cumulative([a[1] for a in MACROAREAS])
+        self.families = []
+        for name in _unique_names(rng, n_families, (2, 3)):
+            area = MACROAREAS[_draw(rng, area_cum)]
+            self.families.append({
+                'name': name,
+                'id': f'family-{_slug(name)}',
+                'macroarea': area[0],
+                'centre': (rng.uniform(*area[2]), rng.uniform(*area[3])),
+            })
+
+        # Genera go to families, languages to genera, both with Zipf-like sizes
+        family_cum = _cumulative(_zipf_weights(n_families, 1.1))
+        order = list(range(n_families))
+        rng.shuffle(order)
+        self.genera = []
+        for i, name in enumerate(_unique_names(rng, n_genera, (2, 3))):
+            # every family gets at least one genus
+            family = self.families[order[i]] if i < n_families else \
+                self.families[order[_draw(rng, family_cum)]]
+            lat, lon = family['centre']
+            self.genera.append({
+                'name': name,
+                'id': f'genus-{_slug(name)}',
+                'family': family,
+                'centre': (lat + rng.gauss(0, 4), lon + rng.gauss(0, 6)),
+            })
+
+        genus_cum = _cumulative(_zipf_weights(n_genera, 0.9))
+        genus_order = list(range(n_genera))
+        rng.shuffle(genus_order)
+        self.language_genus = [
+            genus_order[i] if i < n_genera else genus_order[_draw(rng, genus_cum)]
+            for i in range(self.n_languages)
+        ]
+
+    def _language_rows(self):
+        rng = self.rng
+        ids = _language_ids(self.n_languages)
+        names = _unique_names(rng, self.n_languages, (2, 4))
+        sample_order = list(range(self.n_languages))
+        rng.shuffle(sample_order)
+        rank = {index: position for position, index in enumerate(sample_order)}
+        n100 = min(100, self.n_languages)
+        n200 = min(200, self.n_languages)
+
+        rows = []
+        for i in range(self.n_languages):
+            genus = self.genera[self.language_genus[i]]
+            family = genus['family']
+            lat = max(-60.0, min(75.0, genus['centre'][0] + rng.gauss(0, 2)))
+            lon = (genus['centre'][1] + rng.gauss(0, 3) + 180) % 360 - 180
+            iso = ''.join(rng.choice(string.ascii_lowercase) for _ in range(3)) \
+                if rng.random() < 0.85 else ''
+            glottocode = ''.join(rng.choice(string.ascii_lowercase) for _ in range(4)) + \
+                str(rng.randint(1000, 9999))
+            rows.append({
+                'ID': ids[i], 'Name': names[i], 'Macroarea': family['macroarea'],
+                'Latitude': f'{lat:.4f}', 'Longitude': f'{lon:.4f}',
+                'Glottocode': glottocode, 'ISO639P3code': iso,
+                'Family': family['name'], 'Subfamily': '', 'Genus': genus['name'],
+                'GenusIcon': '', 'ISO_codes': iso,
+                'Samples_100': 'true' if rank[i] < n100 else 'false',
+                'Samples_200': 'true' if rank[i] < n200 else 'false',
+                'Country_ID': '', 'Source': '', 'Parent_ID': genus['id'],
+            })
+        self.language_rows = list(rows)
+        self.sample_rank = rank
+
+        # Taxonomic nodes of the Genealogical Language List, as in WALS
+        empty = {key: '' for key in rows[0]}
+        for family in self.families:
+            rows.append({**empty, 'ID': family['id'], 'Name': family['name']})
+        for genus in self.genera:
+            rows.append({**empty, 'ID': genus['id'], 'Name': genus['name'],
+                         'GenusIcon': 'c%06X' % rng.randrange(0x1000000),
+                         'Parent_ID': genus['family']['id']})
+        return rows
+
+    # -- features ----------------------------------------------------------------
+
+    def _build_parameters(self):
+        rng = self.rng
+        n_chapters = max(1, round(self.n_parameters / 1.3))
+        self.chapters = []
+        for number in range(1, n_chapters + 1):
+            area_id = min(len(AREAS), 1 + (number - 1) * len(AREAS) // n_chapters)
+            self.chapters.append({
+                'ID': str(number), 'Name': f'{_name(rng, (2, 3))} {_name(rng, (2, 3))}',
+                'Description': '', 'Contributor': 'Synthetic Generator',
+                'Citation': 'Synthetic data for load testing.', 'wp_slug': '',
+                'Number': str(number), 'Area_ID': str(area_id), 'Source': '',
+                'Contributor_ID': 'synthetic', 'With_Contributor_ID': '',
+            })
+
+        self.parameters, self.codes, self.code_cum = [], [], []
+        low, high = self.codes_range
+        per_chapter = {}
+        for p in range(self.n_parameters):
+            chapter = self.chapters[p * n_chapters // self.n_parameters]
+            n = per_chapter[chapter['ID']] = per_chapter.get(chapter['ID'], -1) + 1
+            # WALS-style IDs: 81A, 81B, ... (with a numeric suffix past Z)
+            pid = f'{chapter["ID"]}{string.ascii_uppercase[n % 26]}{n // 26 or ""}'
+            self.parameters.append({
+                'ID': pid, 'Name': f'{_name(rng)} {_name(rng)}', 'Description': '',
+                'ColumnSpec': '', 'Chapter_ID': chapter['ID'],
+            })
+            # Small code sets are more common than large ones
+            k = min(high, low + int(rng.expovariate(1 / max(1.0, (high - low) / 1.6))))
+            codes = []
+            for number in range(1, k + 1):
+                name = _name(rng, (2, 3))
+                codes.append({
+                    'ID': f'{pid}-{number}', 'Parameter_ID': pid, 'Name': name,
+                    'Description': name, 'Number': str(number),
+                    'icon': 'c%06X' % rng.randrange(0x1000000),
+                })
+            self.codes.append(codes)
+            self.code_cum.append(_cumulative(_dirichlet(rng, k, 0.8)))
+
+        # Uneven coverage: a few features are very widely attested
+        coverage = [rng.betavariate(1.2, 4.0) for _ in range(self.n_parameters)]
+        self.parameter_cum = _cumulative(coverage)
+
+    def _values(self):
+        """Yield value rows language by language"""
+        rng = self.rng
+        P = self.n_parameters
+        genus_choice, family_choice = {}, {}
+
+        def inherited(cache, key, p):
+            code = cache.get((key, p))
+            if code is None:
+                code = cache[(key, p)] = _draw(rng, self.code_cum[p])
+            return code
+
+        # The Samples_100/200 languages are densely coded; the remaining languages
+        # are spread around a mean chosen so the overall fill rate matches
+        N = self.n_languages
+        n100, n200 = min(100, N), min(200, N)
+        dense = {100: max(self.fill_rate, 0.85), 200: max(self.fill_rate, 0.6)}
+        rest = N - n200
+        rest_mean = self.fill_rate
+        if rest:
+            rest_mean = (self.fill_rate * N - dense[100] * n100 - dense[200] * (n200 - n100)) / rest
+            rest_mean = max(0.01, rest_mean)
+        sigma = 0.6
+
+        for i, lang in enumerate(self.language_rows):
+            rank = self.sample_rank[i]
+            if rank < 100:
+                density = dense[100]
+            elif rank < 200:
+                density = dense[200]
+            else:
+                density = min(1.0, rest_mean * rng.lognormvariate(-sigma * sigma / 2, sigma))
+            n_values = min(P, max(1, int(round(rng.gauss(density * P, math.sqrt(P) / 2)))))
+
+            # Weighted sampling of parameters without replacement (approximate, O(n_values))
+            chosen = set()
+            attempts = 0
+            while len(chosen) < n_values and attempts < n_values * 4:
+                chosen.add(_draw(rng, self.parameter_cum))
+                attempts += 1
+            if len(chosen) < n_values:
+                remaining = [p for p in range(P) if p not in chosen]
+                chosen.update(rng.sample(remaining, n_values - len(chosen)))
+
+            genus_index = self.language_genus[i]
+            family_name = self.genera[genus_index]['family']['name']
+            for p in sorted(chosen):
+                r = rng.random()
+                if r < self.inheritance:
+                    code = inherited(genus_choice, genus_index, p)
+                elif r < self.inheritance + (1 - self.inheritance) / 2:
+                    code = inherited(family_choice, family_name, p)
+                else:
+                    code = _draw(rng, self.code_cum[p])
+                code_row = self.codes[p][code]
+                pid = self.parameters[p]['ID']
+                yield {
+                    'ID': f'{pid}-{lang["ID"]}', 'Language_ID': lang['ID'], 'Parameter_ID': pid,
+                    'Value': code_row['Number'], 'Code_ID': code_row['ID'],
+                    'Comment': '', 'Source': '', 'Example_ID': '',
+                }
+
+    # -- output --------------------------------------------------------------------
+
+    def write(self, output):
+        output = Path(output)
+        output.mkdir(parents=True, exist_ok=True)
+        template = json.loads(TEMPLATE_METADATA.read_text(encoding='utf-8'))
+        columns = {t['url']: [c['name'] for c in t['tableSchema']['columns']]
+                   for t in template['tables']}
+
+        self._build_lineages()
+        languages = self._language_rows()
+        self._build_parameters()
+
+        extents = {
+            'languages.csv': _write_csv(output / 'languages.csv', columns['languages.csv'], languages),
+            'parameters.csv': _write_csv(output / 'parameters.csv', columns['parameters.csv'],
+                                         self.parameters),
+            'codes.csv': _write_csv(output / 'codes.csv', columns['codes.csv'],
+                                    itertools.chain.from_iterable(self.codes)),
+            'chapters.csv': _write_csv(output / 'chapters.csv', columns['chapters.csv'], self.chapters),
+            'areas.csv': _write_csv(output / 'areas.csv', columns['areas.csv'], [
+                {'ID': str(i), 'Name': name, 'dbpedia_url': ''} for i, name in enumerate(AREAS, 1)
+            ]),
+            'contributors.csv': _write_csv(output / 'contributors.csv', columns['contributors.csv'], [
+                {'ID': 'synthetic', 'Name': 'Synthetic Generator', 'Url': '', 'Editor_Ord': '0'}
+            ]),
+            'values.csv': _write_csv(output / 'values.csv', columns['values.csv'], self._values()),
+        }
+        (output / 'sources.bib').write_text('', encoding='utf-8')
+        _write_metadata(template, output / 'StructureDataset-metadata.json', extents, self)
+        return extents
+
+
+def _write_csv(path, fieldnames, rows):
+    count = 0
+    # CLDF CSVs in this repo use CRLF line endings (csv module default)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _write_metadata(template, path, extents, generator):
+    metadata = copy.deepcopy(template)
+    tables = []
+    for table in metadata['tables']:
+        if table['url'] not in TABLES:
+            continue
+        table['dc:extent'] = extents[table['url']]
+        schema = table['tableSchema']
+        # Drop references to tables that are not generated (examples, media)
+        fks = [fk for fk in schema.get('foreignKeys', []) if fk['reference']['resource'] in TABLES]
+        if fks:
+            schema['foreignKeys'] = fks
+        else:
+            schema.pop('foreignKeys', None)
+        tables.append(table)
+    metadata['tables'] = tables
+    metadata['dc:title'] = 'Synthetic WALS-like StructureDataset'
+    metadata['dc:identifier'] = 'synthetic-wals'
+    metadata['rdf:ID'] = 'synthetic-wals'
+    metadata['dc:description'] = (
+        f'Generated by benchmarks/generate_cldf.py: {generator.n_languages} languages, '
+        f'{generator.n_parameters} parameters, codes {generator.codes_range[0]}-'
+        f'{generator.codes_range[1]}, fill rate {generator.fill_rate}, seed-reproducible.'
+    )
+    for key in ('dc:bibliographicCitation', 'dcat:accessURL', 'prov:wasDerivedFrom',
+                'prov:wasGeneratedBy'):
+        metadata.pop(key, None)
+    path.write_text(json.dumps(metadata, indent=4, ensure_ascii=False) + '\n', encoding='utf-8')
+
+
+def _codes_range(text):
+    low, _, high = text.partition('-')
+    low, high = int(low), int(high or low)
+    if not 1 <= low <= high:
+        raise argparse.ArgumentTypeError('expected MIN-MAX with 1 <= MIN <= MAX')
+    return low, high
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output', required=True, help='directory to write the dataset to')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply WALS sizes (languages, parameters) by this factor')
+    parser.add_argument('--languages', type=int, help=f'number of languages (default {WALS_LANGUAGES} x scale)')
+    parser.add_argument('--parameters', type=int,
+                        help=f'number of parameters (default {WALS_PARAMETERS}, x sqrt(scale))')
+    parser.add_argument('--codes', type=_codes_range, default=(2, 9), metavar='MIN-MAX',
+                        help='codes per parameter (default 2-9)')
+    parser.add_argument('--fill-rate', type=float, default=WALS_FILL_RATE,
+                        help='share of the language x parameter matrix with a value (default 0.15)')
+    parser.add_argument('--inheritance', type=float, default=0.7,
+                        help='probability that a value follows the genus (default 0.7)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    languages = args.languages or int(round(WALS_LANGUAGES * args.scale))
+    parameters = args.parameters or int(round(WALS_PARAMETERS * math.sqrt(args.scale)))
+    generator = Generator(languages, parameters, codes=args.codes, fill_rate=args.fill_rate,
+                          inheritance=args.inheritance, seed=args.seed)
+    extents = generator.write(args.output)
+    for table, count in sorted(extents.items()):
+        print(f'{table:20s} {count:>10,} rows', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+HTTP load test for the WALS Local Explorer (wals_app)
+Drives the Flask app with a weighted mix of realistic requests from N
+concurrent clients and reports throughput and latency percentiles
+
+Usage:
+    # In-process against the WSGI app (per-worker capacity, no network)
+    python benchmarks/loadtest.py --clients 4 --duration 30
+
+    # Against a running server (e.g. gunicorn -w 4 app:app)
+    python benchmarks/loadtest.py --url http://localhost:5000 --clients 16 --duration 60
+
+    # Synthetic data, custom mix, machine-readable output
+    python benchmarks/loadtest.py --cldf /tmp/wals-x10 --weight map_api=0 --output run.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote, urlencode, urlsplit
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / 'wals_app'))
+
+DEFAULT_WEIGHTS = {
+    'search': 30,            # /search?q=<typed prefix>
+    'languages': 20,         # /languages?page=N[&family=..][&macroarea=..]
+    'feature': 20,           # /feature/<id>
+    'language': 10,          # /language/<id>
+    'distribution_api': 8,   # /api/feature/<id>/distribution
+    'map_api': 5,            # /api/languages/geo
+    'features': 5,           # /features?page=N[&search=..]
+    'index': 2,              # /
+}
+
+
+class RequestMix:
+    """Generates request paths from the dataset according to route weights"""
+
+    def __init__(self, loader, weights, seed=None):
+        self.rng = random.Random(seed)
+        self.routes = [name for name, weight in weights.items() if weight > 0]
+        if not self.routes:
+            raise ValueError('all route weights are zero')
+        self.weights = [weights[name] for name in self.routes]
+
+        languages = loader.get_languages(per_page=10 ** 9)['items']
+        features = loader.get_features(per_page=10 ** 9)['items']
+        self.language_ids = [l['ID'] for l in languages] or ['eng']
+        self.language_names = [l['Name'] for l in languages if l.get('Name')] or ['English']
+        self.feature_ids = [f['ID'] for f in features] or ['1A']
+        self.feature_words = [w for f in features for w in f.get('Name', '').split() if len(w) > 3] or ['order']
+        self.families = loader.get_families() or ['']
+        self.macroareas = loader.get_macroareas() or ['']
+        self.language_pages = max(1, -(-len(languages) // 50))
+        self.feature_pages = max(1, -(-len(features) // 30))
+
+    def _typed_prefix(self, text):
+        # People type short prefixes far more often than whole names
+        length = min(len(text), max(1, int(self.rng.expovariate(1 / 3)) + 1))
+        return text[:length]
+
+    def next(self):
+        """Return (route name, path) for the next request"""
+        rng = self.rng
+        route = rng.choices(self.routes, self.weights)[0]
+        if route == 'search':
+            if rng.random() < 0.7:
+                q = self._typed_prefix(rng.choice(self.language_names))
+            else:
+                q = self._typed_prefix(rng.choice(self.feature_words))
+            params = {'q': q}
+            if rng.random() < 0.3:
+                params['category'] = rng.choice(['languages', 'features'])
+            return route, '/search?' + urlencode(params)
+        if route == 'languages':
+            params = {'page': 1 + min(int(rng.expovariate(1 / 3)), self.language_pages - 1)}
+            r = rng.random()
+            if r < 0.25:
+                params = {'page': 1, 'family': rng.choice(self.families)}
+            elif r < 0.4:
+                params = {'page': 1, 'macroarea': rng.choice(self.macroareas)}
+            elif r < 0.5:
+                params['search'] = self._typed_prefix(rng.choice(self.language_names))
+                params['page'] = 1
+            return route, '/languages?' + urlencode(params)
+        if route == 'feature':
+            return route, '/feature/' + quote(rng.choice(self.feature_ids))
+        if route == 'language':
+            return route, '/language/' + quote(rng.choice(self.language_ids))
+        if route == 'distribution_api':
+            return route, f'/api/feature/{quote(rng.choice(self.feature_ids))}/distribution'
+        if route == 'map_api':
+            return route, '/api/languages/geo'
+        if route == 'features':
+            params = {'page': rng.randint(1, self.feature_pages)}
+            if rng.random() < 0.3:
+                params = {'page': 1, 'search': self._typed_prefix(rng.choice(self.feature_words))}
+            return route, '/features?' + urlencode(params)
+        return route, '/'
+
+
+class InProcessClient:
+    """Issues requests through the Flask test client (one per worker thread)"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        response = self.client.get(path)
+        body = response.get_data()
+        return response.status_code, len(body)
+
+    def close(self):
+        pass
+
+
+class HTTPClient:
+    """Keep-alive HTTP/1.1 client for a running server"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def get(self, path):
+        try:
+            self.conn.request('GET', self.prefix + path)
+            response = self.conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            raise
+        return response.status, len(body)
+
+    def close(self):
+        self.conn.close()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(samples, elapsed):
+    """samples: list of (route, seconds, status, bytes); returns a report dict"""
+    def stats(rows):
+        latencies = sorted(r[1] for r in rows)
+        errors = sum(1 for r in rows if r[2] is None or r[2] >= 500)
+        return {
+            'requests': len(rows),
+            'errors': errors,
+            'throughput_rps': len(rows) / elapsed if elapsed else 0.0,
+            'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p90_ms': percentile(latencies, 90) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+            'mean_bytes': statistics.fmean(r[3] for r in rows) if rows else 0.0,
+        }
+
+    by_route = {}
+    for row in samples:
+        by_route.setdefault(row[0], []).append(row)
+    return {
+        'elapsed_seconds': elapsed,
+        'overall': stats(samples),
+        'routes': {route: stats(rows) for route, rows in sorted(by_route.items())},
+    }
+
+
+def run_load(make_client, mix_factory, clients, duration=None, total_requests=None, warmup=0.0):
+    """Run the load test and return (samples, measured elapsed seconds)"""
+    samples = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients + 1)
+    state = {'measure_from': None, 'stop_at': None, 'remaining': total_requests}
+
+    def worker(index):
+        client = make_client()
+        mix = mix_factory(index)
+        local = []
+        start_barrier.wait()
+        try:
+            while True:
+                if state['stop_at'] is not None and time.perf_counter() >= state['stop_at']:
+                    break
+                if total_requests is not None:
+                    with lock:
+                        if state['remaining'] <= 0:
+                            break
+                        state['remaining'] -= 1
+                route, path = mix.next()
+                t0 = time.perf_counter()
+                try:
+                    status, size = client.get(path)
+                except Exception:
+                    status, size = None, 0
+                t1 = time.perf_counter()
+                if t0 >= state['measure_from']:
+                    local.append((route, t1 - t0, status, size))
+        finally:
+            client.close()
+            with lock:
+                samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    now = time.perf_counter()
+    state['measure_from'] = now + warmup
+    if duration is not None:
+        state['stop_at'] = now + warmup + duration
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - state['measure_from']
+    return samples, max(elapsed, 1e-9)
+
+
+def print_report(report, clients, target):
+    overall = report['overall']
+    print(f'Target: {target}, clients: {clients}, measured for {report["elapsed_seconds"]:.1f}s')
+    print(f'{"route":18s} {"reqs":>8s} {"err":>5s} {"rps":>9s} {"p50":>8s} {"p90":>8s} '
+          f'{"p95":>8s} {"p99":>8s} {"max":>8s}  (ms)')
+    rows = list(report['routes'].items()) + [('TOTAL', overall)]
+    for route, s in rows:
+        print(f'{route:18s} {s["requests"]:8d} {s["errors"]:5d} {s["throughput_rps"]:9.1f} '
+              f'{s["p50_ms"]:8.1f} {s["p90_ms"]:8.1f} {s["p95_ms"]:8.1f} {s["p99_ms"]:8.1f} '
+              f'{s["max_ms"]:8.1f}')
+
+
+def _parse_weight(text):
+    name, _, value = text.partition('=')
+    if name not in DEFAULT_WEIGHTS or not value:
+        raise argparse.ArgumentTypeError(
+            f'expected ROUTE=WEIGHT with ROUTE in: {", ".join(DEFAULT_WEIGHTS)}')
+    return name, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', help='base URL of a running server (default: in-process WSGI app)')
+    parser.add_argument('--cldf', help='CLDF directory (in-process app and request generation)')
+    parser.add_argument('--clients', type=int, default=4, help='concurrent clients (default 4)')
+    parser.add_argument('--duration', type=float, default=20.0, help='measured seconds (default 20)')
+    parser.add_argument('--requests', type=int, help='stop after this many requests instead of --duration')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured warm-up seconds (default 2)')
+    parser.add_argument('--weight', type=_parse_weight, action='append', default=[],
+                        help='override a route weight, e.g. --weight search=50 (repeatable)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the request mix')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    if args.cldf:
+        os.environ['WALS_CLDF_PATH'] = str(Path(args.cldf).resolve())
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(args.weight)
+
+    if args.url:
+        from data_loader import WALSDataLoader
+        loader = WALSDataLoader(cldf_path=args.cldf)
+        make_client = lambda: HTTPClient(args.url)
+        target = args.url
+    else:
+        import app as wals_app
+        loader = wals_app.data_loader
+        make_client = lambda: InProcessClient(wals_app.app)
+        target = 'in-process WSGI app'
+
+    mix_factory = lambda index: RequestMix(loader, weights, seed=args.seed * 1000 + index)
+    duration = None if args.requests else args.duration
+    warmup = 0.0 if args.requests else args.warmup
+    samples, elapsed = run_load(make_client, mix_factory, args.clients, duration=duration,
+                                total_requests=args.requests, warmup=warmup)
+
+    report = summarize(samples, elapsed)
+    report['config'] = {
+        'target': target, 'clients': args.clients, 'duration': duration, 'requests': args.requests,
+        'warmup': warmup, 'weights': weights, 'seed': args.seed, 'cldf': args.cldf,
+    }
+    print_report(report, args.clients, target)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+    return 1 if report['overall']['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Download helpers for the WALS Streamlit app
+Export files are generated only when a download is requested, then cached
+"""
+
+import gzip
+import io
+import zipfile
+
+import streamlit as st
+
+# format -> (file suffix, MIME type, button label)
+EXPORT_FORMATS = {
+    'csv': ('.csv', 'text/csv', 'CSV'),
+    'csv.gz': ('.csv.gz', 'application/gzip', 'gzip'),
+    'zip': ('.zip', 'application/zip', 'zip'),
+}
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def export_bytes(version, file_stem, signature, fmt, _make_frame):
+    """Serialized export of ``_make_frame()`` in one of EXPORT_FORMATS
+
+    Cached by dataset version, file name and filter signature; the frame
+    factory itself is not hashed, so the signature must identify its output.
+    """
+    raw = _make_frame().to_csv(index=False).encode('utf-8')
+    if fmt == 'csv.gz':
+        return gzip.compress(raw, mtime=0)
+    if fmt == 'zip':
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(file_stem + '.csv', raw)
+        return buffer.getvalue()
+    return raw
+
+
+def download_buttons(label, make_frame, file_stem, version, signature=(), formats=tuple(EXPORT_FORMATS)):
+    """Download buttons for a table, one per export format
+
+    ``make_frame`` is only called (and the file only serialized) when a
+    button is clicked; reruns that nobody downloads from cost nothing.
+    """
+    columns = st.columns([3] + [1] * (len(formats) - 1))
+    for column, fmt in zip(columns, formats):
+        suffix, mime, caption = EXPORT_FORMATS[fmt]
+        with column:
+            st.download_button(
+                label=label if column is columns[0] else caption,
+                data=lambda fmt=fmt: export_bytes(version, file_stem, tuple(signature), fmt, make_frame),
+                file_name=file_stem + suffix,
+                mime=mime,
+                key=f"download-{file_stem}-{fmt}",
+                on_click="ignore",
+            )
@@ -0,0 +1,54 @@
+"""
+Map layer helpers for the WALS Streamlit app
+Builds compact pydeck scatter layers from point DataFrames
+"""
+
+import json
+
+import numpy as np
+import pydeck as pdk
+from pydeck.bindings.json_tools import default_serialize
+
+# Three decimals is ~100 m, far below the size of a marker
+COORD_DECIMALS = 3
+
+
+class CompactDeck(pdk.Deck):
+    """pydeck Deck that serializes without indentation
+
+    ``st.pydeck_chart`` sends ``to_json()`` to the browser; pydeck indents it,
+    which for point layers is mostly whitespace.
+    """
+
+    def to_json(self):
+        return json.dumps(self, sort_keys=True, default=default_serialize, separators=(',', ':'))
+
+
+def scatter_layers(points, color_index, palette, fields, **layer_kwargs):
+    """One ScatterplotLayer per palette colour, carrying only positions and tooltip fields
+
+    ``st.pydeck_chart`` sends layer data to the browser as JSON, so every
+    per-point value costs payload and serialization time. Giving each
+    layer a constant colour removes the per-point colour lists; rounding
+    the coordinates shortens the remaining numbers.
+
+    points: DataFrame with ``lat``/``lon`` and the ``fields`` columns
+    color_index: integer palette index per point (wrapped modulo the palette)
+    """
+    palette = np.asarray(palette, dtype=np.uint8)
+    color_index = np.asarray(color_index, dtype=np.int64) % len(palette)
+    data = points[list(fields)].copy()
+    data['lon'] = points['lon'].to_numpy(dtype=np.float64).round(COORD_DECIMALS)
+    data['lat'] = points['lat'].to_numpy(dtype=np.float64).round(COORD_DECIMALS)
+
+    layers = []
+    for index in np.unique(color_index):
+        layers.append(pdk.Layer(
+            "ScatterplotLayer",
+            id=f"points-{index}",
+            data=data[color_index == index],
+            get_position=["lon", "lat"],
+            get_color=palette[index].tolist(),
+            **layer_kwargs,
+        ))
+    return layers
@@ -20,6 +20,84 @@ def get_data_loader():
 
 data_loader = get_data_loader()
 
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def language_values_table(version, lang_id):
+    """Feature values of one language as a display table (cached per dataset version)"""
+    values = data_loader.get_values_for_language(lang_id)
+    return pd.DataFrame({
+        'Feature ID': [value.get('Parameter_ID') for value in values],
+        'Feature Name': [value.get('Feature_Name') for value in values],
+        'Value': [value.get('Code_Name') for value in values],
+    })
+
+
+@st.fragment
+def language_details(language_names):
+    """Language picker and detail panel, rerun on its own when the selection changes"""
+    selected_lang_name = st.selectbox(
+        "Select a language to view details:",
+        options=language_names,
+        key="lang_select"
+    )
+
+    if not selected_lang_name:
+        return
+
+    # Extract language ID
+    lang_id = selected_lang_name.split('(')[-1].strip(')')
+    language = data_loader.get_language(lang_id)
+
+    if not language:
+        return
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown("#### Classification")
+        st.markdown(f"**Family:** {language.get('Family', 'Unknown')}")
+        st.markdown(f"**Subfamily:** {language.get('Subfamily', '-')}")
+        st.markdown(f"**Genus:** {language.get('Genus', 'Unknown')}")
+        st.markdown(f"**Macroarea:** {language.get('Macroarea', 'Unknown')}")
+
+    with col2:
+        st.markdown("#### Identifiers")
+        st.markdown(f"**WALS Code:** `{language.get('ID')}`")
+        st.markdown(f"**ISO 639-3:** {language.get('ISO639P3code', '-')}")
+        glottocode = language.get('Glottocode', '')
+        if glottocode:
+            st.markdown(f"**Glottocode:** [{glottocode}](https://glottolog.org/resource/languoid/id/{glottocode})")
+        else:
+            st.markdown("**Glottocode:** -")
+
+    with col3:
+        st.markdown("#### Geographic Information")
+        st.markdown(f"**Latitude:** {language.get('Latitude', '-')}")
+        st.markdown(f"**Longitude:** {language.get('Longitude', '-')}")
+
+    # Feature values
+    st.markdown("---")
+    st.markdown("#### Typological Features")
+
+    values_df = language_values_table(data_loader.dataset_version, lang_id)
+
+    if len(values_df):
+        st.dataframe(
+            values_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Feature ID": st.column_config.TextColumn("Feature ID", width="small"),
+                "Feature Name": st.column_config.TextColumn("Feature Name", width="large"),
+                "Value": st.column_config.TextColumn("Value", width="medium"),
+            }
+        )
+
+        st.info(f"This language has data for {len(values_df)} typological features.")
+    else:
+        st.info("No feature data available for this language.")
+
+
 # Page header
 st.title("🌐 Languages")
 st.markdown("Browse and explore languages in the WALS database")
@@ -36,31 +114,26 @@ search_query = st.sidebar.text_input("🔍 Search", placeholder="Language name o
 selected_family = st.sidebar.selectbox("Language Family", families)
 selected_macroarea = st.sidebar.selectbox("Macroarea", macroareas)
 
-# Get all languages
-all_languages = data_loader.get_all_languages()
+# Get all languages (shared, read-only DataFrame)
+all_languages = data_loader.languages_df()
 
-# Apply filters
-filtered_languages = all_languages
+# Apply filters as vectorized boolean masks
+mask = pd.Series(True, index=all_languages.index)
 
 if search_query:
     search_lower = search_query.lower()
-    filtered_languages = [
-        lang for lang in filtered_languages
-        if search_lower in lang.get('Name', '').lower() or
-           search_lower in lang.get('ID', '').lower()
-    ]
+    mask &= (
+        all_languages['name_lower'].str.contains(search_lower, regex=False) |
+        all_languages['id_lower'].str.contains(search_lower, regex=False)
+    )
 
 if selected_family != 'All':
-    filtered_languages = [
-        lang for lang in filtered_languages
-        if lang.get('Family') == selected_family
-    ]
+    mask &= all_languages['Family'] == selected_family
 
 if selected_macroarea != 'All':
-    filtered_languages = [
-        lang for lang in filtered_languages
-        if lang.get('Macroarea') == selected_macroarea
-    ]
+    mask &= all_languages['Macroarea'] == selected_macroarea
+
+filtered_languages = all_languages[mask]
 
 # Display results count
 st.markdown(f"**{len(filtered_languages):,}** languages found")
@@ -69,34 +142,24 @@ st.markdown(f"**{len(filtered_languages):,}** languages found")
 if st.sidebar.button("Clear All Filters"):
     st.rerun()
 
-# Convert to DataFrame for display
-if filtered_languages:
-    # Prepare data for table
-    table_data = []
-    for lang in filtered_languages:
-        table_data.append({
-            'Code': lang.get('ID', ''),
-            'Name': lang.get('Name', ''),
-            'Family': lang.get('Family', ''),
-            'Genus': lang.get('Genus', ''),
-            'Macroarea': lang.get('Macroarea', ''),
-            'ISO 639-3': lang.get('ISO639P3code', ''),
-        })
-
-    df = pd.DataFrame(table_data)
-
+if len(filtered_languages):
     # Display with pagination
     items_per_page = st.sidebar.selectbox("Languages per page", [10, 25, 50, 100], index=1)
 
-    total_pages = (len(df) - 1) // items_per_page + 1
+    total_pages = (len(filtered_languages) - 1) // items_per_page + 1
 
     if total_pages > 1:
         page = st.number_input("Page", min_value=1, max_value=total_pages, value=1)
         start_idx = (page - 1) * items_per_page
         end_idx = start_idx + items_per_page
-        df_display = df.iloc[start_idx:end_idx]
+        page_languages = filtered_languages.iloc[start_idx:end_idx]
     else:
-        df_display = df
+        page_languages = filtered_languages
+
+    # Only the visible page is converted for display
+    df_display = page_languages[['ID', 'Name', 'Family', 'Genus', 'Macroarea', 'ISO639P3code']].rename(
+        columns={'ID': 'Code', 'ISO639P3code': 'ISO 639-3'}
+    )
 
     # Display table
     st.dataframe(
@@ -113,78 +176,11 @@ if filtered_languages:
         }
     )
 
-    # Language detail section
+    # Language detail section (a fragment: picking a language reruns only the panel)
     st.markdown("---")
     st.subheader("View Language Details")
 
-    # Select language to view
-    language_names = [f"{lang.get('Name')} ({lang.get('ID')})" for lang in filtered_languages]
-    selected_lang_name = st.selectbox(
-        "Select a language to view details:",
-        options=language_names,
-        key="lang_select"
-    )
-
-    if selected_lang_name:
-        # Extract language ID
-        lang_id = selected_lang_name.split('(')[-1].strip(')')
-        language = data_loader.get_language(lang_id)
-
-        if language:
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                st.markdown("#### Classification")
-                st.markdown(f"**Family:** {language.get('Family', 'Unknown')}")
-                st.markdown(f"**Subfamily:** {language.get('Subfamily', '-')}")
-                st.markdown(f"**Genus:** {language.get('Genus', 'Unknown')}")
-                st.markdown(f"**Macroarea:** {language.get('Macroarea', 'Unknown')}")
-
-            with col2:
-                st.markdown("#### Identifiers")
-                st.markdown(f"**WALS Code:** `{language.get('ID')}`")
-                st.markdown(f"**ISO 639-3:** {language.get('ISO639P3code', '-')}")
-                glottocode = language.get('Glottocode', '')
-                if glottocode:
-                    st.markdown(f"**Glottocode:** [{glottocode}](https://glottolog.org/resource/languoid/id/{glottocode})")
-                else:
-                    st.markdown("**Glottocode:** -")
-
-            with col3:
-                st.markdown("#### Geographic Information")
-                st.markdown(f"**Latitude:** {language.get('Latitude', '-')}")
-                st.markdown(f"**Longitude:** {language.get('Longitude', '-')}")
-
-            # Feature values
-            st.markdown("---")
-            st.markdown("#### Typological Features")
-
-            values = data_loader.get_values_for_language(lang_id)
-
-            if values:
-                values_data = []
-                for value in values:
-                    values_data.append({
-                        'Feature ID': value.get('Parameter_ID'),
-                        'Feature Name': value.get('Feature_Name'),
-                        'Value': value.get('Code_Name')
-                    })
-
-                values_df = pd.DataFrame(values_data)
-                st.dataframe(
-                    values_df,
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "Feature ID": st.column_config.TextColumn("Feature ID", width="small"),
-                        "Feature Name": st.column_config.TextColumn("Feature Name", width="large"),
-                        "Value": st.column_config.TextColumn("Value", width="medium"),
-                    }
-                )
-
-                st.info(f"This language has data for {len(values)} typological features.")
-            else:
-                st.info("No feature data available for this language.")
+    language_details((filtered_languages['Name'] + ' (' + filtered_languages['ID'] + ')').tolist())
 
 else:
     st.info("No languages found matching the selected filters.")
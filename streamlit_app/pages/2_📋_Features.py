@@ -20,6 +20,175 @@ def get_data_loader():
 
 data_loader = get_data_loader()
 
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def feature_codes_table(version, feat_id):
+    """Value codes of one feature as a display table (cached per dataset version)"""
+    codes = data_loader.get_codes_for_feature(feat_id)
+    return pd.DataFrame({
+        'Number': [code.get('Number') for code in codes],
+        'Value': [code.get('Name') for code in codes],
+        'Description': [code.get('Description', '') for code in codes],
+    })
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def feature_values_summary(version, feat_id, unit='language', weighting='majority'):
+    """(language count, value distribution) for one feature (cached)
+
+    With unit='genus' or 'family', the distribution counts genealogical units
+    (weighted per aggregation.WEIGHTINGS) instead of languages.
+    """
+    values = data_loader.get_values_for_feature(feat_id)
+
+    if unit == 'language':
+        value_counts = {}
+        for value in values:
+            code_name = value.get('Code_Name', 'Unknown')
+            value_counts[code_name] = value_counts.get(code_name, 0) + 1
+    else:
+        value_counts = {name: weight for name, weight in
+                        data_loader.get_feature_distribution(feat_id, unit, weighting).items() if weight}
+
+    dist_df = pd.DataFrame(
+        sorted(value_counts.items(), key=lambda x: x[1], reverse=True),
+        columns=['Value', 'Count'],
+    )
+    return len(values), dist_df
+
+
+@st.fragment
+def feature_details(feature_names):
+    """Feature picker and detail panel, rerun on its own when the selection changes"""
+    selected_feat_name = st.selectbox(
+        "Select a feature to view details:",
+        options=feature_names,
+        key="feat_select"
+    )
+
+    if not selected_feat_name:
+        return
+
+    # Extract feature ID
+    feat_id = selected_feat_name.split(' - ')[0]
+    feature = data_loader.get_feature(feat_id)
+
+    if not feature:
+        return
+
+    version = data_loader.dataset_version
+
+    st.markdown(f"### {feature.get('Name')}")
+    st.markdown(f"**Feature ID:** `{feature.get('ID')}`")
+    st.markdown(f"**Chapter:** {feature.get('Chapter_ID', 'N/A')}")
+
+    # Get possible values
+    st.markdown("---")
+    st.markdown("#### Possible Values")
+
+    codes_df = feature_codes_table(version, feat_id)
+
+    if len(codes_df):
+        st.dataframe(
+            codes_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Number": st.column_config.NumberColumn("Number", width="small"),
+                "Value": st.column_config.TextColumn("Value", width="medium"),
+                "Description": st.column_config.TextColumn("Description", width="large"),
+            }
+        )
+    else:
+        st.info("No value codes defined for this feature.")
+
+    # Get languages with this feature
+    st.markdown("---")
+    st.markdown("#### Languages with Data")
+
+    unit_labels = {'language': 'Languages', 'genus': 'Genera', 'family': 'Families'}
+    col1, col2 = st.columns(2)
+    with col1:
+        unit = st.radio("Count", list(unit_labels), format_func=unit_labels.get,
+                        horizontal=True, key="fv_unit")
+    with col2:
+        weighting = st.radio("Weighting", ['majority', 'proportional'], format_func=str.capitalize,
+                             horizontal=True, key="fv_weighting", disabled=unit == 'language',
+                             help="Majority: each genus/family counts once, for its most common value. "
+                                  "Proportional: each counts once, split across its values.")
+
+    total, dist_df = feature_values_summary(version, feat_id, unit, weighting)
+
+    if total:
+        st.info(f"**{total}** languages have data for this feature")
+
+        st.markdown(f"**Value Distribution ({unit_labels[unit].lower()}):**")
+        st.bar_chart(dist_df.set_index('Value'))
+
+        stability = data_loader.get_feature_stability(feat_id)
+        if stability and stability['genus_agreement'] is not None:
+            st.markdown("**Genealogical Stability:**")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Same genus", f"{stability['genus_agreement']:.1%}",
+                        help=f"{stability['genus_pairs']} same-genus language pairs with the same value")
+            if stability['family_agreement'] is not None:
+                col2.metric("Same family", f"{stability['family_agreement']:.1%}",
+                            help=f"{stability['family_pairs']} same-family language pairs with the same value")
+            if stability['baseline_agreement'] is not None:
+                col3.metric("Different families", f"{stability['baseline_agreement']:.1%}",
+                            help="Baseline: pairs of languages from different families")
+            if stability['genus_stability'] is not None:
+                st.caption(f"Same-genus pairs agree {stability['genus_stability']:.2f}x as often as the "
+                           f"baseline, more than for {stability['genus_stability_rank']}% of features.")
+
+        # Paginated, sortable listing (rows and sort orders are cached per feature)
+        st.markdown("**Languages:**")
+
+        sort_labels = {'language': 'Language name', 'family': 'Family', 'code': 'Value'}
+        code_options = {'': 'All values'}
+        code_options.update((c.get('ID'), c.get('Name')) for c in data_loader.get_codes_for_feature(feat_id))
+
+        col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+        with col1:
+            search = st.text_input("Search languages", key=f"fv_search_{feat_id}",
+                                   placeholder="Language name or code...")
+        with col2:
+            code = st.selectbox("Value", list(code_options), format_func=code_options.get,
+                                key=f"fv_code_{feat_id}")
+        with col3:
+            sort = st.selectbox("Sort by", list(sort_labels), format_func=sort_labels.get,
+                                key=f"fv_sort_{feat_id}")
+        with col4:
+            order = 'desc' if st.toggle("Desc", key=f"fv_desc_{feat_id}") else 'asc'
+
+        query = dict(per_page=50, sort=sort, order=order, code=code, search=search)
+        listing = data_loader.get_feature_values(feat_id, page=1, **query)
+        if listing['total_pages'] > 1:
+            page = st.number_input("Page", min_value=1, max_value=listing['total_pages'], value=1,
+                                   key=f"fv_page_{feat_id}_{code}_{search}")
+            if page > 1:
+                listing = data_loader.get_feature_values(feat_id, page=page, **query)
+
+        values_df = pd.DataFrame(listing['items'], columns=['Language_ID', 'Language_Name', 'Family', 'Code_Name'])
+        st.dataframe(
+            values_df.rename(columns={'Language_ID': 'Language Code', 'Language_Name': 'Language Name',
+                                      'Code_Name': 'Value'}),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Language Code": st.column_config.TextColumn("Code", width="small"),
+                "Language Name": st.column_config.TextColumn("Language", width="medium"),
+                "Family": st.column_config.TextColumn("Family", width="medium"),
+                "Value": st.column_config.TextColumn("Value", width="medium"),
+            }
+        )
+
+        st.caption(f"Page {listing['page']} of {listing['total_pages']} "
+                   f"({listing['total']} of {listing['feature_total']} languages)")
+    else:
+        st.info("No language data available for this feature.")
+
+
 # Page header
 st.title("📋 Typological Features")
 st.markdown("Explore linguistic features across languages")
@@ -83,108 +252,11 @@ if filtered_features:
         }
     )
 
-    # Feature detail section
+    # Feature detail section (a fragment: picking a feature reruns only the panel)
     st.markdown("---")
     st.subheader("View Feature Details")
 
-    # Select feature to view
-    feature_names = [f"{feat.get('ID')} - {feat.get('Name')}" for feat in filtered_features]
-    selected_feat_name = st.selectbox(
-        "Select a feature to view details:",
-        options=feature_names,
-        key="feat_select"
-    )
-
-    if selected_feat_name:
-        # Extract feature ID
-        feat_id = selected_feat_name.split(' - ')[0]
-        feature = data_loader.get_feature(feat_id)
-
-        if feature:
-            st.markdown(f"### {feature.get('Name')}")
-            st.markdown(f"**Feature ID:** `{feature.get('ID')}`")
-            st.markdown(f"**Chapter:** {feature.get('Chapter_ID', 'N/A')}")
-
-            # Get possible values
-            st.markdown("---")
-            st.markdown("#### Possible Values")
-
-            codes = data_loader.get_codes_for_feature(feat_id)
-
-            if codes:
-                codes_data = []
-                for code in codes:
-                    codes_data.append({
-                        'Number': code.get('Number'),
-                        'Value': code.get('Name'),
-                        'Description': code.get('Description', '')
-                    })
-
-                codes_df = pd.DataFrame(codes_data)
-                st.dataframe(
-                    codes_df,
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "Number": st.column_config.NumberColumn("Number", width="small"),
-                        "Value": st.column_config.TextColumn("Value", width="medium"),
-                        "Description": st.column_config.TextColumn("Description", width="large"),
-                    }
-                )
-            else:
-                st.info("No value codes defined for this feature.")
-
-            # Get languages with this feature
-            st.markdown("---")
-            st.markdown("#### Languages with Data")
-
-            values = data_loader.get_values_for_feature(feat_id)
-
-            if values:
-                st.info(f"**{len(values)}** languages have data for this feature")
-
-                # Show value distribution
-                value_counts = {}
-                for value in values:
-                    code_name = value.get('Code_Name', 'Unknown')
-                    value_counts[code_name] = value_counts.get(code_name, 0) + 1
-
-                # Create distribution chart
-                dist_df = pd.DataFrame([
-                    {'Value': k, 'Count': v}
-                    for k, v in sorted(value_counts.items(), key=lambda x: x[1], reverse=True)
-                ])
-
-                st.markdown("**Value Distribution:**")
-                st.bar_chart(dist_df.set_index('Value'))
-
-                # Show sample languages
-                st.markdown("**Sample Languages (first 100):**")
-
-                values_data = []
-                for value in values[:100]:
-                    values_data.append({
-                        'Language Code': value.get('Language_ID'),
-                        'Language Name': value.get('Language_Name'),
-                        'Value': value.get('Code_Name')
-                    })
-
-                values_df = pd.DataFrame(values_data)
-                st.dataframe(
-                    values_df,
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "Language Code": st.column_config.TextColumn("Code", width="small"),
-                        "Language Name": st.column_config.TextColumn("Language", width="medium"),
-                        "Value": st.column_config.TextColumn("Value", width="medium"),
-                    }
-                )
-
-                if len(values) > 100:
-                    st.caption(f"Showing first 100 of {len(values)} languages")
-            else:
-                st.info("No language data available for this feature.")
+    feature_details([f"{feat.get('ID')} - {feat.get('Name')}" for feat in filtered_features])
 
 else:
     st.info("No features found matching the search query.")
@@ -11,6 +11,8 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 from streamlit_data_loader import WALSStreamlitLoader
+from map_layers import CompactDeck, scatter_layers
+from downloads import download_buttons
 
 st.set_page_config(page_title="Map - WALS Explorer", page_icon="🗺️", layout="wide")
 
@@ -31,25 +33,51 @@ st.sidebar.header("Map Settings")
 # Color by option
 color_by = st.sidebar.radio(
     "Color markers by:",
-    ["Family", "Macroarea"],
+    ["Family", "Macroarea", "Typological cluster"],
     index=1
 )
 
-# Get language data with coordinates
-languages = data_loader.get_languages_with_coordinates()
+# Clustering parameters (k-modes over the languages' feature values)
+if color_by == "Typological cluster":
+    features_df = data_loader.features_df()
+    feature_names = dict(zip(features_df['ID'], features_df['Name']))
+    n_clusters = st.sidebar.slider("Number of clusters", 2, 10, 6)
+    cluster_features = st.sidebar.multiselect(
+        "Features (all when empty):",
+        list(feature_names),
+        format_func=lambda f: f"{f} – {feature_names[f]}",
+    )
+    min_coverage = st.sidebar.slider(
+        "Minimum coverage", 0.05, 1.0, 0.2, step=0.05,
+        help="Share of the chosen features a language needs values for to be clustered",
+    )
+
+# Get language data with coordinates (shared, read-only DataFrame)
+all_languages = data_loader.languages_df()
+languages = all_languages[all_languages['Latitude'].notna() & all_languages['Longitude'].notna()]
 
-if not languages:
+if languages.empty:
     st.warning("No geographic data available. Languages need latitude and longitude coordinates.")
     st.stop()
 
-# Prepare data for map
-map_data = []
-
-# Define colors for families/macroareas
-if color_by == "Family":
-    unique_values = sorted(set(lang['family'] for lang in languages))
+# Colour index per language: family/macroarea category, or cluster number
+if color_by == "Typological cluster":
+    matrix = data_loader.code_matrix()
+    try:
+        clustering = data_loader.clustering(n_clusters, tuple(cluster_features), min_coverage)
+    except ValueError as e:
+        st.warning(f"Cannot cluster these languages: {e}")
+        st.stop()
+    labels = clustering.labels[languages['ID'].map(matrix.language_index).to_numpy()]
+    languages = languages[labels >= 0]
+    color_index = labels[labels >= 0]
+    sizes = clustering.sizes()
+    unique_values = [f"Cluster {c + 1} ({sizes[c]:,} languages)" for c in range(clustering.k)]
 else:
-    unique_values = sorted(set(lang['macroarea'] for lang in languages))
+    color_column = 'Family' if color_by == "Family" else 'Macroarea'
+    categories = languages[color_column].cat.remove_unused_categories()
+    color_index = categories.cat.codes.to_numpy()
+    unique_values = list(categories.cat.categories)
 
 # Create color map
 color_palette = [
@@ -69,24 +97,17 @@ color_map = {}
 for i, value in enumerate(unique_values):
     color_map[value] = color_palette[i % len(color_palette)]
 
-# Prepare map data
-for lang in languages:
-    color_key = lang['family'] if color_by == "Family" else lang['macroarea']
-    color = color_map.get(color_key, [128, 128, 128])
-
-    map_data.append({
-        'lat': lang['lat'],
-        'lon': lang['lon'],
-        'name': lang['name'],
-        'id': lang['id'],
-        'family': lang['family'],
-        'macroarea': lang['macroarea'],
-        'genus': lang['genus'],
-        'iso': lang['iso'],
-        'color': color
-    })
-
-df = pd.DataFrame(map_data)
+# Prepare map data (categories are sorted, so category codes index the palette)
+df = pd.DataFrame({
+    'lat': languages['Latitude'],
+    'lon': languages['Longitude'],
+    'name': languages['Name'],
+    'id': languages['ID'],
+    'family': languages['Family'].astype(str),
+    'macroarea': languages['Macroarea'].astype(str),
+    'genus': languages['Genus'].astype(str),
+    'iso': languages['ISO639P3code'],
+})
 
 # Display legend
 st.sidebar.markdown("---")
@@ -108,12 +129,12 @@ if len(unique_values) > 10:
 # Create map
 st.subheader(f"Languages by {color_by}")
 
-# PyDeck layer
-layer = pdk.Layer(
-    "ScatterplotLayer",
-    data=df,
-    get_position=["lon", "lat"],
-    get_color="color",
+# PyDeck layers, one per palette colour
+layers = scatter_layers(
+    df,
+    color_index,
+    color_palette,
+    fields=['name', 'id', 'family', 'genus', 'macroarea', 'iso'],
     get_radius=50000,
     pickable=True,
     opacity=0.7,
@@ -147,8 +168,8 @@ tooltip = {
 }
 
 # Render map
-r = pdk.Deck(
-    layers=[layer],
+r = CompactDeck(
+    layers=layers,
     initial_view_state=view_state,
     tooltip=tooltip,
     map_style="mapbox://styles/mapbox/light-v10",
@@ -166,25 +187,41 @@ with col1:
 with col2:
     if color_by == "Family":
         st.metric("Language Families", len(unique_values))
-    else:
+    elif color_by == "Macroarea":
         st.metric("Macroareas", len(unique_values))
+    else:
+        st.metric("Clusters", len(unique_values))
 
 with col3:
     st.metric("Continents", "6")
 
+# What sets each cluster apart: its most over-represented modal values
+if color_by == "Typological cluster":
+    st.caption(f"{len(languages):,} languages with coordinates and values for at least "
+               f"{min_coverage:.0%} of {len(clustering.feature_ids)} features")
+    codes_df = data_loader.codes_df()
+    code_names = dict(zip(zip(codes_df['Parameter_ID'], codes_df['Number']), codes_df['Name']))
+    profiles = pd.DataFrame({
+        'Cluster': [c + 1 for c in range(clustering.k)],
+        'Languages': sizes,
+        'Distinctive values': [
+            "; ".join(f"{f} {code_names.get((f, code), code)} ({share:.0%} vs {baseline:.0%})"
+                      for f, code, share, baseline in clustering.profile(matrix, c, top=3))
+            for c in range(clustering.k)
+        ],
+    })
+    st.dataframe(profiles, use_container_width=True, hide_index=True)
+
 # Show data table
 with st.expander("📊 View Language Data Table"):
-    display_df = pd.DataFrame([
-        {
-            'Code': lang['id'],
-            'Name': lang['name'],
-            'Family': lang['family'],
-            'Macroarea': lang['macroarea'],
-            'Latitude': f"{lang['lat']:.2f}",
-            'Longitude': f"{lang['lon']:.2f}",
-        }
-        for lang in languages
-    ])
+    display_df = pd.DataFrame({
+        'Code': languages['ID'],
+        'Name': languages['Name'],
+        'Family': languages['Family'],
+        'Macroarea': languages['Macroarea'],
+        'Latitude': languages['Latitude'].map('{:.2f}'.format),
+        'Longitude': languages['Longitude'].map('{:.2f}'.format),
+    })
 
     st.dataframe(
         display_df,
@@ -192,13 +229,12 @@ with st.expander("📊 View Language Data Table"):
         hide_index=True
     )
 
-    # Download button
-    csv = display_df.to_csv(index=False)
-    st.download_button(
-        label="📥 Download as CSV",
-        data=csv,
-        file_name="wals_languages_geographic.csv",
-        mime="text/csv"
+    # Download buttons (files are generated on click)
+    download_buttons(
+        "📥 Download as CSV",
+        lambda: display_df,
+        file_stem="wals_languages_geographic",
+        version=data_loader.dataset_version,
     )
 
 # Footer
@@ -12,6 +12,7 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 from streamlit_data_loader import WALSStreamlitLoader
+from downloads import download_buttons
 
 st.set_page_config(page_title="Statistics - WALS Explorer", page_icon="📊", layout="wide")
 
@@ -22,8 +23,96 @@ def get_data_loader():
 
 data_loader = get_data_loader()
 
-# Get detailed statistics
-stats = data_loader.get_detailed_statistics()
+
+
+# Summaries and figures are built once per dataset version and shared by all
+# sessions; reruns only re-send them. Treat the returned objects as read-only.
+
+@st.cache_resource(max_entries=4)
+def statistics_summary(version):
+    """Overview counts, full distribution tables and insight aggregates"""
+    stats = data_loader.get_statistics()
+
+    # Vectorized counts from the shared languages DataFrame (sorted, largest first)
+    languages_df = data_loader.languages_df()
+    family_counts = languages_df['Family'].value_counts()
+    macroarea_counts = languages_df['Macroarea'].value_counts()
+
+    families = family_counts.rename_axis('Language Family').reset_index(name='Number of Languages')
+    families['Language Family'] = families['Language Family'].astype(str)
+    macroareas = macroarea_counts.rename_axis('Macroarea').reset_index(name='Number of Languages')
+    macroareas['Macroarea'] = macroareas['Macroarea'].astype(str)
+
+    return {
+        **stats,
+        'families_table': families,
+        'macroareas_table': macroareas,
+        'top_families': list(zip(families['Language Family'], families['Number of Languages'].tolist())),
+        'largest_family': tuple(families.iloc[0].tolist()) if len(families) else None,
+        'largest_area': tuple(macroareas.iloc[0].tolist()) if len(macroareas) else None,
+        'avg_per_family': stats['languages'] / stats['families'] if stats['families'] else 0.0,
+    }
+
+
+@st.cache_resource(max_entries=8)
+def family_bar_figure(version, top_n=15):
+    df_families = statistics_summary(version)['families_table'].head(top_n).rename(
+        columns={'Language Family': 'Family', 'Number of Languages': 'Count'}
+    )
+
+    fig = px.bar(
+        df_families,
+        x='Count',
+        y='Family',
+        orientation='h',
+        title=f'Top {top_n} Language Families',
+        labels={'Count': 'Number of Languages', 'Family': 'Language Family'},
+        color='Count',
+        color_continuous_scale='Blues'
+    )
+
+    fig.update_layout(
+        height=500,
+        showlegend=False,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    return fig
+
+
+@st.cache_resource(max_entries=4)
+def macroarea_figures(version):
+    """(pie, bar) figures of languages per macroarea"""
+    df_macroarea = statistics_summary(version)['macroareas_table'].rename(
+        columns={'Number of Languages': 'Count'}
+    )
+
+    fig_pie = px.pie(
+        df_macroarea,
+        values='Count',
+        names='Macroarea',
+        title='Distribution by Macroarea',
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+    fig_pie.update_layout(height=400)
+
+    fig_bar = px.bar(
+        df_macroarea,
+        x='Macroarea',
+        y='Count',
+        title='Languages per Macroarea',
+        labels={'Count': 'Number of Languages'},
+        color='Count',
+        color_continuous_scale='Viridis'
+    )
+
+    fig_bar.update_layout(height=400, showlegend=False)
+    return fig_pie, fig_bar
+
+
+version = data_loader.dataset_version
+stats = statistics_summary(version)
 
 # Page header
 st.title("📊 Dataset Statistics")
@@ -55,34 +144,13 @@ col1, col2 = st.columns([2, 1])
 
 with col1:
     # Top 15 families bar chart
-    family_dist = stats['family_distribution']
-    top_families = sorted(family_dist.items(), key=lambda x: x[1], reverse=True)[:15]
-
-    df_families = pd.DataFrame(top_families, columns=['Family', 'Count'])
-
-    fig_families = px.bar(
-        df_families,
-        x='Count',
-        y='Family',
-        orientation='h',
-        title='Top 15 Language Families',
-        labels={'Count': 'Number of Languages', 'Family': 'Language Family'},
-        color='Count',
-        color_continuous_scale='Blues'
-    )
-
-    fig_families.update_layout(
-        height=500,
-        showlegend=False,
-        yaxis={'categoryorder': 'total ascending'}
-    )
-
-    st.plotly_chart(fig_families, use_container_width=True)
+    st.plotly_chart(family_bar_figure(version, 15), use_container_width=True)
 
 with col2:
     st.markdown("### 📋 Top Families")
 
     # Table of top families
+    top_families = stats['top_families']
     for i, (family, count) in enumerate(top_families[:10], 1):
         st.markdown(f"**{i}. {family}**")
         st.progress(count / top_families[0][1])
@@ -93,42 +161,14 @@ st.markdown("---")
 st.markdown("## 🌍 Languages by Macroarea")
 
 col1, col2 = st.columns(2)
+fig_pie, fig_bar = macroarea_figures(version)
 
 with col1:
     # Pie chart
-    macroarea_dist = stats['macroarea_distribution']
-    df_macroarea = pd.DataFrame(
-        macroarea_dist.items(),
-        columns=['Macroarea', 'Count']
-    )
-
-    fig_pie = px.pie(
-        df_macroarea,
-        values='Count',
-        names='Macroarea',
-        title='Distribution by Macroarea',
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
-
-    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-    fig_pie.update_layout(height=400)
-
     st.plotly_chart(fig_pie, use_container_width=True)
 
 with col2:
     # Bar chart
-    fig_bar = px.bar(
-        df_macroarea.sort_values('Count', ascending=False),
-        x='Macroarea',
-        y='Count',
-        title='Languages per Macroarea',
-        labels={'Count': 'Number of Languages'},
-        color='Count',
-        color_continuous_scale='Viridis'
-    )
-
-    fig_bar.update_layout(height=400, showlegend=False)
-
     st.plotly_chart(fig_bar, use_container_width=True)
 
 # Detailed tables
@@ -140,16 +180,7 @@ tab1, tab2 = st.tabs(["Language Families", "Macroareas"])
 with tab1:
     st.markdown("### All Language Families")
 
-    all_families = sorted(
-        stats['family_distribution'].items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
-
-    df_all_families = pd.DataFrame(
-        all_families,
-        columns=['Language Family', 'Number of Languages']
-    )
+    df_all_families = stats['families_table']
 
     st.dataframe(
         df_all_families,
@@ -161,28 +192,18 @@ with tab1:
         }
     )
 
-    # Download button
-    csv_families = df_all_families.to_csv(index=False)
-    st.download_button(
-        label="📥 Download Family Statistics",
-        data=csv_families,
-        file_name="wals_family_statistics.csv",
-        mime="text/csv"
+    # Download buttons (files are generated on click)
+    download_buttons(
+        "📥 Download Family Statistics",
+        lambda: df_all_families,
+        file_stem="wals_family_statistics",
+        version=version,
     )
 
 with tab2:
     st.markdown("### All Macroareas")
 
-    all_macroareas = sorted(
-        stats['macroarea_distribution'].items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
-
-    df_all_macroareas = pd.DataFrame(
-        all_macroareas,
-        columns=['Macroarea', 'Number of Languages']
-    )
+    df_all_macroareas = stats['macroareas_table']
 
     st.dataframe(
         df_all_macroareas,
@@ -194,13 +215,12 @@ with tab2:
         }
     )
 
-    # Download button
-    csv_macroareas = df_all_macroareas.to_csv(index=False)
-    st.download_button(
-        label="📥 Download Macroarea Statistics",
-        data=csv_macroareas,
-        file_name="wals_macroarea_statistics.csv",
-        mime="text/csv"
+    # Download buttons (files are generated on click)
+    download_buttons(
+        "📥 Download Macroarea Statistics",
+        lambda: df_all_macroareas,
+        file_stem="wals_macroarea_statistics",
+        version=version,
     )
 
 # Additional insights
@@ -210,15 +230,15 @@ st.markdown("## 💡 Insights")
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    largest_family = max(stats['family_distribution'].items(), key=lambda x: x[1])
+    largest_family = stats['largest_family'] or ('-', 0)
     st.info(f"**Largest Family:** {largest_family[0]} with {largest_family[1]} languages")
 
 with col2:
-    largest_area = max(stats['macroarea_distribution'].items(), key=lambda x: x[1])
+    largest_area = stats['largest_area'] or ('-', 0)
     st.info(f"**Largest Macroarea:** {largest_area[0]} with {largest_area[1]} languages")
 
 with col3:
-    avg_per_family = stats['languages'] / stats['families']
+    avg_per_family = stats['avg_per_family']
     st.info(f"**Avg Languages per Family:** {avg_per_family:.1f}")
 
 # Footer
@@ -10,7 +10,9 @@ import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
-from streamlit_data_loader import WALSStreamlitLoader
+from streamlit_data_loader import WALSStreamlitLoader, VALUE_PALETTE
+from map_layers import CompactDeck, scatter_layers
+from downloads import download_buttons
 
 st.set_page_config(page_title="Feature Map - WALS Explorer", page_icon="🌏", layout="wide")
 
@@ -49,95 +51,37 @@ selected_feature_label = st.sidebar.selectbox(
 
 selected_feature_id = feature_options[selected_feature_label]
 
-# Get feature details
+# Get feature details and its cached map layer (points, colours, counts)
 feature = data_loader.get_feature(selected_feature_id)
-codes = data_loader.get_codes_for_feature(selected_feature_id)
-values = data_loader.get_values_for_feature(selected_feature_id)
+layer_data = data_loader.feature_layer(selected_feature_id)
+sorted_codes = layer_data.codes  # sorted by code number
+df = layer_data.points
 
 # Display feature information
 st.markdown(f"### {feature.get('Name')}")
 st.markdown(f"**Feature ID:** `{feature.get('ID')}` | **Chapter:** {feature.get('Chapter_ID', 'N/A')}")
 
-# Get languages with coordinates
-languages_with_coords = data_loader.get_languages_with_coordinates()
-
-# Create a map of language_id to coordinates
-lang_coords = {lang['id']: lang for lang in languages_with_coords}
-
-# Prepare map data with feature values
-map_data = []
-
-# Create color palette for feature values
-color_palette = [
-    [231, 76, 60],   # Red
-    [52, 152, 219],  # Blue
-    [46, 204, 113],  # Green
-    [241, 196, 15],  # Yellow
-    [155, 89, 182],  # Purple
-    [230, 126, 34],  # Orange
-    [26, 188, 156],  # Turquoise
-    [236, 240, 241], # Light gray
-    [149, 165, 166], # Gray
-    [192, 57, 43],   # Dark red
-]
-
-# Map code IDs to colors
-code_color_map = {}
-for i, code in enumerate(codes):
-    code_color_map[code.get('ID')] = color_palette[i % len(color_palette)]
-
-# Also create a name-to-color map for the legend
-value_color_map = {}
-for i, code in enumerate(codes):
-    value_color_map[code.get('Name')] = color_palette[i % len(color_palette)]
-
-# Process values and create map points
-languages_with_data = set()
-for value in values:
-    lang_id = value.get('Language_ID')
-    code_id = value.get('Code_ID')
-
-    if lang_id in lang_coords and code_id in code_color_map:
-        lang = lang_coords[lang_id]
-        color = code_color_map[code_id]
-
-        map_data.append({
-            'lat': lang['lat'],
-            'lon': lang['lon'],
-            'name': lang['name'],
-            'id': lang['id'],
-            'family': lang['family'],
-            'value': value.get('Code_Name', 'Unknown'),
-            'color': color
-        })
-        languages_with_data.add(lang_id)
-
 # Statistics
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    st.metric("Languages with Data", len(languages_with_data))
+    st.metric("Languages with Data", layer_data.languages_with_data)
 
 with col2:
-    st.metric("Possible Values", len(codes))
+    st.metric("Possible Values", len(sorted_codes))
 
 with col3:
-    coverage = (len(languages_with_data) / len(languages_with_coords) * 100) if languages_with_coords else 0
+    coverage = (layer_data.languages_with_data / layer_data.languages_with_coords * 100) if layer_data.languages_with_coords else 0
     st.metric("Geographic Coverage", f"{coverage:.1f}%")
 
 # Display legend
 st.sidebar.markdown("---")
 st.sidebar.markdown("**Legend - Feature Values:**")
 
-# Sort codes by number for consistent display
-sorted_codes = sorted(codes, key=lambda x: int(x.get('Number', 0)))
-
 for code in sorted_codes:
     code_name = code.get('Name')
-    color = value_color_map.get(code_name, [128, 128, 128])
-
-    # Count languages with this value
-    count = sum(1 for item in map_data if item['value'] == code_name)
+    color = layer_data.colors.get(code.get('ID'), [128, 128, 128])
+    count = layer_data.code_counts.get(code.get('ID'), 0)
 
     st.sidebar.markdown(
         f'<div style="display: flex; align-items: center; margin-bottom: 8px;">'
@@ -159,18 +103,16 @@ with st.expander("ℹ️ View Feature Value Descriptions"):
         st.markdown("---")
 
 # Create map
-if map_data:
+if not df.empty:
     st.markdown("---")
     st.subheader("Geographic Distribution")
 
-    df = pd.DataFrame(map_data)
-
-    # PyDeck layer
-    layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=df,
-        get_position=["lon", "lat"],
-        get_color="color",
+    # PyDeck layers, one per value colour
+    layers = scatter_layers(
+        df,
+        df['color_index'].to_numpy(),
+        VALUE_PALETTE,
+        fields=['name', 'id', 'family', 'value'],
         get_radius=50000,
         pickable=True,
         opacity=0.8,
@@ -203,8 +145,8 @@ if map_data:
     }
 
     # Render map
-    r = pdk.Deck(
-        layers=[layer],
+    r = CompactDeck(
+        layers=layers,
         initial_view_state=view_state,
         tooltip=tooltip,
         map_style="mapbox://styles/mapbox/light-v10",
@@ -219,12 +161,15 @@ if map_data:
     col1, col2 = st.columns(2)
 
     with col1:
-        # Bar chart of value counts
-        value_counts = df['value'].value_counts().reset_index()
-        value_counts.columns = ['Value', 'Count']
+        # Bar chart of value counts (precomputed per code, most frequent first)
+        value_counts = pd.DataFrame(
+            [(code.get('Name'), layer_data.code_counts[code.get('ID')], layer_data.colors[code.get('ID')])
+             for code in sorted_codes if layer_data.code_counts[code.get('ID')]],
+            columns=['Value', 'Count', 'Color'],
+        ).sort_values('Count', ascending=False, kind='stable')
 
         st.markdown("**Languages per Value:**")
-        st.bar_chart(value_counts.set_index('Value'))
+        st.bar_chart(value_counts.set_index('Value')[['Count']])
 
     with col2:
         # Pie chart
@@ -235,7 +180,7 @@ if map_data:
             values='Count',
             names='Value',
             title='Distribution of Feature Values',
-            color_discrete_sequence=[f'rgb({c[0]}, {c[1]}, {c[2]})' for c in [value_color_map[v] for v in value_counts['Value']]]
+            color_discrete_sequence=[f'rgb({c[0]}, {c[1]}, {c[2]})' for c in value_counts['Color']]
         )
 
         fig.update_traces(textposition='inside', textinfo='percent+label')
@@ -252,39 +197,63 @@ if map_data:
             hide_index=True
         )
 
-        # Download button
-        csv = display_df.to_csv(index=False)
-        st.download_button(
-            label=f"📥 Download {feature.get('ID')} Distribution Data",
-            data=csv,
-            file_name=f"wals_feature_{feature.get('ID')}_distribution.csv",
-            mime="text/csv"
+        # Download buttons (files are generated on click)
+        download_buttons(
+            f"📥 Download {feature.get('ID')} Distribution Data",
+            lambda: display_df,
+            file_stem=f"wals_feature_{feature.get('ID')}_distribution",
+            version=data_loader.dataset_version,
+            signature=(feature.get('ID'),),
         )
 
     # Geographic patterns analysis
     st.markdown("---")
     st.subheader("🌍 Geographic Patterns")
 
-    # Group by macroarea if possible
-    # This would require joining with language data - simplified version
-    st.info(
-        f"**Observation:** This map shows how **{feature.get('Name')}** varies across "
-        f"{len(languages_with_data)} languages worldwide. Look for clustering patterns "
-        f"that might indicate areal features or genetic relationships."
-    )
+    # Join counts over each language's nearest neighbours, with a permutation test
+    autocorrelation = data_loader.get_feature_autocorrelation(selected_feature_id)
+    if autocorrelation and autocorrelation['same_value'] is not None:
+        col1, col2, col3 = st.columns(3)
+        col1.metric(
+            "Same-value neighbours", f"{autocorrelation['same_value']:.1%}",
+            delta=f"{autocorrelation['same_value'] - autocorrelation['expected']:+.1%} vs random",
+            help=f"Share of the {autocorrelation['edges']} nearest-neighbour links between languages "
+                 "with data that join two languages with the same value",
+        )
+        col2.metric("Expected at random", f"{autocorrelation['expected']:.1%}")
+        if autocorrelation['z_score'] is not None:
+            col3.metric("Permutation test", f"p = {autocorrelation['p_value']:.3f}",
+                        help=f"z = {autocorrelation['z_score']:.1f} over "
+                             f"{autocorrelation['permutations']} random reassignments of the values")
+
+        if autocorrelation['p_value'] is not None and autocorrelation['p_value'] <= 0.01:
+            st.info(
+                f"**{feature.get('Name')}** is clustered geographically: neighbouring languages share "
+                f"a value more often than at random (p = {autocorrelation['p_value']:.3f}). "
+                "This may reflect language contact (areal features) or genealogical relatedness."
+            )
+        else:
+            st.info(
+                f"Neighbouring languages share values of **{feature.get('Name')}** about as often as "
+                "they would at random: there is no clear geographic clustering."
+            )
+    else:
+        st.info(
+            f"**Observation:** This map shows how **{feature.get('Name')}** varies across "
+            f"{layer_data.languages_with_data} languages worldwide. Too few neighbouring languages "
+            "have data to test for clustering."
+        )
 
     # Top families for each value
     st.markdown("**Top Language Families by Value:**")
 
     for code in sorted_codes[:5]:  # Show top 5 values
         code_name = code.get('Name')
-        languages_with_value = df[df['value'] == code_name]
-
-        if len(languages_with_value) > 0:
-            family_counts = languages_with_value['family'].value_counts().head(5)
+        total = layer_data.code_counts.get(code.get('ID'), 0)
 
-            st.markdown(f"**{code_name}** ({len(languages_with_value)} languages):")
-            for family, count in family_counts.items():
+        if total > 0:
+            st.markdown(f"**{code_name}** ({total} languages):")
+            for family, count in layer_data.family_counts[code.get('ID')][:5]:
                 st.markdown(f"- {family}: {count} languages")
             st.markdown("")
 
@@ -4,9 +4,275 @@ Handles loading and caching of CLDF data with Streamlit optimizations
 """
 
 import streamlit as st
+import pandas as pd
+import numpy as np
 from pathlib import Path
+from types import MappingProxyType
 import csv
 import math
+import sys
+
+# The value view, code matrix and analyses are shared with the Flask explorer
+sys.path.append(str(Path(__file__).parent.parent / 'wals_app'))
+from value_view import ValueView
+from genealogy import node_kind, split_rows
+from code_matrix import CodeMatrix
+from cache import dataset_fingerprint, dataset_version
+from geography import NeighbourGraph
+import aggregation
+import areal
+import clustering
+import stability
+
+# Orderings offered for a feature's value listing (see get_feature_values)
+VALUE_SORTS = ('language', 'family', 'code')
+
+
+def _read_csv(filepath):
+    """Read a CSV file into a tuple of read-only rows"""
+    if not filepath.exists():
+        return ()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return tuple(MappingProxyType(row) for row in csv.DictReader(f))
+
+
+def _group_by(rows, key):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.get(key), []).append(row)
+    return MappingProxyType({k: tuple(v) for k, v in groups.items()})
+
+
+class WALSDataset:
+    """Immutable, indexed snapshot of a CLDF dataset
+
+    Instances are shared between sessions and reruns through
+    ``st.cache_resource``, so nothing here may be mutated.
+    """
+    __slots__ = ('version', 'languages', 'genealogy_nodes', 'features', 'codes', 'values',
+                 'languages_by_id', 'genealogy_nodes_by_id', 'features_by_id', 'codes_by_id',
+                 'codes_by_feature', 'value_view', 'values_by_language', 'values_by_feature',
+                 'families', 'macroareas')
+
+    def __init__(self, version, languages, features, codes, values, chapters=(), areas=()):
+        self.version = version
+        # languages.csv also holds family/subfamily/genus rows; keep them apart
+        languages, nodes = split_rows(languages)
+        self.languages = tuple(languages)
+        self.genealogy_nodes = tuple(nodes)
+        self.features = tuple(features)
+        self.codes = tuple(codes)
+        self.values = tuple(values)
+
+        self.languages_by_id = MappingProxyType({l.get('ID'): l for l in self.languages})
+        self.genealogy_nodes_by_id = MappingProxyType({n.get('ID'): n for n in self.genealogy_nodes})
+        self.features_by_id = MappingProxyType({f.get('ID'): f for f in self.features})
+        self.codes_by_id = MappingProxyType({c.get('ID'): c for c in self.codes})
+        self.codes_by_feature = _group_by(self.codes, 'Parameter_ID')
+        self.value_view = ValueView(self.languages, self.features, self.codes, self.values,
+                                    chapters=chapters, areas=areas)
+        self.values_by_language = self.value_view.by_language
+        self.values_by_feature = self.value_view.by_feature
+        self.families = tuple(sorted({l.get('Family', '') for l in self.languages} - {''}))
+        self.macroareas = tuple(sorted({l.get('Macroarea', '') for l in self.languages} - {''}))
+
+
+@st.cache_resource(show_spinner="Loading WALS data...", max_entries=4)
+def load_dataset(resolved_path, fingerprint):
+    """Load and index a CLDF directory (cached per resolved path and file fingerprint)"""
+    cldf_path = Path(resolved_path)
+    version = dataset_version(resolved_path, fingerprint)
+    return WALSDataset(
+        version,
+        languages=_read_csv(cldf_path / 'languages.csv'),
+        features=_read_csv(cldf_path / 'parameters.csv'),
+        codes=_read_csv(cldf_path / 'codes.csv'),
+        values=_read_csv(cldf_path / 'values.csv'),
+        chapters=_read_csv(cldf_path / 'chapters.csv'),
+        areas=_read_csv(cldf_path / 'areas.csv'),
+    )
+
+
+def _frame(rows, columns):
+    """DataFrame with the given string columns (missing columns become empty strings)"""
+    return pd.DataFrame({col: [row.get(col, '') or '' for row in rows] for col in columns})
+
+
+# DataFrames are built once per dataset version and shared like the dataset
+# itself; pages must treat them as read-only (filter with masks, slice, copy).
+
+@st.cache_resource(max_entries=4)
+def _languages_frame(version, _dataset):
+    df = _frame(_dataset.languages, ['ID', 'Name', 'Family', 'Subfamily', 'Genus', 'Macroarea',
+                                     'ISO639P3code', 'Glottocode', 'Latitude', 'Longitude'])
+    for col in ('Family', 'Genus', 'Macroarea'):
+        df[col] = df[col].astype('category')
+    for col in ('Latitude', 'Longitude'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    # Lower-cased search keys so text filters do not re-lower every rerun
+    df['name_lower'] = df['Name'].str.lower()
+    df['id_lower'] = df['ID'].str.lower()
+    return df
+
+
+@st.cache_resource(max_entries=4)
+def _features_frame(version, _dataset):
+    df = _frame(_dataset.features, ['ID', 'Name', 'Description', 'Chapter_ID'])
+    df['name_lower'] = df['Name'].str.lower()
+    df['id_lower'] = df['ID'].str.lower()
+    return df
+
+
+@st.cache_resource(max_entries=4)
+def _codes_frame(version, _dataset):
+    df = _frame(_dataset.codes, ['ID', 'Parameter_ID', 'Name', 'Description', 'Number', 'icon'])
+    df['Parameter_ID'] = df['Parameter_ID'].astype('category')
+    df['Number'] = pd.to_numeric(df['Number'], errors='coerce').astype('Int64')
+    return df
+
+
+@st.cache_resource(max_entries=4)
+def _values_frame(version, _dataset):
+    df = _frame(_dataset.values, ['ID', 'Language_ID', 'Parameter_ID', 'Code_ID', 'Value'])
+    for col in ('Language_ID', 'Parameter_ID', 'Code_ID'):
+        df[col] = df[col].astype('category')
+    return df
+
+
+# Colours assigned to a feature's codes, in codes.csv order
+VALUE_PALETTE = (
+    (231, 76, 60),    # Red
+    (52, 152, 219),   # Blue
+    (46, 204, 113),   # Green
+    (241, 196, 15),   # Yellow
+    (155, 89, 182),   # Purple
+    (230, 126, 34),   # Orange
+    (26, 188, 156),   # Turquoise
+    (236, 240, 241),  # Light gray
+    (149, 165, 166),  # Gray
+    (192, 57, 43),    # Dark red
+)
+
+
+def _code_number(code):
+    try:
+        return int(code.get('Number') or 0)
+    except ValueError:
+        return 0
+
+
+class FeatureLayer:
+    """Map points and value summaries for one feature (shared, read-only)
+
+    ``points`` has one row per language with a value and coordinates
+    (lat, lon, name, id, family, code_id, value, color_index), where
+    color_index indexes VALUE_PALETTE. ``code_counts`` maps
+    every code ID to its number of points and ``family_counts`` maps code IDs
+    to (family, count) pairs, largest first.
+    """
+    __slots__ = ('feature_id', 'codes', 'colors', 'points', 'code_counts',
+                 'family_counts', 'languages_with_data', 'languages_with_coords')
+
+    def __init__(self, feature_id, codes, colors, points, code_counts, family_counts,
+                 languages_with_coords):
+        self.feature_id = feature_id
+        self.codes = codes
+        self.colors = colors
+        self.points = points
+        self.code_counts = code_counts
+        self.family_counts = family_counts
+        self.languages_with_data = points['id'].nunique()
+        self.languages_with_coords = languages_with_coords
+
+
+@st.cache_resource(max_entries=64)
+def _feature_layer(version, feature_id, _dataset, _languages):
+    codes = _dataset.codes_by_feature.get(feature_id, ())
+    color_index = {c.get('ID'): i % len(VALUE_PALETTE) for i, c in enumerate(codes)}
+    colors = {code_id: list(VALUE_PALETTE[i]) for code_id, i in color_index.items()}
+    names = {c.get('ID'): c.get('Name') for c in codes}
+
+    located = _languages['Latitude'].notna() & _languages['Longitude'].notna()
+    rows = [v for v in _dataset.value_view.for_feature(feature_id)
+            if v.get('Code_ID') in colors and v['Latitude'] is not None and v['Longitude'] is not None]
+    points = pd.DataFrame({
+        'lat': pd.Series([v['Latitude'] for v in rows], dtype='float64'),
+        'lon': pd.Series([v['Longitude'] for v in rows], dtype='float64'),
+        'name': pd.Series([v['Language_Name'] for v in rows], dtype=object),
+        'id': pd.Series([v['Language_ID'] for v in rows], dtype=object),
+        'family': pd.Series([v['Family'] for v in rows], dtype=object),
+        'code_id': pd.Series([v['Code_ID'] for v in rows], dtype=object),
+        'value': pd.Series([v['Code_Name'] for v in rows], dtype=object),
+        'color_index': pd.Series([color_index[v['Code_ID']] for v in rows], dtype='int64'),
+    })
+
+    # A single grouping gives both the per-family breakdown and the per-code totals
+    by_code_family = points.groupby(['code_id', 'family'], sort=False).size()
+    code_counts = dict.fromkeys(colors, 0)
+    family_counts = {code_id: [] for code_id in colors}
+    for (code_id, family), count in by_code_family.items():
+        code_counts[code_id] += int(count)
+        family_counts[code_id].append((family, int(count)))
+    for pairs in family_counts.values():
+        pairs.sort(key=lambda pair: (-pair[1], pair[0]))
+
+    return FeatureLayer(
+        feature_id,
+        codes=tuple(sorted(codes, key=_code_number)),
+        colors=MappingProxyType(colors),
+        points=points,
+        code_counts=MappingProxyType(code_counts),
+        family_counts=MappingProxyType({k: tuple(v) for k, v in family_counts.items()}),
+        languages_with_coords=int(located.sum()),
+    )
+
+
+@st.cache_resource(max_entries=64)
+def _feature_values_index(version, feature_id, _dataset):
+    """Value rows of one feature and a pre-sorted position array per VALUE_SORTS"""
+    columns = ['Language_ID', 'Language_Name', 'Family', 'Code_ID', 'Code_Name', 'Code_Number']
+    df = pd.DataFrame([[v.get(col) for col in columns] for v in _dataset.value_view.for_feature(feature_id)],
+                      columns=columns).fillna({'Language_ID': '', 'Code_ID': ''})
+    name_key = df['Language_Name'].str.lower()
+    haystack = name_key + '\n' + df['Language_ID'].str.lower()
+    orders = {
+        # np.lexsort sorts by the last key first
+        'language': np.lexsort((df['Language_ID'], name_key)),
+        'family': np.lexsort((name_key, df['Family'].str.lower())),
+        'code': np.lexsort((name_key, df['Code_Number'])),
+    }
+    return df, haystack, orders
+
+
+@st.cache_resource(max_entries=4)
+def _code_matrix(version, _dataset):
+    """Language x feature CodeMatrix of a dataset (see wals_app/code_matrix.py)"""
+    return CodeMatrix(_dataset.languages, _dataset.features, _dataset.value_view)
+
+
+@st.cache_resource(max_entries=4, show_spinner="Computing feature stability...")
+def _stability_table(version, _matrix):
+    """Genealogical stability of all features (also cached on disk per version)"""
+    return stability.stability_table(_matrix, version)
+
+
+@st.cache_resource(max_entries=4, show_spinner="Building neighbour graph...")
+def _neighbour_graph(version, _matrix):
+    """k-nearest-neighbour graph of a dataset (also cached on disk per version)"""
+    return NeighbourGraph.cached(_matrix, version)
+
+
+@st.cache_resource(max_entries=256, show_spinner="Testing spatial clustering...")
+def _feature_autocorrelation(version, feature_id, _matrix, _graph):
+    """Join-count statistics of one feature, from the disk-cached table when available"""
+    return areal.feature_autocorrelation(_matrix, _graph, feature_id, table=areal.cached_table(version))
+
+
+@st.cache_resource(max_entries=16, show_spinner="Clustering languages...")
+def _clustering(version, k, feature_ids, min_coverage, _matrix):
+    """k-modes clustering of language profiles (also cached on disk per version)"""
+    return clustering.Clustering.cached(_matrix, version, k, list(feature_ids), min_coverage)
+
 
 class WALSStreamlitLoader:
     def __init__(self, cldf_path=None):
@@ -20,44 +286,156 @@ class WALSStreamlitLoader:
         self.data_available = self.cldf_path.exists()
 
         # Data will be loaded lazily
+        self._dataset = None
         self._languages = None
         self._features = None
         self._codes = None
         self._values = None
 
-    @st.cache_data
-    def _load_csv(_self, filename):
-        """Load a CSV file from CLDF directory (cached)"""
-        filepath = _self.cldf_path / filename
-        if not filepath.exists():
-            return []
-
-        data = []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data.append(row)
-        return data
-
     def _ensure_data_loaded(self):
         """Ensure all data is loaded (lazy loading)"""
-        if self._languages is None:
+        if self._dataset is None:
             if self.data_available:
                 self._load_cldf_data()
             else:
                 self._load_sample_data()
 
+    def _set_dataset(self, dataset):
+        self._dataset = dataset
+        self._languages = dataset.languages
+        self._features = dataset.features
+        self._codes = dataset.codes
+        self._values = dataset.values
+
     def _load_cldf_data(self):
         """Load data from CLDF files"""
         try:
-            self._languages = self._load_csv('languages.csv')
-            self._features = self._load_csv('parameters.csv')
-            self._codes = self._load_csv('codes.csv')
-            self._values = self._load_csv('values.csv')
+            resolved = self.cldf_path.resolve()
+            self._set_dataset(load_dataset(str(resolved), dataset_fingerprint(resolved)))
         except Exception as e:
             st.error(f"Error loading CLDF data: {e}")
             self._load_sample_data()
 
+    @property
+    def dataset_version(self):
+        """Short hash identifying the loaded dataset (path and file fingerprints)"""
+        self._ensure_data_loaded()
+        return self._dataset.version
+
+    def languages_df(self):
+        """Languages as a shared, read-only DataFrame
+
+        Family/Genus/Macroarea are categorical, Latitude/Longitude are floats
+        (NaN when missing); name_lower/id_lower hold lower-cased search keys.
+        """
+        self._ensure_data_loaded()
+        return _languages_frame(self._dataset.version, self._dataset)
+
+    def features_df(self):
+        """Features (parameters) as a shared, read-only DataFrame"""
+        self._ensure_data_loaded()
+        return _features_frame(self._dataset.version, self._dataset)
+
+    def codes_df(self):
+        """Value codes as a shared, read-only DataFrame (Number is a nullable integer)"""
+        self._ensure_data_loaded()
+        return _codes_frame(self._dataset.version, self._dataset)
+
+    def values_df(self):
+        """Values as a shared, read-only DataFrame with categorical ID columns"""
+        self._ensure_data_loaded()
+        return _values_frame(self._dataset.version, self._dataset)
+
+    def feature_layer(self, feature_id):
+        """Cached FeatureLayer (map points, per-code and per-family counts) for a feature"""
+        self._ensure_data_loaded()
+        return _feature_layer(self._dataset.version, feature_id, self._dataset, self.languages_df())
+
+    def code_matrix(self):
+        """Cached CodeMatrix of the loaded dataset"""
+        self._ensure_data_loaded()
+        return _code_matrix(self._dataset.version, self._dataset)
+
+    def get_feature_stability(self, feature_id):
+        """Get the genealogical stability metrics of one feature, or None"""
+        self._ensure_data_loaded()
+        return _stability_table(self._dataset.version, self.code_matrix()).get(feature_id)
+
+    def neighbour_graph(self):
+        """Cached NeighbourGraph of the loaded dataset"""
+        self._ensure_data_loaded()
+        return _neighbour_graph(self._dataset.version, self.code_matrix())
+
+    def get_feature_autocorrelation(self, feature_id):
+        """Get the spatial autocorrelation (join-count) statistics of one feature, or None"""
+        self._ensure_data_loaded()
+        if feature_id not in self.code_matrix().feature_index:
+            return None
+        return _feature_autocorrelation(self._dataset.version, feature_id, self.code_matrix(), self.neighbour_graph())
+
+    def clustering(self, k=clustering.N_CLUSTERS, feature_ids=(), min_coverage=clustering.MIN_COVERAGE):
+        """Cached Clustering of the languages' typological profiles (all features when none given)"""
+        self._ensure_data_loaded()
+        feature_ids, min_coverage = clustering.parameters(feature_ids, min_coverage)
+        return _clustering(self._dataset.version, k, feature_ids, min_coverage, self.code_matrix())
+
+    def get_feature_distribution(self, feature_id, unit='language', weighting='majority'):
+        """Get {code name: count} for a feature, counting languages, genera or families
+
+        Same semantics as WALSDataLoader.get_feature_distribution.
+        """
+        aggregation.check_mode(unit, weighting)
+        codes = sorted(self.get_codes_for_feature(feature_id), key=_code_number)
+        distribution = {code.get('Name', 'Unknown'): 0 for code in codes}
+        matrix = self.code_matrix()
+        if feature_id not in matrix.feature_index:
+            return distribution
+        weights = aggregation.distribution(matrix, feature_id, unit, weighting)
+        for code in codes:
+            number = _code_number(code)
+            if 0 < number < len(weights):
+                weight = float(weights[number])
+                distribution[code.get('Name', 'Unknown')] = int(weight) if unit == 'language' else round(weight, 3)
+        return distribution
+
+    def get_feature_values(self, feature_id, page=1, per_page=50, sort='language', order='asc',
+                           code='', search=''):
+        """Get a sorted, filtered page of the languages with data for a feature
+
+        Same result shape as WALSDataLoader.get_feature_values; the per-feature
+        rows and sort orders are cached per dataset version.
+        """
+        self._ensure_data_loaded()
+        df, haystack, orders = _feature_values_index(self._dataset.version, feature_id, self._dataset)
+        if sort not in VALUE_SORTS:
+            sort = 'language'
+        positions = orders[sort]
+        if order == 'desc':
+            positions = positions[::-1]
+
+        if code or search:
+            mask = np.ones(len(df), dtype=bool)
+            if code:
+                mask &= (df['Code_ID'] == code).to_numpy()
+            if search:
+                mask &= haystack.str.contains(search.lower(), regex=False).to_numpy()
+            positions = positions[mask[positions]]
+
+        total = len(positions)
+        total_pages = math.ceil(total / per_page) if total > 0 else 1
+        start = (page - 1) * per_page
+
+        return {
+            'items': df.iloc[positions[start:start + per_page]].to_dict('records'),
+            'total': total,
+            'feature_total': len(df),
+            'page': page,
+            'per_page': per_page,
+            'total_pages': total_pages,
+            'sort': sort,
+            'order': 'desc' if order == 'desc' else 'asc',
+        }
+
     def _load_sample_data(self):
         """Load sample data for demonstration"""
         self._languages = [
@@ -110,6 +488,14 @@ class WALSStreamlitLoader:
             {'ID': 'ara-81A', 'Language_ID': 'ara', 'Parameter_ID': '81A', 'Code_ID': '81A-3', 'Value': '3'},
         ]
 
+        self._set_dataset(WALSDataset(
+            'sample',
+            languages=(MappingProxyType(row) for row in self._languages),
+            features=(MappingProxyType(row) for row in self._features),
+            codes=(MappingProxyType(row) for row in self._codes),
+            values=(MappingProxyType(row) for row in self._values),
+        ))
+
     def get_statistics(self):
         """Get basic statistics about the dataset"""
         self._ensure_data_loaded()
@@ -129,30 +515,23 @@ class WALSStreamlitLoader:
     def get_language(self, language_id):
         """Get a specific language by ID"""
         self._ensure_data_loaded()
-        for lang in self._languages:
-            if lang.get('ID') == language_id:
-                return lang
-        return None
+        return self._dataset.languages_by_id.get(language_id)
+
+    def get_genealogy_nodes(self, kind=''):
+        """Get the family/subfamily/genus rows of languages.csv, optionally of one kind"""
+        self._ensure_data_loaded()
+        nodes = self._dataset.genealogy_nodes
+        return [n for n in nodes if not kind or node_kind(n.get('ID')) == kind]
 
     def get_families(self):
         """Get list of all language families"""
         self._ensure_data_loaded()
-        families = set()
-        for lang in self._languages:
-            family = lang.get('Family', '')
-            if family:
-                families.add(family)
-        return sorted(families)
+        return list(self._dataset.families)
 
     def get_macroareas(self):
         """Get list of all macroareas"""
         self._ensure_data_loaded()
-        areas = set()
-        for lang in self._languages:
-            area = lang.get('Macroarea', '')
-            if area:
-                areas.add(area)
-        return sorted(areas)
+        return list(self._dataset.macroareas)
 
     def get_all_features(self):
         """Get all features"""
@@ -162,53 +541,22 @@ class WALSStreamlitLoader:
     def get_feature(self, feature_id):
         """Get a specific feature by ID"""
         self._ensure_data_loaded()
-        for feature in self._features:
-            if feature.get('ID') == feature_id:
-                return feature
-        return None
+        return self._dataset.features_by_id.get(feature_id)
 
     def get_codes_for_feature(self, feature_id):
         """Get all possible codes/values for a feature"""
         self._ensure_data_loaded()
-        return [c for c in self._codes if c.get('Parameter_ID') == feature_id]
+        return list(self._dataset.codes_by_feature.get(feature_id, ()))
 
     def get_values_for_language(self, language_id):
         """Get all feature values for a specific language"""
         self._ensure_data_loaded()
-        values = [v for v in self._values if v.get('Language_ID') == language_id]
-
-        # Enrich with feature and code information
-        enriched = []
-        for value in values:
-            feature = self.get_feature(value.get('Parameter_ID'))
-            code = next((c for c in self._codes if c.get('ID') == value.get('Code_ID')), None)
-
-            enriched.append({
-                **value,
-                'Feature_Name': feature.get('Name', '') if feature else '',
-                'Code_Name': code.get('Name', '') if code else ''
-            })
-
-        return enriched
+        return list(self._dataset.value_view.for_language(language_id))
 
     def get_values_for_feature(self, feature_id):
         """Get all language values for a specific feature"""
         self._ensure_data_loaded()
-        values = [v for v in self._values if v.get('Parameter_ID') == feature_id]
-
-        # Enrich with language information
-        enriched = []
-        for value in values:
-            language = self.get_language(value.get('Language_ID'))
-            code = next((c for c in self._codes if c.get('ID') == value.get('Code_ID')), None)
-
-            enriched.append({
-                **value,
-                'Language_Name': language.get('Name', '') if language else '',
-                'Code_Name': code.get('Name', '') if code else ''
-            })
-
-        return enriched
+        return list(self._dataset.value_view.for_feature(feature_id))
 
     def search_languages(self, query):
         """Search languages by name or ID"""
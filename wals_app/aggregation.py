@@ -0,0 +1,96 @@
+"""
+Genus- and family-level aggregation of WALS feature values
+Counts code distributions and cross-tabulations per genealogical unit
+instead of per language, vectorized over the CodeMatrix
+"""
+import numpy as np
+
+from code_matrix import MISSING
+
+UNITS = ('language', 'genus', 'family')
+WEIGHTINGS = ('majority', 'proportional')
+
+
+def check_mode(unit, weighting):
+    """Raise ValueError for an unknown unit or weighting"""
+    if unit not in UNITS:
+        raise ValueError(f'unknown unit: {unit} (expected one of {", ".join(UNITS)})')
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f'unknown weighting: {weighting} (expected one of {", ".join(WEIGHTINGS)})')
+
+
+def _units(matrix, unit):
+    """Unit index per language; unclassified languages count as units of their own"""
+    n = len(matrix.language_ids)
+    if unit == 'language':
+        return np.arange(n)
+    group_of = matrix.genus_of if unit == 'genus' else matrix.family_of
+    n_groups = len(matrix.genus_names if unit == 'genus' else matrix.family_names)
+    return np.where(group_of >= 0, group_of, n_groups + np.arange(n))
+
+
+def _weigh(counts, weighting):
+    """Collapse a (units x cells) count matrix into one weight per cell
+
+    ``proportional`` splits each unit's weight of 1 over its cells by
+    language count; ``majority`` gives it to the unit's most frequent cell,
+    shared equally between tied cells.
+    """
+    if not len(counts):
+        return np.zeros(counts.shape[1])
+    if weighting == 'proportional':
+        return (counts / counts.sum(axis=1, keepdims=True)).sum(axis=0)
+    modes = counts == counts.max(axis=1, keepdims=True)
+    return (modes / modes.sum(axis=1, keepdims=True)).sum(axis=0)
+
+
+def _unit_counts(unit_of, cells, n_cells):
+    """(units x cells) language counts, one row per unit that occurs"""
+    used, unit_of = np.unique(unit_of, return_inverse=True)
+    counts = np.bincount(unit_of * n_cells + cells, minlength=len(used) * n_cells)
+    return counts.reshape(len(used), n_cells)
+
+
+def distribution(matrix, feature_id, unit='genus', weighting='majority'):
+    """Weight per code number of a feature (index = code number, 0 unused)
+
+    For ``unit='language'`` the weights are plain language counts; otherwise
+    every genus or family with data sums to 1 (see _weigh).
+    """
+    check_mode(unit, weighting)
+    column = matrix.column(feature_id)
+    present = np.flatnonzero(column != MISSING)
+    codes = column[present].astype(np.intp)
+    n_cells = int(codes.max()) + 1 if len(codes) else 1
+    if unit == 'language':
+        return np.bincount(codes, minlength=n_cells).astype(float)
+    unit_of = _units(matrix, unit)
+    return _weigh(_unit_counts(unit_of[present], codes, n_cells), weighting)
+
+
+def crosstab(matrix, feature_a, feature_b, unit='genus', weighting='majority'):
+    """(rows x columns) weights of code pairs for languages with both features
+
+    Row i / column j are code numbers i and j of feature_a / feature_b. In
+    genus and family mode each unit's weight is spread over code pairs, so a
+    genus with mixed pairs counts once in total.
+    """
+    check_mode(unit, weighting)
+    a, b = matrix.column(feature_a), matrix.column(feature_b)
+    present = np.flatnonzero((a != MISSING) & (b != MISSING))
+    codes_a, codes_b = a[present].astype(np.intp), b[present].astype(np.intp)
+    n_a = int(codes_a.max()) + 1 if len(present) else 1
+    n_b = int(codes_b.max()) + 1 if len(present) else 1
+    cells = codes_a * n_b + codes_b
+    if unit == 'language':
+        weights = np.bincount(cells, minlength=n_a * n_b).astype(float)
+    else:
+        unit_of = _units(matrix, unit)
+        weights = _weigh(_unit_counts(unit_of[present], cells, n_a * n_b), weighting)
+    return weights.reshape(n_a, n_b)
+
+
+def unit_count(matrix, feature_ids=(), unit='genus'):
+    """Number of units with at least one language coding all the given features"""
+    unit_of = _units(matrix, unit)
+    return len(np.unique(unit_of[matrix.has_data(feature_ids)]))
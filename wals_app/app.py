@@ -4,13 +4,29 @@ WALS Local Explorer - A Flask web application for exploring WALS linguistic data
 import os
 from flask import Flask, render_template, request, jsonify, send_from_directory
 from data_loader import WALSDataLoader
+import metrics
+import aggregation
+import clustering
+import profiling
 import json
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'wals-local-explorer-key'
 
-# Initialize data loader
-data_loader = WALSDataLoader()
+# Request and data loader instrumentation, exposed on /metrics
+metrics_registry = metrics.init_app(app)
+
+# Opt-in cProfile dumps per request (see profiling.py for WALS_PROFILE* settings)
+profiling.init_app(app)
+
+# Initialize data loader (WALS_CLDF_PATH overrides the bundled cldf/ directory)
+data_loader = metrics.instrument_loader(
+    WALSDataLoader(cldf_path=os.environ.get('WALS_CLDF_PATH') or None),
+    metrics_registry
+)
+
+# Nearby languages listed on a language page
+NEARBY_LIMIT = 50
 
 @app.route('/')
 def index():
@@ -25,14 +41,21 @@ def languages():
     search = request.args.get('search', '')
     family = request.args.get('family', '')
     macroarea = request.args.get('macroarea', '')
+    query = request.args.get('q', '').strip()
 
-    languages_data = data_loader.get_languages(
-        page=page,
-        per_page=50,
-        search=search,
-        family=family,
-        macroarea=macroarea
-    )
+    query_error = None
+    try:
+        languages_data = data_loader.get_languages(
+            page=page,
+            per_page=50,
+            search=search,
+            family=family,
+            macroarea=macroarea,
+            query=query
+        )
+    except ValueError as e:
+        query_error = str(e)
+        languages_data = {'items': [], 'total_pages': 1}
 
     families = data_loader.get_families()
     macroareas = data_loader.get_macroareas()
@@ -46,7 +69,9 @@ def languages():
         macroareas=macroareas,
         search=search,
         selected_family=family,
-        selected_macroarea=macroarea
+        selected_macroarea=macroarea,
+        query=query,
+        query_error=query_error
     )
 
 @app.route('/language/<language_id>')
@@ -57,7 +82,20 @@ def language_detail(language_id):
         return render_template('404.html', message=f"Language {language_id} not found"), 404
 
     values = data_loader.get_values_for_language(language_id)
-    return render_template('language_detail.html', language=language, values=values)
+    radius = max(min(request.args.get('km', 500, type=float), 20000), 0)
+    nearby = data_loader.get_languages_within(language_id, radius, limit=NEARBY_LIMIT + 1)
+    return render_template('language_detail.html', language=language, values=values,
+                           radius=radius, nearby=nearby[:NEARBY_LIMIT],
+                           nearby_truncated=len(nearby) > NEARBY_LIMIT)
+
+@app.route('/api/language/<language_id>/nearby')
+def api_language_nearby(language_id):
+    """API endpoint for the languages within ?km= of a language (default 500)"""
+    if data_loader.get_language(language_id) is None:
+        return jsonify({'error': f'Language {language_id} not found'}), 404
+    radius = request.args.get('km', 500, type=float)
+    limit = request.args.get('limit', None, type=int)
+    return jsonify(data_loader.get_languages_within(language_id, radius, limit=limit))
 
 @app.route('/features')
 def features():
@@ -93,13 +131,53 @@ def feature_detail(feature_id):
         return render_template('404.html', message=f"Feature {feature_id} not found"), 404
 
     codes = data_loader.get_codes_for_feature(feature_id)
-    values = data_loader.get_values_for_feature(feature_id)
+    values_data = data_loader.get_feature_values(
+        feature_id,
+        page=request.args.get('page', 1, type=int),
+        per_page=50,
+        sort=request.args.get('sort', 'language'),
+        order=request.args.get('order', 'asc'),
+        code=request.args.get('code', ''),
+        search=request.args.get('search', '')
+    )
 
     return render_template(
         'feature_detail.html',
         feature=feature,
         codes=codes,
-        values=values
+        stability=data_loader.get_feature_stability(feature_id),
+        values=values_data['items'],
+        values_total=values_data['total'],
+        feature_total=values_data['feature_total'],
+        page=values_data['page'],
+        total_pages=values_data['total_pages'],
+        sort=values_data['sort'],
+        order=values_data['order'],
+        selected_code=request.args.get('code', ''),
+        search=request.args.get('search', '')
+    )
+
+@app.route('/universals')
+def universals():
+    """Browse implicational universals (A=x -> B=y) mined from the data"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    filters = {
+        'feature': request.args.get('feature', '').strip(),
+        'min_confidence': request.args.get('min_confidence', 0, type=float),
+        'min_support': request.args.get('min_support', 0, type=int),
+        'min_genera': request.args.get('min_genera', 0, type=int),
+        'sort': request.args.get('sort', 'confidence'),
+    }
+    universals_data = data_loader.get_universals(page=page, per_page=50, **filters)
+    filters['sort'] = universals_data['sort']
+
+    return render_template(
+        'universals.html',
+        rules=universals_data['items'],
+        total=universals_data['total'],
+        page=page,
+        total_pages=universals_data['total_pages'],
+        filters=filters
     )
 
 @app.route('/search')
@@ -135,14 +213,125 @@ def api_languages_geo():
 
 @app.route('/api/feature/<feature_id>/distribution')
 def api_feature_distribution(feature_id):
-    """API endpoint for feature value distribution"""
-    distribution = data_loader.get_feature_distribution(feature_id)
+    """API endpoint for feature value distribution (?unit=genus|family&weighting=majority|proportional)"""
+    try:
+        distribution = data_loader.get_feature_distribution(
+            feature_id,
+            unit=request.args.get('unit', 'language'),
+            weighting=request.args.get('weighting', 'majority'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(distribution)
 
+@app.route('/api/feature/<feature_id>/stability')
+def api_feature_stability(feature_id):
+    """API endpoint for a feature's genealogical stability metrics"""
+    stability = data_loader.get_feature_stability(feature_id)
+    if stability is None:
+        return jsonify({'error': f'Feature {feature_id} not found'}), 404
+    return jsonify(stability)
+
+@app.route('/api/feature/<feature_id>/autocorrelation')
+def api_feature_autocorrelation(feature_id):
+    """API endpoint for a feature's spatial autocorrelation (join counts over nearest neighbours)"""
+    result = data_loader.get_feature_autocorrelation(feature_id)
+    if result is None:
+        return jsonify({'error': f'Feature {feature_id} not found'}), 404
+    return jsonify(result)
+
+@app.route('/api/crosstab')
+def api_crosstab():
+    """API endpoint for the contingency table of two features (?a=81A&b=83A)"""
+    feature_a, feature_b = request.args.get('a', ''), request.args.get('b', '')
+    try:
+        table = data_loader.get_feature_crosstab(
+            feature_a, feature_b,
+            unit=request.args.get('unit', 'language'),
+            weighting=request.args.get('weighting', 'majority'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if table is None:
+        return jsonify({'error': f'Feature {feature_a or "?"} or {feature_b or "?"} not found'}), 404
+    return jsonify(table)
+
+@app.route('/api/universals')
+def api_universals():
+    """API endpoint for implicational universals (?feature=&min_confidence=&min_support=&min_genera=&sort=)"""
+    return jsonify(data_loader.get_universals(
+        page=max(request.args.get('page', 1, type=int), 1),
+        per_page=max(1, min(request.args.get('per_page', 100, type=int), 1000)),
+        feature=request.args.get('feature', '').strip(),
+        min_confidence=request.args.get('min_confidence', 0, type=float),
+        min_support=request.args.get('min_support', 0, type=int),
+        min_genera=request.args.get('min_genera', 0, type=int),
+        sort=request.args.get('sort', 'confidence'),
+    ))
+
+@app.route('/api/query')
+def api_query():
+    """API endpoint for a boolean language query (?q=81A:1 AND (85A:2 OR 85A:3) AND macroarea:Africa)"""
+    try:
+        result = data_loader.query_languages(
+            request.args.get('q', ''),
+            page=max(request.args.get('page', 1, type=int), 1),
+            per_page=max(1, min(request.args.get('per_page', 100, type=int), 1000)),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    fields = ('ID', 'Name', 'Genus', 'Family', 'Macroarea')
+    result['items'] = [{f: l.get(f, '') for f in fields} for l in result['items']]
+    return jsonify(result)
+
+@app.route('/api/clusters')
+def api_clusters():
+    """API endpoint for k-modes clusters of language profiles (?k=6&features=81A,85A&min_coverage=0.2)"""
+    features = [f for f in request.args.get('features', '').split(',') if f]
+    try:
+        clusters = data_loader.get_clusters(
+            k=request.args.get('k', clustering.N_CLUSTERS, type=int),
+            features=features,
+            min_coverage=request.args.get('min_coverage', clustering.MIN_COVERAGE, type=float),
+        )
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': str(e.args[0]) if e.args else str(e)}), 400
+    return jsonify(clusters)
+
+@app.route('/api/genealogy/<node_id>')
+def api_genealogy(node_id):
+    """API endpoint for a genealogy node (family, subfamily, genus or language)"""
+    node = data_loader.get_genealogy_node(node_id, other=request.args.get('lca', ''))
+    if node is None:
+        return jsonify({'error': f'Genealogy node {node_id} not found'}), 404
+    return jsonify(node)
+
+@app.route('/api/sample')
+def api_sample():
+    """API endpoint for a genus- or family-balanced language sample"""
+    features = [f for f in request.args.get('features', '').split(',') if f]
+    try:
+        languages = data_loader.sample_languages(
+            by=request.args.get('by', 'genus'),
+            per_group=request.args.get('per_group', 1, type=int),
+            features=features,
+            preset=request.args.get('preset', ''),
+            groups=request.args.get('groups', None, type=int),
+            seed=request.args.get('seed', None, type=int),
+        )
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': str(e.args[0]) if e.args else str(e)}), 400
+    fields = ('ID', 'Name', 'Genus', 'Family', 'Macroarea')
+    return jsonify({'total': len(languages),
+                    'languages': [{f: l.get(f, '') for f in fields} for l in languages]})
+
 @app.route('/statistics')
 def statistics():
     """Statistics and data visualizations"""
-    stats = data_loader.get_detailed_statistics()
+    unit = request.args.get('unit', 'language')
+    if unit not in aggregation.UNITS:
+        unit = 'language'
+    stats = data_loader.get_detailed_statistics(unit=unit)
     return render_template('statistics.html', stats=stats)
 
 @app.route('/about')
@@ -0,0 +1,153 @@
+"""
+Spatial autocorrelation of WALS features
+Join-count statistics over the nearest-neighbour graph with permutation
+tests, batched over features and cached per dataset version
+
+Usage:
+    python areal.py                     # compute (or load) and list the most clustered features
+    python areal.py --permutations 99   # quicker, coarser p-values
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import cache
+import parallel
+from code_matrix import MISSING
+
+PERMUTATIONS = 999
+
+# Bump when the statistic changes so stale disk cache entries are ignored
+CACHE_NAME = 'areal-v1'
+
+# Permutations evaluated together (bounds memory to ~batch x edges booleans)
+PERMUTATION_BATCH = 128
+
+
+def _edges(neighbours, present):
+    """(source, target) positions among the languages with data, for graph edges between two of them"""
+    rows = np.flatnonzero(present)
+    position = np.full(len(present) + 1, -1, dtype=np.int64)  # index -1 (no neighbour) stays -1
+    position[rows] = np.arange(len(rows))
+    targets = position[neighbours[rows]].ravel()
+    sources = np.repeat(np.arange(len(rows)), neighbours.shape[1])
+    keep = targets >= 0
+    return sources[keep], targets[keep]
+
+
+def join_count(column, neighbours, permutations=PERMUTATIONS, seed=0):
+    """Same-value join statistics of one feature column
+
+    Edges are the nearest-neighbour links between languages that both have
+    a value. ``same_value`` is the share of edges joining equal values;
+    ``expected`` is its mean when values are assigned at random. The
+    permutation test shuffles the values over the same languages and graph;
+    ``p_value`` is the one-sided share of shuffles with at least as many
+    same-value joins (clustering), ``z_score`` is relative to the shuffles.
+    """
+    present = column != MISSING
+    values = column[present]
+    sources, targets = _edges(neighbours, present)
+    m = len(values)
+    result = {'languages': m, 'edges': len(sources), 'same_value': None, 'expected': None,
+              'z_score': None, 'p_value': None, 'permutations': permutations}
+    if not len(sources):
+        return result
+
+    observed = float(np.mean(values[sources] == values[targets]))
+    counts = np.bincount(values).astype(np.int64)
+    expected = float((counts * (counts - 1)).sum() / (m * (m - 1)))
+
+    rng = np.random.default_rng(seed)
+    null = np.empty(permutations)
+    for start in range(0, permutations, PERMUTATION_BATCH):
+        batch = min(PERMUTATION_BATCH, permutations - start)
+        shuffled = rng.permuted(np.broadcast_to(values, (batch, m)), axis=1)
+        null[start:start + batch] = (shuffled[:, sources] == shuffled[:, targets]).mean(axis=1)
+
+    spread = null.std() if permutations else 0
+    result.update(
+        same_value=observed,
+        expected=expected,
+        z_score=float((observed - null.mean()) / spread) if spread > 0 else None,
+        p_value=float((1 + np.count_nonzero(null >= observed)) / (permutations + 1)) if permutations else None,
+    )
+    return result
+
+
+def _compute_chunk(columns, indexes, neighbours, permutations, seed):
+    return [join_count(columns[:, j], neighbours, permutations, seed=(seed, int(index)))
+            for j, index in enumerate(indexes)]
+
+
+def compute_all(matrix, graph, permutations=PERMUTATIONS, seed=0, workers=None):
+    """{feature ID: join_count result} for every feature of a CodeMatrix
+
+    Each feature gets its own random stream derived from ``seed`` and its
+    column, so results do not depend on how features are split over
+    ``workers`` processes.
+    """
+    results = parallel.map_columns(_compute_chunk, matrix.codes,
+                                   (graph.neighbours, permutations, seed), workers)
+    return dict(zip(matrix.feature_ids, results))
+
+
+def _cache_name(permutations):
+    return f'{CACHE_NAME}-p{permutations}'
+
+
+def autocorrelation_table(matrix, graph, version, permutations=PERMUTATIONS, workers=None):
+    """compute_all, cached on disk per dataset version and permutation count"""
+    return cache.cached_json(_cache_name(permutations), version,
+                             lambda: compute_all(matrix, graph, permutations, workers=workers))
+
+
+def cached_table(version, permutations=PERMUTATIONS):
+    """The disk-cached autocorrelation_table of a dataset version, or None if not computed yet"""
+    return cache.load_json(_cache_name(permutations), version)
+
+
+def feature_autocorrelation(matrix, graph, feature_id, permutations=PERMUTATIONS, table=None):
+    """join_count result of one feature, as compute_all would give it
+
+    Taken from ``table`` (a compute_all result) when given and complete,
+    otherwise computed for this feature alone with the same random stream.
+    """
+    if table is not None and feature_id in table:
+        return table[feature_id]
+    index = matrix.feature_columns([feature_id])[0]
+    return join_count(matrix.codes[:, index], graph.neighbours, permutations, seed=(0, index))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cldf', help='CLDF directory (default: ../cldf)')
+    parser.add_argument('--permutations', type=int, default=PERMUTATIONS,
+                        help=f'permutations per feature (default {PERMUTATIONS})')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--top', type=int, default=20, help='features to list (default 20)')
+    args = parser.parse_args(argv)
+
+    from data_loader import WALSDataLoader
+    loader = WALSDataLoader(cldf_path=args.cldf)
+    matrix, graph = loader.get_code_matrix(), loader.get_neighbour_graph()
+
+    start = time.perf_counter()
+    results = autocorrelation_table(matrix, graph, loader.dataset_version, args.permutations, args.workers)
+    print(f'{len(results)} features, {args.permutations} permutations in {time.perf_counter() - start:.2f}s',
+          file=sys.stderr)
+
+    ranked = sorted((m['z_score'], feature_id) for feature_id, m in results.items() if m['z_score'] is not None)
+    print(f'{"feature":8s} {"edges":>7s} {"same":>7s} {"expected":>8s} {"z":>7s} {"p":>7s}  name')
+    for _, feature_id in reversed(ranked[-args.top:]):
+        m = results[feature_id]
+        name = (loader.get_feature(feature_id) or {}).get('Name', '')
+        print(f'{feature_id:8s} {m["edges"]:7d} {m["same_value"]:7.1%} {m["expected"]:8.1%} '
+              f'{m["z_score"]:7.1f} {m["p_value"]:7.3f}  {name}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Packed language bitsets for WALS feature values
+One uint64 bitset over the CodeMatrix rows per (feature, code), per feature
+and per facet value, so set intersections are ANDs and counts are popcounts
+"""
+import numpy as np
+
+from code_matrix import MISSING
+
+# Bits set in each byte value, for numpy versions without bitwise_count
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# Language facets with one bitset per value; CodeMatrix group arrays or sample flags
+FACETS = ('family', 'genus', 'macroarea', 'sample')
+SAMPLES = ('100', '200')
+
+
+def popcount(words):
+    """Number of set bits per bitset (summed over the last axis of uint64 words)"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _BYTE_POPCOUNT[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def pack(mask):
+    """Boolean rows (last axis = languages) as little-endian uint64 words"""
+    mask = np.asarray(mask, dtype=bool)
+    packed = np.packbits(mask, axis=-1, bitorder='little')
+    padding = -packed.shape[-1] % 8
+    if padding:
+        packed = np.concatenate([packed, np.zeros(packed.shape[:-1] + (padding,), dtype=np.uint8)], axis=-1)
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def _group_bits(group_of, n_groups, words):
+    """(n_groups, words) bitsets of the rows in each group (-1 rows in none)"""
+    bits = np.zeros((n_groups, words), dtype=np.uint64)
+    rows = np.flatnonzero(group_of >= 0)
+    np.bitwise_or.at(bits, (group_of[rows], rows >> 6), np.uint64(1) << (rows & 63).astype(np.uint64))
+    return bits
+
+
+class BitsetIndex:
+    """Bitsets of the languages with each value and with any value of each feature
+
+    ``keys[i]`` is the (feature ID, code number) of ``bits[i]``;
+    ``feature_of[i]`` is that feature's column, and ``data_bits[column]`` is
+    the set of languages with a value for it. ``facets[facet][name]`` is
+    the set of languages in a family, genus, macroarea or WALS sample
+    ('100', '200'). Bit r is CodeMatrix row r.
+    """
+
+    def __init__(self, matrix):
+        self.n_languages = matrix.shape[0]
+        self.words = (self.n_languages + 63) // 64
+        self.feature_index = matrix.feature_index
+        keys, feature_of, rows = [], [], []
+        present = matrix.codes != MISSING
+        for column, feature_id in enumerate(matrix.feature_ids):
+            values = matrix.codes[:, column]
+            for code in np.unique(values[present[:, column]]):
+                keys.append((feature_id, int(code)))
+                feature_of.append(column)
+                rows.append(pack(values == code))
+
+        self.keys = tuple(keys)
+        self.key_index = {key: i for i, key in enumerate(self.keys)}
+        self.feature_of = np.array(feature_of, dtype=np.int32)
+        self.bits = np.array(rows, dtype=np.uint64).reshape(len(rows), self.words)
+        self.data_bits = pack(present.T)
+        self.all_bits = pack(np.ones(self.n_languages, dtype=bool))
+
+        self.facets = {}
+        for facet in FACETS[:-1]:
+            names = getattr(matrix, f'{facet}_names')
+            bits = _group_bits(getattr(matrix, f'{facet}_of'), len(names), self.words)
+            self.facets[facet] = dict(zip(names, bits))
+        self.facets['sample'] = {sample: pack(getattr(matrix, f'samples_{sample}')) for sample in SAMPLES}
+        self._folded = {facet: {name.casefold(): name for name in names} for facet, names in self.facets.items()}
+        for array in (self.feature_of, self.bits, self.data_bits, self.all_bits,
+                      *(bits for names in self.facets.values() for bits in names.values())):
+            array.setflags(write=False)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def value_bits(self, feature_id, code):
+        """Bitset of the languages with a code number of a feature (empty if none)"""
+        i = self.key_index.get((feature_id, int(code)))
+        return self.bits[i] if i is not None else np.zeros(self.words, dtype=np.uint64)
+
+    def feature_bits(self, feature_id):
+        """Bitset of the languages with any value for a feature (KeyError if unknown)"""
+        try:
+            return self.data_bits[self.feature_index[feature_id]]
+        except KeyError:
+            raise KeyError(f'unknown feature: {feature_id}') from None
+
+    def facet_bits(self, facet, name):
+        """Bitset of the languages with a facet value, matched case-insensitively (empty if none)
+
+        Raises KeyError for facets not in FACETS.
+        """
+        if facet not in self.facets:
+            raise KeyError(f'unknown facet: {facet}')
+        name = self._folded[facet].get(name.casefold(), name)
+        bits = self.facets[facet].get(name)
+        return bits if bits is not None else np.zeros(self.words, dtype=np.uint64)
+
+    def members(self, bits):
+        """CodeMatrix rows of the languages in a bitset"""
+        mask = np.unpackbits(bits.view(np.uint8), bitorder='little', count=self.n_languages)
+        return np.flatnonzero(mask)
@@ -0,0 +1,99 @@
+"""
+On-disk cache for derived WALS data
+Results of expensive batch computations are stored per dataset version, so
+they survive restarts and are shared by the Flask and Streamlit apps
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+DATA_FILES = ('languages.csv', 'parameters.csv', 'codes.csv', 'values.csv', 'chapters.csv', 'areas.csv')
+
+# Override with WALS_CACHE_DIR; an empty value disables the disk cache
+CACHE_DIR = os.environ.get('WALS_CACHE_DIR', str(Path(__file__).parent / '.cache'))
+
+
+def dataset_fingerprint(cldf_path):
+    """Identify the current state of a CLDF directory: (name, size, mtime_ns) per data file"""
+    fingerprint = []
+    for filename in DATA_FILES:
+        filepath = Path(cldf_path) / filename
+        try:
+            stat = filepath.stat()
+            fingerprint.append((filename, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            fingerprint.append((filename, None, None))
+    return tuple(fingerprint)
+
+
+def dataset_version(resolved_path, fingerprint):
+    """Short hash of a resolved CLDF path and its fingerprint"""
+    return hashlib.sha1(repr((str(resolved_path), fingerprint)).encode()).hexdigest()[:12]
+
+
+def cache_path(name, version, suffix):
+    """Path of a cache entry, or None when the disk cache is disabled"""
+    if not CACHE_DIR:
+        return None
+    return Path(CACHE_DIR) / f'{name}-{version}{suffix}'
+
+
+def _write_atomic(path, write):
+    """Write through a temporary file so readers never see a partial entry"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as e:
+        print(f"Could not write cache entry {path}: {e}")
+
+
+def load_json(name, version):
+    """Cached JSON value, or None if absent or unreadable"""
+    path = cache_path(name, version, '.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (TypeError, OSError, ValueError):
+        return None
+
+
+def store_json(name, version, value):
+    path = cache_path(name, version, '.json')
+    if path is not None:
+        _write_atomic(path, lambda f: f.write(json.dumps(value).encode('utf-8')))
+
+
+def load_arrays(name, version):
+    """Cached {name: ndarray}, or None if absent or unreadable"""
+    path = cache_path(name, version, '.npz')
+    try:
+        with np.load(path, allow_pickle=False) as archive:
+            return {key: archive[key] for key in archive.files}
+    except (TypeError, OSError, ValueError):
+        return None
+
+
+def store_arrays(name, version, arrays):
+    path = cache_path(name, version, '.npz')
+    if path is not None:
+        _write_atomic(path, lambda f: np.savez(f, **arrays))
+
+
+def cached_json(name, version, compute):
+    """Load a JSON entry, or compute, store and return it"""
+    value = load_json(name, version)
+    if value is None:
+        value = compute()
+        store_json(name, version, value)
+    return value
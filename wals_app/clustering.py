@@ -0,0 +1,250 @@
+"""
+Typological profile clustering of WALS languages
+k-modes over the code matrix with a missing-aware distance, restarts spread
+over a process pool and results kept in the disk cache per dataset version
+
+Usage:
+    python clustering.py                        # 6 clusters over all features
+    python clustering.py -k 8 --features 81A,85A,86A,87A --min-coverage 0.75
+"""
+import argparse
+import hashlib
+import sys
+import time
+
+import numpy as np
+
+import cache
+import parallel
+from code_matrix import MISSING
+
+N_CLUSTERS = 6
+MAX_CLUSTERS = 20
+
+# Share of the chosen features a language needs values for to be clustered,
+# rounded to COVERAGE_STEP so nearby values share one clustering
+MIN_COVERAGE = 0.2
+COVERAGE_STEP = 0.05
+
+# Random restarts (the lowest-cost run wins) and iterations per restart
+N_INIT = 4
+MAX_ITER = 30
+
+# Bump when the algorithm changes so stale disk cache entries are ignored
+CACHE_NAME = 'kmodes-v1'
+
+# Below this many matrix cells a process pool costs more than it saves
+POOL_MIN_CELLS = 2_000_000
+
+
+def _distances(codes, present, modes):
+    """(languages, clusters) share of mismatches over the features both sides have values for
+
+    Pairs without any shared feature get the maximum distance, 1.
+    """
+    distances = np.empty((len(codes), len(modes)))
+    for c, mode in enumerate(modes):
+        shared = present & (mode != MISSING)
+        overlap = np.count_nonzero(shared, axis=1)
+        mismatches = np.count_nonzero(shared & (codes != mode), axis=1)
+        distances[:, c] = np.where(overlap > 0, mismatches / np.maximum(overlap, 1), 1.0)
+    return distances
+
+
+def _modes(codes, present, labels, k):
+    """Most common code per cluster and feature (MISSING where no member has a value)"""
+    n_codes = int(codes.max()) + 1
+    n_features = codes.shape[1]
+    rows, columns = np.nonzero(present)
+    flat = (columns * k + labels[rows]) * n_codes + codes[rows, columns]
+    counts = np.bincount(flat, minlength=n_features * k * n_codes).reshape(n_features, k, n_codes)
+    modes = counts.argmax(axis=2).T.astype(codes.dtype)
+    modes[counts.max(axis=2).T == 0] = MISSING
+    return modes
+
+
+def _kmodes_run(codes, present, k, max_iter, rng):
+    """(cost, labels, modes, iterations) of one k-modes run from random initial modes"""
+    modes = codes[rng.choice(len(codes), size=k, replace=False)]
+    labels = None
+    for iteration in range(1, max_iter + 1):
+        distances = _distances(codes, present, modes)
+        new_labels = distances.argmin(axis=1)
+        # Reseed empty clusters with the languages farthest from their own mode
+        nearest = distances[np.arange(len(codes)), new_labels]
+        for c in np.setdiff1d(np.arange(k), new_labels):
+            row = int(nearest.argmax())
+            new_labels[row], nearest[row] = c, 0
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        modes = _modes(codes, present, labels, k)
+    cost = float(_distances(codes, present, modes)[np.arange(len(codes)), labels].sum())
+    return cost, labels, modes, iteration
+
+
+def _run_chunk(restarts, codes, k, max_iter, seed):
+    present = codes != MISSING
+    return [_kmodes_run(codes, present, k, max_iter, np.random.default_rng((seed, int(r))))
+            for r in restarts]
+
+
+def kmodes(codes, k=N_CLUSTERS, n_init=N_INIT, max_iter=MAX_ITER, seed=0, workers=None):
+    """(labels, modes, cost, iterations) of the best of ``n_init`` k-modes runs over a code array
+
+    The distance between a language and a cluster mode is the share of
+    mismatching codes among the features both have values for, so missing
+    data neither counts as a match nor as a mismatch. Modes take the most
+    common code of the members per feature. Each restart has its own random
+    stream derived from ``seed``, so the result does not depend on how
+    restarts are split over ``workers`` processes.
+    """
+    if not 1 <= k <= len(codes):
+        raise ValueError(f'cannot make {k} clusters of {len(codes)} languages')
+    runs = parallel.map_chunks(_run_chunk, n_init, (codes, k, max_iter, seed), workers,
+                               use_pool=codes.size * n_init >= POOL_MIN_CELLS)
+    cost, labels, modes, iterations = min(runs, key=lambda run: run[0])
+    return labels, modes, cost, iterations
+
+
+def parameters(feature_ids, min_coverage):
+    """(sorted feature IDs, min_coverage rounded to COVERAGE_STEP) identifying a clustering
+
+    Raises ValueError for repeated feature IDs or a coverage outside [0, 1].
+    """
+    feature_ids = tuple(feature_ids or ())
+    if len(set(feature_ids)) != len(feature_ids):
+        raise ValueError('features must not repeat')
+    if not 0 <= min_coverage <= 1:
+        raise ValueError('min_coverage must be between 0 and 1')
+    return tuple(sorted(feature_ids)), round(round(min_coverage / COVERAGE_STEP) * COVERAGE_STEP, 2)
+
+
+def eligible_rows(matrix, feature_ids, min_coverage):
+    """CodeMatrix rows with values for at least ``min_coverage`` (and at least one) of ``feature_ids``"""
+    columns = matrix.feature_columns(feature_ids)
+    coverage = np.count_nonzero(matrix.codes[:, columns] != MISSING, axis=1) / max(len(columns), 1)
+    return np.flatnonzero((coverage >= min_coverage) & (coverage > 0))
+
+
+class Clustering:
+    """k-modes clusters of the languages with enough data for a feature subset
+
+    ``labels[r]`` is the cluster of CodeMatrix row r (-1 when the language
+    has values for less than ``min_coverage`` of ``feature_ids``); clusters
+    are numbered by decreasing size. ``modes[c]`` holds the modal code of
+    cluster c for each of ``feature_ids`` (MISSING where none).
+    """
+
+    def __init__(self, feature_ids, min_coverage, labels, modes, cost):
+        self.feature_ids = tuple(feature_ids)
+        self.min_coverage = min_coverage
+        self.labels = labels
+        self.modes = modes
+        self.cost = cost
+        for array in (self.labels, self.modes):
+            array.setflags(write=False)
+
+    @property
+    def k(self):
+        return len(self.modes)
+
+    @classmethod
+    def build(cls, matrix, k=N_CLUSTERS, feature_ids=None, min_coverage=MIN_COVERAGE, n_init=N_INIT,
+              seed=0, workers=None):
+        if not 2 <= k <= MAX_CLUSTERS:
+            raise ValueError(f'number of clusters must be between 2 and {MAX_CLUSTERS}')
+        feature_ids, min_coverage = parameters(feature_ids, min_coverage)
+        feature_ids = list(feature_ids or matrix.feature_ids)
+        rows = eligible_rows(matrix, feature_ids, min_coverage)
+        if len(rows) < k:
+            raise ValueError(f'only {len(rows)} languages have enough data for {k} clusters')
+
+        codes = matrix.codes[np.ix_(rows, matrix.feature_columns(feature_ids))]
+        labels, modes, cost, _ = kmodes(np.ascontiguousarray(codes), k, n_init, seed=seed,
+                                        workers=workers)
+        # Number clusters by decreasing size so colours are stable across runs
+        order = np.argsort(-np.bincount(labels, minlength=k), kind='stable')
+        rank = np.empty(k, dtype=np.int64)
+        rank[order] = np.arange(k)
+        all_labels = np.full(matrix.shape[0], -1, dtype=np.int16)
+        all_labels[rows] = rank[labels]
+        return cls(feature_ids, min_coverage, all_labels, modes[order], cost)
+
+    @classmethod
+    def cached(cls, matrix, version, k=N_CLUSTERS, feature_ids=None, min_coverage=MIN_COVERAGE):
+        """Load a clustering of a dataset version from the disk cache, or build and store it
+
+        Parameters are normalized with parameters() first, so feature order
+        and coverage differences below COVERAGE_STEP share one entry.
+        """
+        if not 2 <= k <= MAX_CLUSTERS:
+            raise ValueError(f'number of clusters must be between 2 and {MAX_CLUSTERS}')
+        feature_ids, min_coverage = parameters(feature_ids, min_coverage)
+        feature_ids = list(feature_ids or matrix.feature_ids)
+        matrix.feature_columns(feature_ids)
+        digest = hashlib.sha1(f'{min_coverage!r}:{",".join(feature_ids)}'.encode()).hexdigest()[:12]
+        name = f'{CACHE_NAME}-k{k}-{digest}'
+        arrays = cache.load_arrays(name, version)
+        if arrays is not None and arrays['modes'].shape == (k, len(feature_ids)):
+            return cls(feature_ids, min_coverage, arrays['labels'], arrays['modes'], float(arrays['cost']))
+        clustering = cls.build(matrix, k, feature_ids, min_coverage)
+        cache.store_arrays(name, version, {'labels': clustering.labels, 'modes': clustering.modes,
+                                           'cost': np.array(clustering.cost)})
+        return clustering
+
+    def sizes(self):
+        """Number of languages per cluster"""
+        return np.bincount(self.labels[self.labels >= 0], minlength=self.k)
+
+    def profile(self, matrix, cluster, top=5):
+        """[(feature ID, code, share, baseline)] of a cluster's most distinctive modal values
+
+        ``share`` is the proportion of members with data that have the modal
+        code, ``baseline`` the same proportion over all clustered languages;
+        values are ranked by share - baseline.
+        """
+        codes = matrix.codes[:, matrix.feature_columns(self.feature_ids)][self.labels >= 0]
+        members = self.labels[self.labels >= 0] == cluster
+        present = codes != MISSING
+        mode = self.modes[cluster]
+        hits = (codes == mode) & present
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = hits[members].sum(axis=0) / present[members].sum(axis=0)
+            baseline = hits.sum(axis=0) / present.sum(axis=0)
+        ranked = [j for j in np.argsort(-(share - baseline), kind='stable')
+                  if mode[j] != MISSING and np.isfinite(share[j])]
+        return [(self.feature_ids[j], int(mode[j]), float(share[j]), float(baseline[j])) for j in ranked[:top]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cldf', help='CLDF directory (default: ../cldf)')
+    parser.add_argument('-k', type=int, default=N_CLUSTERS, help=f'number of clusters (default {N_CLUSTERS})')
+    parser.add_argument('--features', default='', help='comma-separated feature IDs (default: all)')
+    parser.add_argument('--min-coverage', type=float, default=MIN_COVERAGE,
+                        help=f'share of the features a language needs values for (default {MIN_COVERAGE})')
+    args = parser.parse_args(argv)
+
+    from data_loader import WALSDataLoader
+    loader = WALSDataLoader(cldf_path=args.cldf)
+    matrix = loader.get_code_matrix()
+    features = [f for f in args.features.split(',') if f]
+    start = time.perf_counter()
+    try:
+        clustering = Clustering.cached(matrix, loader.dataset_version, args.k, features, args.min_coverage)
+    except (KeyError, ValueError) as e:
+        print(f'error: {e.args[0]}', file=sys.stderr)
+        return 2
+    print(f'{args.k} clusters of {int(clustering.sizes().sum())} languages over {len(clustering.feature_ids)} '
+          f'features in {time.perf_counter() - start:.2f}s (cost {clustering.cost:.1f})', file=sys.stderr)
+
+    for cluster, size in enumerate(clustering.sizes()):
+        values = ', '.join(f'{feature_id}={code} ({share:.0%} vs {baseline:.0%})'
+                           for feature_id, code, share, baseline in clustering.profile(matrix, cluster, top=3))
+        print(f'{cluster + 1:3d} {size:6d}  {values}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
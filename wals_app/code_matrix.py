@@ -0,0 +1,89 @@
+"""
+Language x feature code matrix for WALS data
+Dense int16 code numbers (MISSING where a language has no value) plus genus,
+family, macroarea, sample-membership and coordinate arrays, built once from the value view
+"""
+import numpy as np
+
+MISSING = -1
+
+
+def _group_codes(labels):
+    """(sorted unique non-empty labels, int32 index per row with -1 for empty)"""
+    names = sorted({label for label in labels if label})
+    position = {name: i for i, name in enumerate(names)}
+    return tuple(names), np.array([position.get(label, -1) for label in labels], dtype=np.int32)
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _flag(value):
+    return str(value).strip().lower() in ('true', '1', 'yes')
+
+
+class CodeMatrix:
+    """Read-only numeric view of the dataset for vectorized analyses
+
+    ``codes[i, j]`` is the code Number of language i for feature j, or MISSING.
+    ``genus_of``/``family_of``/``macroarea_of`` index into the matching
+    ``*_names`` (-1 when unclassified); ``samples_100``/``samples_200`` are
+    the WALS sample memberships from the LanguageTable;
+    ``latitude``/``longitude`` are in degrees (NaN when missing).
+    """
+
+    def __init__(self, languages, features, value_view):
+        self.language_ids = tuple(l.get('ID') for l in languages)
+        self.feature_ids = tuple(f.get('ID') for f in features)
+        self.language_index = {language_id: i for i, language_id in enumerate(self.language_ids)}
+        self.feature_index = {feature_id: j for j, feature_id in enumerate(self.feature_ids)}
+
+        rows, cols, numbers = [], [], []
+        for value in value_view:
+            i = self.language_index.get(value['Language_ID'])
+            j = self.feature_index.get(value['Parameter_ID'])
+            if i is not None and j is not None and value['Code_Number'] > 0:
+                rows.append(i)
+                cols.append(j)
+                numbers.append(value['Code_Number'])
+        codes = np.full((len(self.language_ids), len(self.feature_ids)), MISSING, dtype=np.int16)
+        codes[np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)] = numbers
+
+        self.genus_names, self.genus_of = _group_codes([l.get('Genus', '') for l in languages])
+        self.family_names, self.family_of = _group_codes([l.get('Family', '') for l in languages])
+        self.macroarea_names, self.macroarea_of = _group_codes([l.get('Macroarea', '') for l in languages])
+        self.samples_100 = np.array([_flag(l.get('Samples_100')) for l in languages], dtype=bool)
+        self.samples_200 = np.array([_flag(l.get('Samples_200')) for l in languages], dtype=bool)
+        self.latitude = np.array([_coordinate(l.get('Latitude')) for l in languages], dtype=float)
+        self.longitude = np.array([_coordinate(l.get('Longitude')) for l in languages], dtype=float)
+
+        self.codes = codes
+        for array in (self.codes, self.genus_of, self.family_of, self.macroarea_of, self.samples_100,
+                      self.samples_200, self.latitude, self.longitude):
+            array.setflags(write=False)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    def feature_columns(self, feature_ids):
+        """Column indexes of the given features; raises KeyError for unknown IDs"""
+        try:
+            return [self.feature_index[feature_id] for feature_id in feature_ids]
+        except KeyError as e:
+            raise KeyError(f'unknown feature: {e.args[0]}') from None
+
+    def column(self, feature_id):
+        """Codes of all languages for one feature (MISSING where there is no value)"""
+        return self.codes[:, self.feature_columns([feature_id])[0]]
+
+    def has_data(self, feature_ids):
+        """Boolean mask of languages with a value for every given feature"""
+        columns = self.feature_columns(feature_ids)
+        if not columns:
+            return np.ones(len(self.language_ids), dtype=bool)
+        return (self.codes[:, columns] != MISSING).all(axis=1)
@@ -6,8 +6,35 @@ import os
 import json
 import csv
 from pathlib import Path
+from array import array
+from collections import OrderedDict
 import math
 
+import numpy as np
+
+from value_view import ValueView
+from genealogy import GenealogyIndex, node_kind, split_rows
+from code_matrix import CodeMatrix
+from sampling import StratifiedSampler
+import aggregation
+import cache
+import stability
+import areal
+import universals
+import clustering
+from geography import NeighbourGraph
+from bitsets import BitsetIndex
+from query import run as run_query
+
+# Orderings offered for a feature's value listing (see get_feature_values)
+VALUE_SORTS = ('language', 'family', 'code')
+
+# Orders for get_universals (all descending)
+UNIVERSAL_SORTS = ('confidence', 'genera', 'support', 'lift')
+
+# Clusterings kept in memory (least recently used dropped first)
+CACHED_CLUSTERINGS = 16
+
 class WALSDataLoader:
     def __init__(self, cldf_path=None):
         """Initialize the data loader with CLDF dataset path"""
@@ -19,18 +46,50 @@ class WALSDataLoader:
         self.cldf_path = Path(cldf_path)
         self.data_available = self.cldf_path.exists()
 
-        # Cache for loaded data
+        # Cache for loaded data (languages.csv is split into languages and genealogy nodes)
         self._languages = None
+        self._languages_by_id = None
+        self._genealogy_nodes = None
         self._features = None
         self._codes = None
         self._values = None
         self._contributions = None
+        self._areas = None
+        self._value_view = None
+        self._area_list = None
+        self._features_by_area = None
+        self._genealogy = None
+        # Numeric language x feature matrix and sampler, built on first use
+        self._code_matrix = None
+        self._sampler = None
+        self._stability = None
+        self._neighbour_graph = None
+        self._areal = None
+        self._areal_features = {}
+        self._bitset_index = None
+        self._universals = None
+        self._clusterings = OrderedDict()
+        # Identifies the loaded data for the disk cache (set by the load methods)
+        self._dataset_version = None
+
+        # Per-feature value rows and pre-sorted index arrays, built on first use
+        self._feature_value_indexes = {}
 
         if self.data_available:
             self._load_data()
         else:
             self._load_sample_data()
 
+        self._languages, self._genealogy_nodes = split_rows(self._languages)
+        self._languages_by_id = {l.get('ID'): l for l in self._languages}
+
+        # Values joined once with their language, feature, chapter and code
+        self._value_view = ValueView(self._languages, self._features, self._codes, self._values,
+                                     chapters=self._contributions, areas=self._areas)
+        self._build_area_index()
+        # Family/subfamily/genus/language tree (synthesized when there is no Parent_ID)
+        self._genealogy = GenealogyIndex.from_rows(self._languages + self._genealogy_nodes)
+
     def _load_data(self):
         """Load data from CLDF files"""
         try:
@@ -45,6 +104,9 @@ class WALSDataLoader:
                 self._contributions = self._load_csv('chapters.csv')
             else:
                 self._contributions = []
+            self._areas = self._load_csv('areas.csv')
+            resolved = self.cldf_path.resolve()
+            self._dataset_version = cache.dataset_version(resolved, cache.dataset_fingerprint(resolved))
 
         except Exception as e:
             print(f"Error loading CLDF data: {e}")
@@ -63,9 +125,28 @@ class WALSDataLoader:
                 data.append(row)
         return data
 
+    def _build_area_index(self):
+        """Precompute the Parameter -> Chapter -> Area join for area filtering"""
+        chapter_areas = {c.get('ID'): c.get('Area_ID', '') for c in self._contributions}
+        area_names = {a.get('ID'): a.get('Name', '') for a in self._areas}
+
+        features_by_area = {}
+        for feature in self._features:
+            area_id = chapter_areas.get(feature.get('Chapter_ID'))
+            if area_id:
+                features_by_area.setdefault(area_id, []).append(feature)
+
+        def area_order(area_id):
+            return (0, int(area_id), '') if area_id.isdigit() else (1, 0, area_id)
+
+        self._features_by_area = features_by_area
+        self._area_list = [{'ID': area_id, 'Name': area_names.get(area_id) or area_id}
+                           for area_id in sorted(features_by_area, key=area_order)]
+
     def _load_sample_data(self):
         """Load sample data for demonstration when CLDF data is not available"""
         print("Loading sample data for demonstration...")
+        self._dataset_version = 'flask-sample'
 
         # Sample languages
         self._languages = [
@@ -131,6 +212,12 @@ class WALSDataLoader:
         ]
 
         self._contributions = []
+        self._areas = []
+
+    @property
+    def dataset_version(self):
+        """Short hash identifying the loaded dataset (path and file fingerprints)"""
+        return self._dataset_version
 
     def get_statistics(self):
         """Get basic statistics about the dataset"""
@@ -142,22 +229,27 @@ class WALSDataLoader:
             'data_available': self.data_available
         }
 
-    def get_detailed_statistics(self):
-        """Get detailed statistics for visualization"""
-        stats = self.get_statistics()
+    def get_detailed_statistics(self, unit='language'):
+        """Get detailed statistics for visualization
 
-        # Count by family
-        family_counts = {}
-        for lang in self._languages:
-            family = lang.get('Family', 'Unknown')
-            family_counts[family] = family_counts.get(family, 0) + 1
+        With unit='genus' or 'family', families and macroareas are sized by
+        their number of distinct genera or families instead of languages.
+        """
+        aggregation.check_mode(unit, 'majority')
+        stats = self.get_statistics()
+        column = {'language': 'ID', 'genus': 'Genus', 'family': 'Family'}[unit]
 
-        # Count by macroarea
-        macroarea_counts = {}
+        # Distinct units per family and per macroarea (unclassified languages count alone)
+        family_units = {}
+        macroarea_units = {}
         for lang in self._languages:
-            area = lang.get('Macroarea', 'Unknown')
-            macroarea_counts[area] = macroarea_counts.get(area, 0) + 1
+            key = lang.get(column) or lang.get('ID')
+            family_units.setdefault(lang.get('Family', 'Unknown'), set()).add(key)
+            macroarea_units.setdefault(lang.get('Macroarea', 'Unknown'), set()).add(key)
+        family_counts = {family: len(keys) for family, keys in family_units.items()}
+        macroarea_counts = {area: len(keys) for area, keys in macroarea_units.items()}
 
+        stats['unit'] = unit
         stats['family_distribution'] = family_counts
         stats['macroarea_distribution'] = macroarea_counts
 
@@ -167,9 +259,27 @@ class WALSDataLoader:
 
         return stats
 
-    def get_languages(self, page=1, per_page=50, search='', family='', macroarea=''):
-        """Get paginated list of languages with filters"""
-        filtered = self._languages[:]
+    def _matching_rows(self, query='', family='', macroarea=''):
+        """CodeMatrix rows matching a query string plus exact family/macroarea filters, or None for all"""
+        if not (query or family or macroarea):
+            return None
+        index = self.get_bitset_index()
+        bits = index.all_bits
+        if query:
+            bits = bits & run_query(query, index)
+        for facet, name in (('family', family), ('macroarea', macroarea)):
+            if name:
+                bits = bits & index.facets[facet].get(name, np.zeros_like(bits))
+        return index.members(bits)
+
+    def get_languages(self, page=1, per_page=50, search='', family='', macroarea='', query=''):
+        """Get paginated list of languages with filters
+
+        ``query`` is a boolean query over feature values and facets (see
+        query.parse); malformed queries raise ValueError.
+        """
+        rows = self._matching_rows(query, family, macroarea)
+        filtered = self._languages[:] if rows is None else [self._languages[r] for r in rows]
 
         # Apply filters
         if search:
@@ -177,12 +287,6 @@ class WALSDataLoader:
             filtered = [l for l in filtered if search_lower in l.get('Name', '').lower() or
                        search_lower in l.get('ID', '').lower()]
 
-        if family:
-            filtered = [l for l in filtered if l.get('Family', '') == family]
-
-        if macroarea:
-            filtered = [l for l in filtered if l.get('Macroarea', '') == macroarea]
-
         # Pagination
         total = len(filtered)
         total_pages = math.ceil(total / per_page) if total > 0 else 1
@@ -197,12 +301,37 @@ class WALSDataLoader:
             'total_pages': total_pages
         }
 
+    def query_languages(self, query, page=1, per_page=100):
+        """Get a page of the languages matching a boolean query, with counts per macroarea and family
+
+        See query.parse for the syntax; malformed queries raise ValueError.
+        """
+        matrix, index = self.get_code_matrix(), self.get_bitset_index()
+        rows = index.members(run_query(query, index))
+        counts = {}
+        for facet in ('macroarea', 'family'):
+            names, group_of = getattr(matrix, f'{facet}_names'), getattr(matrix, f'{facet}_of')
+            groups = group_of[rows]
+            tally = np.bincount(groups[groups >= 0], minlength=len(names))
+            counts[facet] = {names[g]: int(tally[g]) for g in np.argsort(-tally, kind='stable') if tally[g]}
+
+        page, per_page = max(page, 1), max(per_page, 1)
+        total = len(rows)
+        total_pages = math.ceil(total / per_page) if total > 0 else 1
+        start = (page - 1) * per_page
+        return {
+            'query': query,
+            'items': [self._languages[r] for r in rows[start:start + per_page]],
+            'total': total,
+            'counts': counts,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': total_pages,
+        }
+
     def get_language(self, language_id):
-        """Get a specific language by ID"""
-        for lang in self._languages:
-            if lang.get('ID') == language_id:
-                return lang
-        return None
+        """Get a specific language by ID (genealogy nodes are not languages)"""
+        return self._languages_by_id.get(language_id)
 
     def get_families(self):
         """Get list of all language families"""
@@ -224,7 +353,8 @@ class WALSDataLoader:
 
     def get_features(self, page=1, per_page=30, search='', area=''):
         """Get paginated list of features with filters"""
-        filtered = self._features[:]
+        # Area filtering is a lookup in the precomputed area index
+        filtered = self._features_by_area.get(area, []) if area else self._features
 
         # Apply filters
         if search:
@@ -254,53 +384,326 @@ class WALSDataLoader:
         return None
 
     def get_areas(self):
-        """Get list of all linguistic areas"""
-        areas = set()
-        for contrib in self._contributions:
-            area = contrib.get('Area_ID', '')
-            if area:
-                areas.add(area)
-        return sorted(areas)
+        """Get list of linguistic areas that have features ({'ID', 'Name'} dicts)"""
+        return list(self._area_list)
 
     def get_codes_for_feature(self, feature_id):
         """Get all possible codes/values for a feature"""
         return [c for c in self._codes if c.get('Parameter_ID') == feature_id]
 
     def get_values_for_language(self, language_id):
-        """Get all feature values for a specific language"""
-        values = [v for v in self._values if v.get('Language_ID') == language_id]
-
-        # Enrich with feature and code information
-        enriched = []
-        for value in values:
-            feature = self.get_feature(value.get('Parameter_ID'))
-            code = next((c for c in self._codes if c.get('ID') == value.get('Code_ID')), None)
-
-            enriched.append({
-                **value,
-                'Feature_Name': feature.get('Name', '') if feature else '',
-                'Code_Name': code.get('Name', '') if code else ''
-            })
-
-        return enriched
+        """Get all feature values for a specific language (read-only ValueView rows)"""
+        return list(self._value_view.for_language(language_id))
 
     def get_values_for_feature(self, feature_id):
-        """Get all language values for a specific feature"""
-        values = [v for v in self._values if v.get('Parameter_ID') == feature_id]
-
-        # Enrich with language information
-        enriched = []
-        for value in values:
-            language = self.get_language(value.get('Language_ID'))
-            code = next((c for c in self._codes if c.get('ID') == value.get('Code_ID')), None)
-
-            enriched.append({
-                **value,
-                'Language_Name': language.get('Name', '') if language else '',
-                'Code_Name': code.get('Name', '') if code else ''
+        """Get all language values for a specific feature (read-only ValueView rows)"""
+        return list(self._value_view.for_feature(feature_id))
+
+    def _build_feature_value_index(self, feature_id):
+        """ValueView rows of a feature plus one sorted index array per VALUE_SORTS"""
+        rows = self._value_view.for_feature(feature_id)
+
+        positions = range(len(rows))
+        keys = {
+            'language': lambda i: (rows[i]['Language_Name'].lower(), rows[i]['Language_ID']),
+            'family': lambda i: (rows[i]['Family'].lower(), rows[i]['Language_Name'].lower()),
+            'code': lambda i: (rows[i]['Code_Number'], rows[i]['Language_Name'].lower()),
+        }
+        orders = {sort: array('l', sorted(positions, key=key)) for sort, key in keys.items()}
+        return {'rows': rows, 'orders': orders}
+
+    def _feature_value_index(self, feature_id):
+        index = self._feature_value_indexes.get(feature_id)
+        if index is None:
+            index = self._feature_value_indexes[feature_id] = self._build_feature_value_index(feature_id)
+        return index
+
+    def get_feature_values(self, feature_id, page=1, per_page=50, sort='language', order='asc',
+                           code='', search=''):
+        """Get a sorted, filtered page of the languages with data for a feature"""
+        index = self._feature_value_index(feature_id)
+        rows = index['rows']
+        if sort not in VALUE_SORTS:
+            sort = 'language'
+        positions = index['orders'][sort]
+        if order == 'desc':
+            positions = positions[::-1]
+
+        # Filters only test rows; the page slice is the only thing materialized
+        if code or search:
+            search_lower = search.lower()
+            positions = [i for i in positions
+                         if (not code or rows[i]['Code_ID'] == code) and
+                         (not search_lower or search_lower in rows[i]['Language_Name'].lower() or
+                          search_lower in rows[i]['Language_ID'].lower())]
+
+        # Pagination
+        total = len(positions)
+        total_pages = math.ceil(total / per_page) if total > 0 else 1
+        start = (page - 1) * per_page
+        end = start + per_page
+
+        return {
+            'items': [rows[i] for i in positions[start:end]],
+            'total': total,
+            'feature_total': len(rows),
+            'page': page,
+            'per_page': per_page,
+            'total_pages': total_pages,
+            'sort': sort,
+            'order': 'desc' if order == 'desc' else 'asc',
+        }
+
+    def _genealogy_summary(self, node_id):
+        node = self._genealogy.node(node_id)
+        return {'id': node['ID'], 'name': node['Name'], 'kind': node['kind'],
+                'language_count': node['language_count']}
+
+    def get_genealogy_node(self, node_id, other=''):
+        """Get a genealogy node with its ancestors, children and languages
+
+        With ``other``, also returns the lowest common ancestor of both nodes.
+        """
+        if node_id not in self._genealogy:
+            return None
+        genealogy = self._genealogy
+        result = {
+            **self._genealogy_summary(node_id),
+            'depth': genealogy.node(node_id)['depth'],
+            'ancestors': [self._genealogy_summary(a) for a in genealogy.ancestors(node_id)],
+            'children': [self._genealogy_summary(c) for c in genealogy.children(node_id)],
+            'languages': [{'id': l, 'name': genealogy.node(l)['Name']}
+                          for l in genealogy.languages_under(node_id)],
+        }
+        if other:
+            common = genealogy.lca(node_id, other) if other in genealogy else None
+            result['common_ancestor'] = self._genealogy_summary(common) if common else None
+        return result
+
+    def get_genealogy_nodes(self, kind=''):
+        """Get the family/subfamily/genus rows of languages.csv, optionally of one kind"""
+        if not kind:
+            return list(self._genealogy_nodes)
+        return [n for n in self._genealogy_nodes if node_kind(n.get('ID')) == kind]
+
+    def get_languages_under(self, node_id):
+        """Get the IDs of all languages below a family, subfamily or genus node"""
+        if node_id not in self._genealogy:
+            return []
+        return list(self._genealogy.languages_under(node_id))
+
+    def get_code_matrix(self):
+        """Language x feature CodeMatrix over the in-memory dataset (built once)"""
+        if self._code_matrix is None:
+            self._code_matrix = CodeMatrix(self._languages, self._features, self._value_view)
+        return self._code_matrix
+
+    def get_sampler(self):
+        """StratifiedSampler over the code matrix (built once)"""
+        if self._sampler is None:
+            self._sampler = StratifiedSampler(self.get_code_matrix())
+        return self._sampler
+
+    def get_stability_table(self):
+        """Genealogical stability metrics of all features (see stability.compute_all)
+
+        Computed once per dataset version and kept in the disk cache.
+        """
+        if self._stability is None:
+            self._stability = stability.stability_table(self.get_code_matrix(), self.dataset_version)
+        return self._stability
+
+    def get_feature_stability(self, feature_id):
+        """Get the genealogical stability metrics of one feature, or None"""
+        return self.get_stability_table().get(feature_id)
+
+    def get_neighbour_graph(self):
+        """k-nearest-neighbour graph of the languages (built once, kept in the disk cache)"""
+        if self._neighbour_graph is None:
+            self._neighbour_graph = NeighbourGraph.cached(self.get_code_matrix(), self.dataset_version)
+        return self._neighbour_graph
+
+    def get_autocorrelation_table(self):
+        """Join-count statistics of all features (see areal.compute_all)
+
+        Computed once per dataset version and kept in the disk cache; this
+        takes seconds for WALS, so feature pages use get_feature_autocorrelation.
+        """
+        if self._areal is None:
+            self._areal = areal.autocorrelation_table(self.get_code_matrix(), self.get_neighbour_graph(),
+                                                      self.dataset_version)
+        return self._areal
+
+    def get_feature_autocorrelation(self, feature_id):
+        """Get the join-count statistics of one feature, or None for unknown features
+
+        Uses the all-features table when it is in memory or in the disk cache,
+        otherwise computes this feature alone (same result).
+        """
+        if feature_id not in self.get_code_matrix().feature_index:
+            return None
+        if self._areal is None:
+            self._areal = areal.cached_table(self.dataset_version)
+        result = self._areal_features.get(feature_id)
+        if result is None:
+            result = self._areal_features[feature_id] = areal.feature_autocorrelation(
+                self.get_code_matrix(), self.get_neighbour_graph(), feature_id, table=self._areal)
+        return result
+
+    def get_bitset_index(self):
+        """BitsetIndex of the code matrix values (built once)"""
+        if self._bitset_index is None:
+            self._bitset_index = BitsetIndex(self.get_code_matrix())
+        return self._bitset_index
+
+    def _universal_table(self):
+        """Mined rules with feature and value names, computed once and kept in the disk cache"""
+        if self._universals is None:
+            features = {f.get('ID'): f.get('Name', '') for f in self._features}
+            names = {}
+            rules = universals.universals_table(self.get_code_matrix(), self.get_bitset_index(),
+                                                self.dataset_version)
+            for rule in rules:
+                for side in ('antecedent', 'consequent'):
+                    feature_id, number = rule[side]
+                    if feature_id not in names:
+                        names[feature_id] = {c['number']: c['name'] for c in self._numbered_codes(feature_id)}
+                    rule[side] = {'feature_id': feature_id, 'feature_name': features.get(feature_id, ''),
+                                  'code': number, 'value': names[feature_id].get(number, str(number))}
+            self._universals = rules
+        return self._universals
+
+    def get_universals(self, page=1, per_page=50, feature='', min_confidence=0, min_support=0,
+                       min_genera=0, sort='confidence'):
+        """Get a filtered page of implicational universals (see universals.mine)
+
+        ``feature`` keeps rules with that feature ID on either side; the
+        thresholds only narrow the mined defaults.
+        """
+        if sort not in UNIVERSAL_SORTS:
+            sort = 'confidence'
+        filtered = [r for r in self._universal_table()
+                    if r['confidence'] >= min_confidence and r['support'] >= min_support and
+                    r['genera'] >= min_genera and
+                    (not feature or feature in (r['antecedent']['feature_id'], r['consequent']['feature_id']))]
+        if sort != 'confidence':
+            filtered.sort(key=lambda r: r[sort], reverse=True)
+
+        # Pagination (page and per_page are at least 1)
+        page, per_page = max(page, 1), max(per_page, 1)
+        total = len(filtered)
+        total_pages = math.ceil(total / per_page) if total > 0 else 1
+        start = (page - 1) * per_page
+        end = start + per_page
+
+        return {
+            'items': filtered[start:end],
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': total_pages,
+            'sort': sort,
+        }
+
+    def get_clustering(self, k=clustering.N_CLUSTERS, features=None, min_coverage=clustering.MIN_COVERAGE):
+        """Clustering of the languages' typological profiles (see clustering.Clustering)
+
+        Parameters are normalized (see clustering.parameters), then built once
+        and kept in the disk cache and a small in-memory LRU; unknown features
+        raise KeyError, invalid parameters ValueError.
+        """
+        key = (k, *clustering.parameters(features, min_coverage))
+        if key in self._clusterings:
+            self._clusterings.move_to_end(key)
+        else:
+            self._clusterings[key] = clustering.Clustering.cached(
+                self.get_code_matrix(), self.dataset_version, *key)
+            if len(self._clusterings) > CACHED_CLUSTERINGS:
+                self._clusterings.popitem(last=False)
+        return self._clusterings[key]
+
+    def get_clusters(self, k=clustering.N_CLUSTERS, features=None, min_coverage=clustering.MIN_COVERAGE):
+        """Get the cluster of each language plus a size, macroareas and profile per cluster
+
+        When fewer than k languages have enough data, clusters and languages
+        are empty (cost is None) instead of raising.
+        """
+        matrix = self.get_code_matrix()
+        if not 2 <= k <= clustering.MAX_CLUSTERS:
+            raise ValueError(f'number of clusters must be between 2 and {clustering.MAX_CLUSTERS}')
+        feature_ids, coverage = clustering.parameters(features, min_coverage)
+        feature_ids = list(feature_ids or matrix.feature_ids)
+        if len(clustering.eligible_rows(matrix, feature_ids, coverage)) < k:
+            return {'k': k, 'features': feature_ids, 'min_coverage': coverage, 'cost': None,
+                    'clusters': [], 'languages': {}}
+        result = self.get_clustering(k, features, min_coverage)
+        features_by_id = {f.get('ID'): f.get('Name', '') for f in self._features}
+        clusters = []
+        for cluster, size in enumerate(result.sizes()):
+            members = result.labels == cluster
+            areas = np.bincount(matrix.macroarea_of[members & (matrix.macroarea_of >= 0)],
+                                minlength=len(matrix.macroarea_names))
+            profile = []
+            for feature_id, code, share, baseline in result.profile(matrix, cluster):
+                names = {c['number']: c['name'] for c in self._numbered_codes(feature_id)}
+                profile.append({'feature_id': feature_id, 'feature_name': features_by_id.get(feature_id, ''),
+                                'code': code, 'value': names.get(code, str(code)),
+                                'share': round(share, 3), 'baseline': round(baseline, 3)})
+            clusters.append({
+                'cluster': cluster,
+                'size': int(size),
+                'macroareas': {matrix.macroarea_names[a]: int(areas[a])
+                               for a in np.argsort(-areas, kind='stable') if areas[a]},
+                'profile': profile,
             })
+        return {
+            'k': result.k,
+            'features': list(result.feature_ids),
+            'min_coverage': result.min_coverage,
+            'cost': round(result.cost, 3),
+            'clusters': clusters,
+            'languages': {matrix.language_ids[r]: int(result.labels[r])
+                          for r in np.flatnonzero(result.labels >= 0)},
+        }
 
-        return enriched
+    def _nearby(self, rows, distances):
+        language_ids = self.get_code_matrix().language_ids
+        nearby = []
+        for row, distance in zip(rows, distances):
+            lang = self._languages_by_id[language_ids[row]]
+            nearby.append({'id': lang.get('ID'), 'name': lang.get('Name'), 'family': lang.get('Family', ''),
+                           'genus': lang.get('Genus', ''), 'distance_km': round(float(distance), 1)})
+        return nearby
+
+    def get_languages_within(self, language_id, radius_km, limit=None):
+        """Get the languages within radius_km of a language, closest first
+
+        Each item has id, name, family, genus and distance_km. Returns an
+        empty list for unknown languages and languages without coordinates.
+        """
+        row = self.get_code_matrix().language_index.get(language_id)
+        if row is None:
+            return []
+        rows, distances = self.get_neighbour_graph().within(row, radius_km)
+        return self._nearby(rows[:limit], distances[:limit])
+
+    def get_nearest_languages(self, language_id, count=10):
+        """Get the nearest languages to a language (at most the graph's k), closest first"""
+        row = self.get_code_matrix().language_index.get(language_id)
+        if row is None:
+            return []
+        return self._nearby(*self.get_neighbour_graph().nearest(row, count))
+
+    def sample_languages(self, by='genus', per_group=1, features=(), preset='', groups=None, seed=None):
+        """Get a genealogically balanced sample of language rows
+
+        Raises ValueError for an unknown stratum or preset and KeyError for
+        unknown features.
+        """
+        indexes = self.get_sampler().sample(by=by, per_group=per_group, features=features,
+                                            preset=preset, groups=groups, seed=seed)
+        language_ids = self.get_code_matrix().language_ids
+        return [self._languages_by_id[language_ids[i]] for i in indexes]
 
     def search_languages(self, query):
         """Search languages by name or ID"""
@@ -343,17 +746,72 @@ class WALSDataLoader:
                     pass
         return geo_data
 
-    def get_feature_distribution(self, feature_id):
-        """Get distribution of values for a feature"""
-        values = self.get_values_for_feature(feature_id)
+    def get_feature_distribution(self, feature_id, unit='language', weighting='majority'):
+        """Get distribution of values for a feature
+
+        unit='genus' or 'family' counts genealogical units instead of
+        languages (see aggregation.distribution); weights may be fractional.
+        """
         codes = self.get_codes_for_feature(feature_id)
 
         distribution = {}
         for code in codes:
             distribution[code.get('Name', 'Unknown')] = 0
 
-        for value in values:
-            code_name = value.get('Code_Name', 'Unknown')
-            distribution[code_name] = distribution.get(code_name, 0) + 1
+        if unit == 'language':
+            for value in self._value_view.for_feature(feature_id):
+                code_name = value.get('Code_Name', 'Unknown')
+                distribution[code_name] = distribution.get(code_name, 0) + 1
+            return distribution
 
+        aggregation.check_mode(unit, weighting)
+        if feature_id not in self.get_code_matrix().feature_index:
+            return distribution
+        weights = aggregation.distribution(self.get_code_matrix(), feature_id, unit, weighting)
+        for code in codes:
+            number = self._code_number(code)
+            if 0 < number < len(weights):
+                distribution[code.get('Name', 'Unknown')] = round(float(weights[number]), 3)
         return distribution
+
+    @staticmethod
+    def _code_number(code):
+        try:
+            return int(code.get('Number'))
+        except (TypeError, ValueError):
+            return 0
+
+    def _numbered_codes(self, feature_id):
+        """{'id', 'name', 'number'} of a feature's codes, in code order"""
+        codes = [{'id': c.get('ID'), 'name': c.get('Name', ''), 'number': self._code_number(c)}
+                 for c in self.get_codes_for_feature(feature_id)]
+        return sorted((c for c in codes if c['number'] > 0), key=lambda c: c['number'])
+
+    def get_feature_crosstab(self, feature_a, feature_b, unit='language', weighting='majority'):
+        """Get the contingency table of two features' values
+
+        Rows are the codes of feature_a, columns those of feature_b (both in
+        code order). Cells count languages, or genera/families weighted as in
+        get_feature_distribution. Returns None for unknown features.
+        """
+        aggregation.check_mode(unit, weighting)
+        matrix = self.get_code_matrix()
+        if feature_a not in matrix.feature_index or feature_b not in matrix.feature_index:
+            return None
+        weights = aggregation.crosstab(matrix, feature_a, feature_b, unit, weighting)
+
+        rows, columns = self._numbered_codes(feature_a), self._numbered_codes(feature_b)
+        n_rows, n_columns = weights.shape
+        table = [[round(float(weights[r['number'], c['number']]), 3)
+                  if r['number'] < n_rows and c['number'] < n_columns else 0
+                  for c in columns] for r in rows]
+        return {
+            'feature_a': feature_a,
+            'feature_b': feature_b,
+            'unit': unit,
+            'weighting': weighting,
+            'rows': rows,
+            'columns': columns,
+            'table': table,
+            'total': round(sum(map(sum, table)), 3),
+        }
@@ -0,0 +1,231 @@
+"""
+Genealogy tree index for WALS languages
+Numbers the family/subfamily/genus/language tree with nested intervals and an
+Euler tour, so subtree queries are slices and lowest common ancestors are O(1)
+"""
+import re
+
+NODE_KINDS = ('family', 'subfamily', 'genus')
+
+
+def node_kind(node_id):
+    """'family', 'subfamily', 'genus' or 'language', from the WALS ID prefix"""
+    prefix, sep, _ = (node_id or '').partition('-')
+    return prefix if sep and prefix in NODE_KINDS else 'language'
+
+
+def split_rows(rows):
+    """Partition languages.csv rows into (languages, genealogy nodes)"""
+    languages, nodes = [], []
+    for row in rows:
+        (languages if node_kind(row.get('ID')) == 'language' else nodes).append(row)
+    return languages, nodes
+
+
+def _slug(name):
+    return re.sub(r'[^a-z0-9]+', '', (name or '').lower())
+
+
+def synthesize_nodes(languages):
+    """(ID, Name, Parent_ID) tuples for data without Parent_ID links
+
+    Family, Subfamily and Genus columns become ``family-…``, ``subfamily-…``
+    and ``genus-…`` nodes named like the ones in the WALS CLDF export.
+    """
+    nodes = {}
+    for lang in languages:
+        parent = ''
+        for kind, column in (('family', 'Family'), ('subfamily', 'Subfamily'), ('genus', 'Genus')):
+            name = lang.get(column, '')
+            if not name:
+                continue
+            node_id = f'{kind}-{_slug(name)}'
+            nodes.setdefault(node_id, (node_id, name, parent))
+            parent = node_id
+        nodes[lang.get('ID')] = (lang.get('ID'), lang.get('Name', ''), parent)
+    return list(nodes.values())
+
+
+class GenealogyIndex:
+    """Immutable tree index over genealogy nodes and languages
+
+    Every node gets a preorder interval [tin, tout) and a range of positions
+    in the preorder list of languages, so "is A under B" is two comparisons and
+    "all languages under B" is a slice. Lowest common ancestors use a sparse
+    table over the Euler tour (O(n log n) to build, O(1) per query).
+    """
+
+    def __init__(self, nodes):
+        self._ids = []
+        self._names = []
+        position = {}
+        parents = []
+        for node_id, name, parent_id in nodes:
+            if not node_id or node_id in position:
+                continue
+            position[node_id] = len(self._ids)
+            self._ids.append(node_id)
+            self._names.append(name or node_id)
+            parents.append(parent_id or '')
+
+        n = len(self._ids)
+        self._position = position
+        self._kinds = [node_kind(node_id) for node_id in self._ids]
+        self._parent = [position.get(p, -1) for p in parents]
+        self._children = [[] for _ in range(n)]
+        for i, p in enumerate(self._parent):
+            if p >= 0:
+                self._children[p].append(i)
+        for children in self._children:
+            children.sort(key=lambda i: self._names[i].lower())
+
+        self._depth = [0] * n
+        self._tin = [0] * n
+        self._tout = [0] * n
+        self._first = [0] * n
+        self._lang_lo = [0] * n
+        self._lang_hi = [0] * n
+        self._languages = []
+        self._euler = []
+
+        roots = [i for i in range(n) if self._parent[i] < 0]
+        roots.sort(key=lambda i: self._names[i].lower())
+        visited = [False] * n
+        clock = 0
+        # Nodes on a Parent_ID cycle are unreachable from the roots; each
+        # unvisited node starts its own tree so the index stays total
+        for start in roots + list(range(n)):
+            if visited[start]:
+                continue
+            visited[start] = True
+            self._parent[start] = -1
+            self._depth[start] = 0
+            stack = [(start, 0)]
+            self._enter(start, clock)
+            clock += 1
+            while stack:
+                node, k = stack[-1]
+                children = self._children[node]
+                while k < len(children) and visited[children[k]]:
+                    k += 1
+                if k < len(children):
+                    child = children[k]
+                    stack[-1] = (node, k + 1)
+                    visited[child] = True
+                    self._parent[child] = node
+                    self._depth[child] = self._depth[node] + 1
+                    stack.append((child, 0))
+                    self._enter(child, clock)
+                    clock += 1
+                else:
+                    stack.pop()
+                    self._tout[node] = clock
+                    self._lang_hi[node] = len(self._languages)
+                    if stack:
+                        self._euler.append(stack[-1][0])
+
+        self._roots = tuple(self._ids[i] for i in roots)
+        self._languages = tuple(self._languages)
+        self._build_sparse_table()
+
+    def _enter(self, node, clock):
+        self._tin[node] = clock
+        self._first[node] = len(self._euler)
+        self._euler.append(node)
+        self._lang_lo[node] = len(self._languages)
+        if self._kinds[node] == 'language':
+            self._languages.append(self._ids[node])
+
+    def _build_sparse_table(self):
+        depth = self._depth
+        level = list(self._euler)
+        table = [level]
+        span = 1
+        while 2 * span <= len(level):
+            previous = table[-1]
+            level = [a if depth[a] <= depth[b] else b
+                     for a, b in zip(previous, previous[span:])]
+            table.append(level)
+            span *= 2
+        self._sparse = table
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from languages.csv rows; without Parent_ID links, nodes are synthesized"""
+        rows = list(rows)
+        if any(row.get('Parent_ID') for row in rows):
+            return cls((row.get('ID'), row.get('Name', ''), row.get('Parent_ID', '')) for row in rows)
+        return cls(synthesize_nodes(rows))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, node_id):
+        return node_id in self._position
+
+    @property
+    def roots(self):
+        return self._roots
+
+    def _index(self, node_id):
+        try:
+            return self._position[node_id]
+        except KeyError:
+            raise KeyError(f'unknown genealogy node: {node_id}') from None
+
+    def node(self, node_id):
+        """Summary dict: ID, Name, kind, depth, parent and language count"""
+        i = self._index(node_id)
+        parent = self._parent[i]
+        return {
+            'ID': node_id,
+            'Name': self._names[i],
+            'kind': self._kinds[i],
+            'depth': self._depth[i],
+            'parent': self._ids[parent] if parent >= 0 else None,
+            'language_count': self._lang_hi[i] - self._lang_lo[i],
+        }
+
+    def parent(self, node_id):
+        parent = self._parent[self._index(node_id)]
+        return self._ids[parent] if parent >= 0 else None
+
+    def children(self, node_id):
+        """IDs of the direct children, sorted by name"""
+        return [self._ids[c] for c in self._children[self._index(node_id)]]
+
+    def ancestors(self, node_id):
+        """IDs from the parent up to the root (the tree is at most a few levels deep)"""
+        chain = []
+        i = self._parent[self._index(node_id)]
+        while i >= 0:
+            chain.append(self._ids[i])
+            i = self._parent[i]
+        return chain
+
+    def is_ancestor(self, ancestor_id, node_id):
+        """True if ancestor_id is node_id or one of its ancestors (O(1))"""
+        a, b = self._index(ancestor_id), self._index(node_id)
+        return self._tin[a] <= self._tin[b] and self._tout[b] <= self._tout[a]
+
+    def languages_under(self, node_id):
+        """IDs of all languages in the subtree, in tree order (an O(1) slice bound)"""
+        i = self._index(node_id)
+        return self._languages[self._lang_lo[i]:self._lang_hi[i]]
+
+    def language_count(self, node_id):
+        i = self._index(node_id)
+        return self._lang_hi[i] - self._lang_lo[i]
+
+    def lca(self, a_id, b_id):
+        """Lowest common ancestor ID, or None if the nodes are in different trees"""
+        a, b = self._index(a_id), self._index(b_id)
+        lo, hi = sorted((self._first[a], self._first[b]))
+        k = (hi - lo + 1).bit_length() - 1
+        x, y = self._sparse[k][lo], self._sparse[k][hi - (1 << k) + 1]
+        node = x if self._depth[x] <= self._depth[y] else y
+        # A minimum at depth 0 between two different roots means no common tree
+        if self._depth[node] == 0 and not (self._tin[node] <= self._tin[a] < self._tout[node]
+                                           and self._tin[node] <= self._tin[b] < self._tout[node]):
+            return None
+        return self._ids[node]
@@ -0,0 +1,146 @@
+"""
+Great-circle distances and nearest-neighbour graph for WALS languages
+Vectorized haversine distances plus a k-nearest-neighbour graph over the
+CodeMatrix rows, persisted in the disk cache per dataset version
+"""
+import numpy as np
+
+import cache
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Neighbours kept per language; also the neighbourhood used for areal statistics
+DEFAULT_K = 16
+
+# Bump when the graph layout changes so stale disk cache entries are ignored
+CACHE_NAME = 'knn-v1'
+
+# Queries per block when ranking similarities (bounds memory to ~block x n floats)
+BLOCK_ROWS = 256
+
+# Latitude band searched first around each block of queries
+BAND_DEGREES = 5.0
+BAND_KM = BAND_DEGREES * np.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between points given in degrees (broadcasts)"""
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _nearest(vectors, lat, lon, queries, lo, hi, k):
+    """(indexes, km) of the k nearest candidates in [lo, hi) for each query, closest first
+
+    Ranks by dot product of unit vectors (same order as great-circle distance),
+    then measures only the k winners with the haversine formula.
+    """
+    similarity = vectors[queries] @ vectors[lo:hi].T
+    own = queries - lo
+    inside = (own >= 0) & (own < hi - lo)
+    similarity[np.flatnonzero(inside), own[inside]] = -np.inf
+    nearest = np.argpartition(similarity, similarity.shape[1] - k, axis=1)[:, -k:] + lo
+    found = haversine_km(lat[queries, None], lon[queries, None], lat[nearest], lon[nearest])
+    order = np.argsort(found, axis=1, kind='stable')
+    return np.take_along_axis(nearest, order, axis=1), np.take_along_axis(found, order, axis=1)
+
+
+def _unit_vectors(latitude, longitude):
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+class NeighbourGraph:
+    """k nearest neighbours of every language with coordinates
+
+    ``neighbours[r]`` and ``distances[r]`` hold the CodeMatrix rows and
+    distances (km, float32) of the k nearest languages to row r, closest
+    first; rows without coordinates have -1 / inf. Ranking uses dot products
+    of unit vectors, which order points exactly like great-circle distance,
+    so each block of queries is one matrix product against the languages in
+    a latitude band around it (all languages where the band is too sparse).
+    """
+
+    def __init__(self, latitude, longitude, neighbours, distances):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.neighbours = neighbours
+        self.distances = distances
+        self.located = ~(np.isnan(latitude) | np.isnan(longitude))
+        for array in (self.neighbours, self.distances, self.located):
+            array.setflags(write=False)
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    @classmethod
+    def build(cls, matrix, k=DEFAULT_K):
+        latitude, longitude = matrix.latitude, matrix.longitude
+        n = len(latitude)
+        # Located rows sorted by latitude: a block of queries only needs the
+        # candidates within BAND_DEGREES of its latitude range
+        rows = np.flatnonzero(~(np.isnan(latitude) | np.isnan(longitude)))
+        rows = rows[np.argsort(latitude[rows], kind='stable')]
+        lat, lon = latitude[rows], longitude[rows]
+        vectors = _unit_vectors(lat, lon)
+        k_eff = max(min(k, len(rows) - 1), 0)
+        neighbours = np.full((n, k), -1, dtype=np.int32)
+        distances = np.full((n, k), np.inf, dtype=np.float32)
+
+        for start in range(0, len(rows) if k_eff else 0, BLOCK_ROWS):
+            queries = np.arange(start, min(start + BLOCK_ROWS, len(rows)))
+            lo = np.searchsorted(lat, lat[queries[0]] - BAND_DEGREES, 'left')
+            hi = np.searchsorted(lat, lat[queries[-1]] + BAND_DEGREES, 'right')
+            if hi - lo <= k_eff:
+                lo, hi = 0, len(rows)
+            nearest, found = _nearest(vectors, lat, lon, queries, lo, hi, k_eff)
+            # Anything outside the band is farther than BAND_KM: only rows whose
+            # k-th candidate is beyond that need the full pass
+            redo = found[:, -1] > BAND_KM
+            if redo.any() and (lo, hi) != (0, len(rows)):
+                nearest[redo], found[redo] = _nearest(vectors, lat, lon, queries[redo], 0, len(rows), k_eff)
+            neighbours[rows[queries], :k_eff] = rows[nearest]
+            distances[rows[queries], :k_eff] = found
+        return cls(latitude, longitude, neighbours, distances)
+
+    @classmethod
+    def cached(cls, matrix, version, k=DEFAULT_K):
+        """Load the graph of a dataset version from the disk cache, or build and store it"""
+        arrays = cache.load_arrays(CACHE_NAME, version)
+        if arrays is not None and arrays['neighbours'].shape == (len(matrix.latitude), k):
+            return cls(matrix.latitude, matrix.longitude, arrays['neighbours'], arrays['distances'])
+        graph = cls.build(matrix, k)
+        cache.store_arrays(CACHE_NAME, version, {'neighbours': graph.neighbours, 'distances': graph.distances})
+        return graph
+
+    def nearest(self, row, count=None):
+        """(rows, distances) of the nearest languages, up to k (closest first)"""
+        rows, distances = self.neighbours[row], self.distances[row]
+        found = rows >= 0
+        return rows[found][:count], distances[found][:count]
+
+    def distances_from(self, row):
+        """Distance in km from one language to every row (NaN where coordinates are missing)"""
+        return haversine_km(self.latitude[row], self.longitude[row], self.latitude, self.longitude)
+
+    def within(self, row, radius_km):
+        """(rows, distances) of all languages within radius_km of a language, closest first
+
+        Answered from the graph when the radius is inside the k-th neighbour's
+        distance, otherwise by one vectorized pass over all languages.
+        """
+        if not self.located[row]:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        rows, distances = self.nearest(row)
+        if len(rows) == self.k and radius_km >= distances[-1]:
+            everything = self.distances_from(row)
+            everything[row] = np.nan
+            rows = np.flatnonzero(everything <= radius_km)
+            distances = everything[rows]
+            order = np.argsort(distances, kind='stable')
+            return rows[order], distances[order].astype(np.float32)
+        inside = distances <= radius_km
+        return rows[inside], distances[inside]
@@ -0,0 +1,248 @@
+"""
+Lightweight request and data-loader instrumentation for the WALS explorer
+Collects per-route latency histograms and per-method loader timings and
+renders them in the Prometheus text exposition format
+"""
+import time
+import threading
+import functools
+from bisect import bisect_left
+
+# Latency buckets in seconds (upper bounds, Prometheus "le" labels)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _Histogram:
+    """Cumulative-friendly histogram with fixed bucket bounds"""
+    __slots__ = ('counts', 'count', 'total')
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * (n_buckets + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+
+class _MethodStats:
+    """Call statistics for a single data loader method"""
+    __slots__ = ('calls', 'total', 'max', 'errors', 'result_items')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.result_items = 0
+
+
+class MetricsRegistry:
+    """Thread-safe in-memory registry of request and loader metrics
+
+    Recording a sample is a dictionary lookup, a bisect and a few integer
+    additions under a lock, so the registry can stay enabled in production.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._requests = {}  # (route, method, status) -> count
+        self._latency = {}   # (route, method) -> _Histogram
+        self._loader = {}    # method name -> _MethodStats
+        self.started = time.time()
+
+    def observe_request(self, route, method, status, duration):
+        """Record one handled request"""
+        index = bisect_left(self.buckets, duration)
+        with self._lock:
+            key = (route, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            hist = self._latency.get((route, method))
+            if hist is None:
+                hist = self._latency[(route, method)] = _Histogram(len(self.buckets))
+            hist.counts[index] += 1
+            hist.count += 1
+            hist.total += duration
+
+    def observe_loader_call(self, name, duration, size=None, error=False):
+        """Record one data loader method call"""
+        with self._lock:
+            stats = self._loader.get(name)
+            if stats is None:
+                stats = self._loader[name] = _MethodStats()
+            stats.calls += 1
+            stats.total += duration
+            if duration > stats.max:
+                stats.max = duration
+            if error:
+                stats.errors += 1
+            if size is not None:
+                stats.result_items += size
+
+    def snapshot(self):
+        """Return a plain-dict copy of all metrics (for JSON or tests)"""
+        with self._lock:
+            return {
+                'requests': {'|'.join(k): v for k, v in self._requests.items()},
+                'latency': {
+                    '|'.join(k): {'count': h.count, 'sum': h.total, 'buckets': list(h.counts)}
+                    for k, h in self._latency.items()
+                },
+                'loader': {
+                    name: {
+                        'calls': s.calls, 'total': s.total, 'max': s.max,
+                        'errors': s.errors, 'result_items': s.result_items
+                    }
+                    for name, s in self._loader.items()
+                },
+            }
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format (v0.0.4)"""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted((k, h.count, h.total, list(h.counts)) for k, h in self._latency.items())
+            loader = sorted(
+                (name, s.calls, s.total, s.max, s.errors, s.result_items)
+                for name, s in self._loader.items()
+            )
+
+        lines = [
+            '# HELP wals_uptime_seconds Seconds since the metrics registry was created.',
+            '# TYPE wals_uptime_seconds gauge',
+            f'wals_uptime_seconds {_fmt(time.time() - self.started)}',
+            '# HELP wals_http_requests_total Handled HTTP requests by route, method and status.',
+            '# TYPE wals_http_requests_total counter',
+        ]
+        for (route, method, status), count in requests:
+            lines.append(
+                f'wals_http_requests_total{{{_labels(route=route, method=method, status=status)}}} {count}'
+            )
+
+        lines += [
+            '# HELP wals_http_request_duration_seconds Request latency by route and method.',
+            '# TYPE wals_http_request_duration_seconds histogram',
+        ]
+        for (route, method), count, total, counts in latency:
+            labels = _labels(route=route, method=method)
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(
+                    f'wals_http_request_duration_seconds_bucket{{{labels},le="{_fmt(bound)}"}} {cumulative}'
+                )
+            lines.append(f'wals_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'wals_http_request_duration_seconds_sum{{{labels}}} {_fmt(total)}')
+            lines.append(f'wals_http_request_duration_seconds_count{{{labels}}} {count}')
+
+        loader_series = (
+            ('wals_loader_calls_total', 'counter', 'Data loader method calls.', 1),
+            ('wals_loader_seconds_total', 'counter', 'Total time spent in data loader methods.', 2),
+            ('wals_loader_seconds_max', 'gauge', 'Slowest single call of each data loader method.', 3),
+            ('wals_loader_errors_total', 'counter', 'Data loader method calls that raised.', 4),
+            ('wals_loader_result_items_total', 'counter', 'Items returned by data loader methods.', 5),
+        )
+        for metric, kind, help_text, column in loader_series:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for row in loader:
+                lines.append(f'{metric}{{{_labels(method=row[0])}}} {_fmt(row[column])}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _fmt(value):
+    """Format a sample value the way Prometheus expects"""
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _labels(**labels):
+    """Render a label set, escaping values per the exposition format"""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return ','.join(parts)
+
+
+def _result_size(result):
+    """Best-effort size of a loader result: list length, items of a paginated dict, 1 for a single record"""
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return len(result['items']) if 'items' in result else 1
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return None
+
+
+def instrument_loader(loader, registry):
+    """Wrap every public method of a data loader instance with timing
+
+    Only the instance is patched, so other loaders (and the class) are
+    unaffected. Only the outermost call is recorded: methods the loader
+    calls on itself run untimed, so nested time is not counted twice.
+    Returns the loader for convenience.
+    """
+    for name in dir(type(loader)):
+        if name.startswith('_'):
+            continue
+        method = getattr(loader, name)
+        if not callable(method):
+            continue
+        setattr(loader, name, _timed(method, name, registry))
+    return loader
+
+
+# Per-thread flag set while a timed loader call is in progress (see _timed)
+_active = threading.local()
+
+
+def _timed(method, name, registry):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if getattr(_active, 'timing', False):
+            return method(*args, **kwargs)
+        _active.timing = True
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception:
+            registry.observe_loader_call(name, time.perf_counter() - start, error=True)
+            raise
+        finally:
+            _active.timing = False
+        registry.observe_loader_call(name, time.perf_counter() - start, _result_size(result))
+        return result
+    return wrapper
+
+
+def init_app(app, registry=None, endpoint='/metrics'):
+    """Register request timing hooks and the metrics endpoint on a Flask app"""
+    from flask import Response, g, request
+
+    registry = registry or MetricsRegistry()
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            # Use the URL rule rather than the raw path to keep label cardinality bounded
+            rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+            registry.observe_request(rule, request.method, response.status_code,
+                                     time.perf_counter() - start)
+        return response
+
+    def metrics():
+        """Prometheus scrape endpoint"""
+        return Response(registry.render_prometheus(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule(endpoint, 'metrics', metrics)
+    app.extensions['wals_metrics'] = registry
+    return registry
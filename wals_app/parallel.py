@@ -0,0 +1,55 @@
+"""
+Process-pool helper for per-feature batch computations
+Splits the work into index chunks and maps a function over them, in worker
+processes when there is enough work and more than one CPU
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# Chunks per worker, so uneven costs still balance out
+CHUNKS_PER_WORKER = 4
+
+
+def _map(tasks, workers, use_pool):
+    """Concatenated results of (func, *args) tasks, in order
+
+    Runs in this process with one worker, ``use_pool=False`` or a pool that
+    cannot start.
+    """
+    workers = workers or os.cpu_count() or 1
+    if use_pool and workers > 1 and len(tasks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(*task) for task in tasks]
+                return [result for future in futures for result in future.result()]
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Process pool unavailable ({e}), continuing in one process")
+    return [result for func, *args in tasks for result in func(*args)]
+
+
+def _chunks(count, workers):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [np.arange(count)]
+    return [chunk for chunk in np.array_split(np.arange(count), workers * CHUNKS_PER_WORKER) if len(chunk)]
+
+
+def map_chunks(func, count, args=(), workers=None, use_pool=True):
+    """[func(chunk, *args) results for index chunks of range(count), concatenated]
+
+    ``func`` must be a module-level function returning a list. ``workers``
+    defaults to the CPU count.
+    """
+    return _map([(func, chunk, *args) for chunk in _chunks(count, workers)], workers, use_pool)
+
+
+def map_columns(func, codes, args=(), workers=None, use_pool=True):
+    """[func(codes[:, chunk], chunk, *args) results, concatenated in column order]
+
+    Like map_chunks, but each worker only receives its own columns.
+    """
+    return _map([(func, codes[:, chunk], chunk, *args) for chunk in _chunks(codes.shape[1], workers)],
+                workers, use_pool)
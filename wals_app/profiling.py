@@ -0,0 +1,124 @@
+"""
+Opt-in per-request profiling for the WALS explorer
+Wraps selected Flask requests in cProfile and writes pstats dumps that can be
+fed to flame graph tools (e.g. ``flameprof``, ``snakeviz``, ``gprof2dot``)
+
+Enable it with environment variables:
+
+    WALS_PROFILE=1                     profile every request
+    WALS_PROFILE=feature_detail,search profile only these endpoints
+    WALS_PROFILE_DIR=/tmp/profiles     output directory (default: wals_app/profiles)
+    WALS_PROFILE_MIN_MS=200            only keep profiles slower than this
+
+In debug mode a single request can also be profiled by sending the
+``X-WALS-Profile: 1`` header; the header is ignored when debug is off.
+Only one request is profiled at a time; concurrent requests run unprofiled.
+"""
+import os
+import re
+import threading
+import time
+import warnings
+import cProfile
+from datetime import datetime
+from pathlib import Path
+
+PROFILE_HEADER = 'X-WALS-Profile'
+
+
+def _parse_ms(value):
+    """Milliseconds threshold as a float; invalid or negative values warn and fall back to 0"""
+    try:
+        ms = float(value)
+    except (TypeError, ValueError):
+        ms = -1.0
+    if not ms >= 0:
+        warnings.warn(f'ignoring invalid profile threshold {value!r}, profiling all requests')
+        return 0.0
+    return ms
+
+
+class RequestProfiler:
+    """Decides which requests to profile and writes their profiles"""
+
+    def __init__(self, output_dir=None, endpoints=None, min_ms=0.0, enabled=False):
+        if output_dir is None:
+            output_dir = Path(__file__).parent / 'profiles'
+        self.output_dir = Path(output_dir)
+        self.endpoints = set(endpoints) if endpoints else None
+        self.min_ms = _parse_ms(min_ms)
+        self.enabled = enabled
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Build a profiler configured from WALS_PROFILE* environment variables"""
+        environ = os.environ if environ is None else environ
+        setting = environ.get('WALS_PROFILE', '').strip()
+        enabled = setting.lower() not in ('', '0', 'false', 'no', 'off')
+        endpoints = None
+        if enabled and setting.lower() not in ('1', 'true', 'yes', 'on', 'all'):
+            endpoints = [e.strip() for e in setting.split(',') if e.strip()]
+        return cls(
+            output_dir=environ.get('WALS_PROFILE_DIR') or None,
+            endpoints=endpoints,
+            min_ms=environ.get('WALS_PROFILE_MIN_MS', 0) or 0,
+            enabled=enabled,
+        )
+
+    def wants(self, endpoint, headers, debug):
+        """Return True if this request should be profiled"""
+        if debug and headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes'):
+            return True
+        if not self.enabled:
+            return False
+        return self.endpoints is None or endpoint in self.endpoints
+
+    def write(self, profile, endpoint, duration_ms):
+        """Dump a finished profile; returns the file path or None if skipped"""
+        if duration_ms < self.min_ms:
+            return None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S-%f')
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', endpoint or 'unmatched')
+        path = self.output_dir / f'{name}_{duration_ms:.0f}ms_{stamp}.prof'
+        profile.dump_stats(str(path))
+        return path
+
+
+def init_app(app, profiler=None):
+    """Register profiling hooks on a Flask app"""
+    from flask import g, request
+
+    profiler = profiler or RequestProfiler.from_env()
+
+    @app.before_request
+    def _start_profile():
+        # Only one profiler can be active per process, so overlapping requests are skipped
+        if not profiler.wants(request.endpoint, request.headers, app.debug):
+            return
+        if not profiler.lock.acquire(blocking=False):
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            profiler.lock.release()
+            return
+        g._profile = profile
+        g._profile_start = time.perf_counter()
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        profiler.lock.release()
+        duration_ms = (time.perf_counter() - g.pop('_profile_start')) * 1000
+        path = profiler.write(profile, request.endpoint, duration_ms)
+        if path is not None:
+            app.logger.info('Profiled %s in %.1f ms -> %s', request.path, duration_ms, path)
+
+    app.extensions['wals_profiler'] = profiler
+    return profiler
@@ -0,0 +1,155 @@
+"""
+Boolean language queries for WALS data
+Parses expressions such as ``81A:1 AND (85A:2 OR 85A:3) AND macroarea:Africa``
+and evaluates them as set algebra over a BitsetIndex
+"""
+import re
+
+import numpy as np
+
+from bitsets import FACETS
+
+# Limits per query, so parsing and evaluation stay well inside the recursion limit
+MAX_DEPTH = 64
+MAX_TERMS = 256
+
+_TOKEN = re.compile(r'\s*(?:(?P<paren>[()])|(?P<term>[^\s()":]+:(?:"[^"]*"|[^\s()"]*))|(?P<word>[^\s()]+))')
+_KEYWORDS = ('AND', 'OR', 'NOT')
+
+
+def _tokens(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match.group('paren'):
+            tokens.append(match.group('paren'))
+        elif match.group('term'):
+            field, _, value = match.group('term').partition(':')
+            if not value.strip('"'):
+                raise ValueError(f'missing value after "{field}:"')
+            tokens.append(('term', field, value.strip('"')))
+        elif match.group('word').upper() in _KEYWORDS:
+            tokens.append(match.group('word').upper())
+        else:
+            raise ValueError(f'expected field:value at "{match.group("word")}"')
+        position = match.end()
+    if sum(isinstance(token, tuple) for token in tokens) > MAX_TERMS:
+        raise ValueError(f'query has more than {MAX_TERMS} terms')
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the tokens; NOT binds tightest, then AND (or juxtaposition), then OR"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError('empty query')
+        node = self._or()
+        if self._peek() is not None:
+            raise ValueError(f'unexpected {self._describe(self._peek())}')
+        return node
+
+    def _or(self):
+        node = self._and()
+        while self._peek() == 'OR':
+            self._next()
+            node = ('or', node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek() not in (None, 'OR', ')'):
+            if self._peek() == 'AND':
+                self._next()
+            node = ('and', node, self._not())
+        return node
+
+    def _not(self):
+        token = self._next()
+        if token == 'NOT':
+            return ('not', self._nested(self._not))
+        if token == '(':
+            node = self._nested(self._or)
+            if self._next() != ')':
+                raise ValueError('missing closing parenthesis')
+            return node
+        if isinstance(token, tuple):
+            return token
+        raise ValueError(f'expected a term, NOT or "(" but got {self._describe(token)}')
+
+    def _nested(self, rule):
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ValueError(f'query nested deeper than {MAX_DEPTH} levels')
+        node = rule()
+        self.depth -= 1
+        return node
+
+    @staticmethod
+    def _describe(token):
+        if token is None:
+            return 'end of query'
+        if isinstance(token, tuple):
+            return f'"{token[1]}:{token[2]}"'
+        return f'"{token}"'
+
+
+def parse(text):
+    """Syntax tree of a query string; raises ValueError on malformed queries
+
+    Terms are ``field:value``: a feature ID with a code number
+    (``81A:1``), several code numbers (``85A:2,3``) or ``*`` for any value,
+    or a facet from bitsets.FACETS (``family:Indo-European``,
+    ``macroarea:"South America"``, ``sample:100``). Terms combine with AND,
+    OR, NOT and parentheses; adjacent terms are ANDed.
+    """
+    return _Parser(_tokens(text)).parse()
+
+
+def _term_bits(index, field, value):
+    if field.lower() in FACETS:
+        return index.facet_bits(field.lower(), value)
+    try:
+        if value == '*':
+            return index.feature_bits(field)
+        index.feature_bits(field)
+        codes = [int(code) for code in value.split(',')]
+    except KeyError as e:
+        raise ValueError(e.args[0]) from None
+    except ValueError:
+        raise ValueError(f'expected code numbers or * in "{field}:{value}"') from None
+    bits = np.zeros(index.words, dtype=np.uint64)
+    for code in codes:
+        bits = bits | index.value_bits(field, code)
+    return bits
+
+
+def evaluate(node, index):
+    """Bitset of the languages matching a parse() tree over a BitsetIndex"""
+    kind = node[0]
+    if kind == 'term':
+        return _term_bits(index, node[1], node[2])
+    if kind == 'not':
+        return index.all_bits & ~evaluate(node[1], index)
+    left, right = evaluate(node[1], index), evaluate(node[2], index)
+    return left & right if kind == 'and' else left | right
+
+
+def run(text, index):
+    """Bitset of the languages matching a query string (ValueError if malformed)"""
+    return evaluate(parse(text), index)
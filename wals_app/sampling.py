@@ -0,0 +1,175 @@
+"""
+Genealogically stratified language sampling for WALS data
+Draws reproducible genus- or family-balanced samples from the in-memory
+CodeMatrix using precomputed per-group index arrays
+
+Usage:
+    python sampling.py --by genus --seed 1                      # one language per genus
+    python sampling.py --by family --features 81A,83A --seed 7   # only languages coding both
+    python sampling.py --bootstrap 81A --iterations 5000         # code proportions with 95% intervals
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+STRATA = ('genus', 'family')
+SAMPLE_PRESETS = {'Samples_100': 'samples_100', 'Samples_200': 'samples_200'}
+
+
+class _Strata:
+    """Languages grouped by genus or family: one index array ordered by group"""
+
+    def __init__(self, group_of, n_groups):
+        classified = np.flatnonzero(group_of >= 0)
+        self.group_of = group_of
+        self.n_groups = n_groups
+        self.members = classified[np.argsort(group_of[classified], kind='stable')]
+
+
+class StratifiedSampler:
+    """Genus- or family-balanced sampling over a CodeMatrix
+
+    For a request, the eligible members of each group are a contiguous run of
+    one array, described by (starts, sizes). Drawing one language per group
+    is then ``members[starts + floor(u * sizes)]`` for a vector of uniforms,
+    so thousands of bootstrap resamples are a single array operation.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self._strata = {
+            'genus': _Strata(matrix.genus_of, len(matrix.genus_names)),
+            'family': _Strata(matrix.family_of, len(matrix.family_names)),
+        }
+
+    def eligible(self, features=(), preset=''):
+        """Mask of languages that have data for all features (and are in the preset sample)"""
+        mask = self.matrix.has_data(features)
+        if preset:
+            if preset not in SAMPLE_PRESETS:
+                raise ValueError(f'unknown sample preset: {preset} (expected one of {", ".join(SAMPLE_PRESETS)})')
+            mask &= getattr(self.matrix, SAMPLE_PRESETS[preset])
+        return mask
+
+    def pool(self, by='genus', features=(), preset=''):
+        """(members, starts, sizes, group indexes) of the non-empty eligible groups"""
+        if by not in self._strata:
+            raise ValueError(f'unknown stratum: {by} (expected one of {", ".join(STRATA)})')
+        strata = self._strata[by]
+        members = strata.members[self.eligible(features, preset)[strata.members]]
+        counts = np.bincount(strata.group_of[members], minlength=strata.n_groups)
+        groups = np.flatnonzero(counts)
+        sizes = counts[groups]
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)
+        return members, starts, sizes, groups
+
+    def sample(self, by='genus', per_group=1, features=(), preset='', groups=None, seed=None):
+        """Language indexes of one sample: up to per_group languages from each group
+
+        With ``groups``, only that many randomly chosen groups contribute.
+        The same seed always gives the same sample for the same dataset.
+        """
+        if per_group < 1:
+            raise ValueError('per_group must be at least 1')
+        rng = np.random.default_rng(seed)
+        members, starts, sizes, _ = self.pool(by, features, preset)
+        if groups is not None and groups < len(sizes):
+            chosen = np.sort(rng.choice(len(sizes), size=max(groups, 0), replace=False))
+            starts, sizes = starts[chosen], sizes[chosen]
+
+        if per_group == 1:
+            picks = starts + (rng.random(len(sizes)) * sizes).astype(np.intp)
+        else:
+            picks = np.concatenate([start + rng.choice(size, size=min(per_group, size), replace=False)
+                                    for start, size in zip(starts, sizes)] or [np.empty(0, np.intp)])
+        return np.sort(members[picks])
+
+    def resample(self, iterations, by='genus', features=(), preset='', seed=None):
+        """(iterations x groups) language indexes, one random language per group per row"""
+        rng = np.random.default_rng(seed)
+        members, starts, sizes, _ = self.pool(by, features, preset)
+        return members[starts + (rng.random((iterations, len(sizes))) * sizes).astype(np.intp)]
+
+    def bootstrap_proportions(self, feature_id, iterations=1000, by='genus', features=(), preset='',
+                              seed=None, confidence=0.95):
+        """Proportion of each code of a feature over balanced resamples
+
+        Returns {code number: {'mean', 'low', 'high'}} where low/high bound the
+        central ``confidence`` interval across iterations.
+        """
+        column = self.matrix.column(feature_id)
+        draws = column[self.resample(iterations, by, (feature_id, *features), preset, seed)]
+        if draws.shape[1] == 0:
+            return {}
+        codes = np.unique(draws)
+        proportions = (draws[:, :, None] == codes).mean(axis=1)
+        tail = (1 - confidence) / 2 * 100
+        low, high = np.percentile(proportions, [tail, 100 - tail], axis=0)
+        return {int(code): {'mean': float(proportions[:, k].mean()), 'low': float(low[k]), 'high': float(high[k])}
+                for k, code in enumerate(codes)}
+
+
+def _feature_list(text):
+    return [f.strip() for f in text.split(',') if f.strip()] if text else []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cldf', help='CLDF directory (default: ../cldf)')
+    parser.add_argument('--by', choices=STRATA, default='genus', help='stratify by genus or family (default genus)')
+    parser.add_argument('--per-group', type=int, default=1, help='languages per group (default 1)')
+    parser.add_argument('--groups', type=int, help='draw from this many random groups only')
+    parser.add_argument('--features', type=_feature_list, default=[],
+                        help='comma-separated feature IDs the languages must have data for')
+    parser.add_argument('--preset', choices=sorted(SAMPLE_PRESETS), help='restrict to a WALS sample')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (default 1)')
+    parser.add_argument('--bootstrap', metavar='FEATURE', help='report code proportions over resamples')
+    parser.add_argument('--iterations', type=int, default=1000, help='bootstrap iterations (default 1000)')
+    parser.add_argument('--json', action='store_true', help='print JSON instead of CSV/text')
+    args = parser.parse_args(argv)
+
+    from data_loader import WALSDataLoader
+    loader = WALSDataLoader(cldf_path=args.cldf)
+    sampler = loader.get_sampler()
+
+    try:
+        if args.bootstrap:
+            start = time.perf_counter()
+            result = sampler.bootstrap_proportions(args.bootstrap, args.iterations, by=args.by,
+                                                   features=args.features, preset=args.preset or '',
+                                                   seed=args.seed)
+            elapsed = time.perf_counter() - start
+            names = {int(c.get('Number') or 0): c.get('Name', '') for c in loader.get_codes_for_feature(args.bootstrap)}
+            if args.json:
+                print(json.dumps({'feature': args.bootstrap, 'iterations': args.iterations, 'by': args.by,
+                                  'seconds': elapsed,
+                                  'codes': {names.get(k, str(k)): v for k, v in result.items()}}, indent=2))
+            else:
+                print(f'{args.bootstrap}: {args.iterations} {args.by}-balanced resamples in {elapsed:.2f}s')
+                for code, stats in result.items():
+                    print(f'  {code:>3} {names.get(code, ""):40s} {stats["mean"]:6.1%} '
+                          f'[{stats["low"]:6.1%}, {stats["high"]:6.1%}]')
+            return 0
+
+        indexes = sampler.sample(by=args.by, per_group=args.per_group, features=args.features,
+                                 preset=args.preset or '', groups=args.groups, seed=args.seed)
+    except (KeyError, ValueError) as e:
+        parser.error(str(e.args[0]) if e.args else str(e))
+
+    languages = [loader.get_language(loader.get_code_matrix().language_ids[i]) for i in indexes]
+    fields = ['ID', 'Name', 'Genus', 'Family', 'Macroarea']
+    if args.json:
+        print(json.dumps([{f: l.get(f, '') for f in fields} for l in languages], indent=2))
+    else:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(fields)
+        writer.writerows([l.get(f, '') for f in fields] for l in languages)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
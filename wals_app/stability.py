@@ -0,0 +1,158 @@
+"""
+Genealogical stability of WALS features
+Within-genus and within-family agreement rates against a cross-family
+baseline, computed from value counts in O(languages) per feature
+
+Usage:
+    python stability.py                # compute (or load) and list the most stable features
+    python stability.py --workers 1    # single process
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import cache
+import parallel
+from code_matrix import MISSING
+
+# Bump when the metrics change so stale disk cache entries are ignored
+CACHE_NAME = 'stability-v1'
+
+# Below this many matrix cells a process pool costs more than it saves
+POOL_MIN_CELLS = 5_000_000
+
+
+def _agreeing_pairs(counts):
+    """Number of unordered pairs within each count, summed over the last axis"""
+    counts = counts.astype(np.int64)
+    return (counts * (counts - 1) // 2).sum(axis=-1)
+
+
+def _within(codes, group_of, n_codes):
+    """(agreeing pairs, all pairs) between languages of the same group"""
+    classified = group_of >= 0
+    groups = group_of[classified]
+    counts = np.bincount(groups * n_codes + codes[classified])
+    return int(_agreeing_pairs(counts)), int(_agreeing_pairs(np.bincount(groups)))
+
+
+def _rate(agreeing, pairs):
+    return agreeing / pairs if pairs else None
+
+
+def feature_stability(column, genus_of, family_of):
+    """Agreement metrics of one feature column (see compute_all)
+
+    Counting pairs that share a value only needs the value counts per group:
+    a group with c_k languages of value k has sum(c_k * (c_k - 1) / 2)
+    agreeing pairs, so no pair of languages is ever enumerated.
+    """
+    present = column != MISSING
+    codes = column[present].astype(np.intp)
+    n = len(codes)
+    n_codes = int(codes.max()) + 1 if n else 1
+
+    all_agreeing = int(_agreeing_pairs(np.bincount(codes, minlength=n_codes)))
+    all_pairs = n * (n - 1) // 2
+    genus_agreeing, genus_pairs = _within(codes, genus_of[present], n_codes)
+    family_agreeing, family_pairs = _within(codes, family_of[present], n_codes)
+    # Baseline: pairs from different families (unclassified languages are their own family)
+    baseline_agreeing, baseline_pairs = all_agreeing - family_agreeing, all_pairs - family_pairs
+
+    genus_rate = _rate(genus_agreeing, genus_pairs)
+    family_rate = _rate(family_agreeing, family_pairs)
+    baseline_rate = _rate(baseline_agreeing, baseline_pairs)
+    return {
+        'languages': n,
+        'genus_pairs': genus_pairs,
+        'genus_agreement': genus_rate,
+        'family_pairs': family_pairs,
+        'family_agreement': family_rate,
+        'baseline_pairs': baseline_pairs,
+        'baseline_agreement': baseline_rate,
+        'genus_stability': genus_rate / baseline_rate if genus_rate is not None and baseline_rate else None,
+        'family_stability': family_rate / baseline_rate if family_rate is not None and baseline_rate else None,
+    }
+
+
+def _compute_chunk(columns, _, genus_of, family_of):
+    return [feature_stability(columns[:, j], genus_of, family_of)
+            for j in range(columns.shape[1])]
+
+
+def _rank(results, key):
+    """Store each feature's percentile rank (0-100) by ``key`` as ``key + '_rank'``"""
+    scored = sorted((m[key], feature_id) for feature_id, m in results.items() if m[key] is not None)
+    for position, (_, feature_id) in enumerate(scored):
+        results[feature_id][key + '_rank'] = round(100 * position / max(len(scored) - 1, 1))
+    for metrics in results.values():
+        metrics.setdefault(key + '_rank', None)
+
+
+def compute_all(matrix, workers=None):
+    """{feature ID: metrics} for every feature of a CodeMatrix
+
+    Metrics per feature: ``languages`` with data; ``genus_agreement`` and
+    ``family_agreement``, the share of same-genus / same-family language pairs
+    with the same value; ``baseline_agreement``, the same share for pairs from
+    different families; ``genus_stability``/``family_stability``, the
+    agreement divided by the baseline (1 means no genealogical signal), with
+    their percentile ranks among all features. Rates are None without pairs.
+
+    Features are split into chunks for a process pool of ``workers``
+    processes (default: CPU count) when the matrix is large enough.
+    """
+    metrics = parallel.map_columns(_compute_chunk, matrix.codes, (matrix.genus_of, matrix.family_of),
+                                   workers, use_pool=matrix.codes.size >= POOL_MIN_CELLS)
+
+    results = dict(zip(matrix.feature_ids, metrics))
+    _rank(results, 'genus_stability')
+    _rank(results, 'family_stability')
+    return results
+
+
+def stability_table(matrix, version, workers=None):
+    """compute_all, cached on disk per dataset version"""
+    return cache.cached_json(CACHE_NAME, version, lambda: compute_all(matrix, workers))
+
+
+def _percent(rate):
+    return f'{rate:7.1%}' if rate is not None else f'{"-":>7s}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cldf', help='CLDF directory (default: ../cldf)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--top', type=int, default=20, help='features to list (default 20)')
+    parser.add_argument('--refresh', action='store_true', help='recompute even if cached')
+    args = parser.parse_args(argv)
+
+    from data_loader import WALSDataLoader
+    loader = WALSDataLoader(cldf_path=args.cldf)
+    matrix = loader.get_code_matrix()
+
+    start = time.perf_counter()
+    if args.refresh:
+        results = compute_all(matrix, args.workers)
+        cache.store_json(CACHE_NAME, loader.dataset_version, results)
+    else:
+        results = stability_table(matrix, loader.dataset_version, args.workers)
+    print(f'{len(results)} features, {matrix.shape[0]} languages in {time.perf_counter() - start:.2f}s',
+          file=sys.stderr)
+
+    ranked = sorted((m['genus_stability'], feature_id) for feature_id, m in results.items()
+                    if m['genus_stability'] is not None)
+    print(f'{"feature":8s} {"genus":>7s} {"family":>7s} {"baseline":>8s} {"stability":>9s}  name')
+    for _, feature_id in reversed(ranked[-args.top:]):
+        m = results[feature_id]
+        name = (loader.get_feature(feature_id) or {}).get('Name', '')
+        print(f'{feature_id:8s} {_percent(m["genus_agreement"])} {_percent(m["family_agreement"])} '
+              f' {_percent(m["baseline_agreement"])} {m["genus_stability"]:9.2f}  {name}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+Shared fixtures for the wals_app unit tests
+The modules under test use flat imports, so wals_app itself goes on sys.path
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from code_matrix import CodeMatrix, MISSING  # noqa: E402
+
+
+@pytest.fixture
+def make_matrix():
+    """Factory for a CodeMatrix from a (languages, features) array of codes (MISSING = no value)
+
+    Languages are L0, L1, ... and features 1A, 2A, ...; ``genus``,
+    ``family``, ``macroarea``, ``latitude`` and ``longitude`` give one
+    entry per language.
+    """
+    def make(codes, genus=None, family=None, macroarea=None, latitude=None, longitude=None):
+        codes = np.asarray(codes)
+        n_languages, n_features = codes.shape
+        columns = {'Genus': genus, 'Family': family, 'Macroarea': macroarea,
+                   'Latitude': latitude, 'Longitude': longitude}
+        languages = []
+        for i in range(n_languages):
+            language = {'ID': f'L{i}', 'Name': f'Language {i}'}
+            for column, values in columns.items():
+                if values is not None:
+                    language[column] = '' if values[i] is None else str(values[i])
+            languages.append(language)
+        features = [{'ID': f'{j + 1}A'} for j in range(n_features)]
+        values = [{'Language_ID': f'L{i}', 'Parameter_ID': f'{j + 1}A', 'Code_Number': int(codes[i, j])}
+                  for i, j in zip(*np.nonzero(codes != MISSING))]
+        return CodeMatrix(languages, features, values)
+    return make
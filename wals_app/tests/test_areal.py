@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from areal import join_count
+from code_matrix import MISSING
+from geography import NeighbourGraph
+
+PERMUTATIONS = 199
+
+
+@pytest.fixture
+def graph(make_matrix):
+    """4-nearest-neighbour graph of two 5 x 5 grids of languages 90 degrees of longitude apart"""
+    lat, lon = np.meshgrid(np.arange(5.0), np.arange(5.0), indexing='ij')
+    latitude = np.concatenate([lat.ravel(), lat.ravel()])
+    longitude = np.concatenate([lon.ravel(), lon.ravel() + 90])
+    matrix = make_matrix(np.full((50, 1), MISSING), latitude=latitude, longitude=longitude)
+    return NeighbourGraph.build(matrix, k=4)
+
+
+def test_perfectly_clustered_column(graph):
+    column = np.repeat(np.array([1, 2], dtype=np.int16), 25)
+    result = join_count(column, graph.neighbours, PERMUTATIONS)
+    assert result['languages'] == 50 and result['edges'] == 200
+    assert result['same_value'] == 1.0
+    assert result['expected'] == pytest.approx(24 / 49)
+    # No shuffle reaches the observed joins, so p is the smallest possible value
+    assert result['p_value'] == pytest.approx(1 / (PERMUTATIONS + 1))
+    assert result['z_score'] > 5
+
+
+def test_random_column_is_not_clustered(graph):
+    column = np.random.default_rng(7).integers(1, 3, size=50).astype(np.int16)
+    result = join_count(column, graph.neighbours, PERMUTATIONS)
+    assert result['p_value'] > 0.05
+    assert abs(result['z_score']) < 2
+
+
+def test_missing_values_drop_their_edges(graph):
+    column = np.repeat(np.array([1, 2], dtype=np.int16), 25)
+    column[25:] = MISSING
+    result = join_count(column, graph.neighbours, PERMUTATIONS)
+    assert result['languages'] == 25 and result['edges'] == 100
+    # One value left: every join is same-value and shuffling cannot change that
+    assert result['same_value'] == 1.0 and result['z_score'] is None
+
+
+def test_same_seed_gives_the_same_result(graph):
+    column = np.random.default_rng(3).integers(1, 4, size=50).astype(np.int16)
+    assert join_count(column, graph.neighbours, 99, seed=5) == join_count(column, graph.neighbours, 99, seed=5)
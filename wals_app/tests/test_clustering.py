@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import clustering
+from code_matrix import MISSING
+
+
+def _planted(sizes=(12, 9, 6), n_features=8, seed=0):
+    """Codes of groups of languages sharing a profile, with a few mismatches and gaps"""
+    rng = np.random.default_rng(seed)
+    profiles = rng.integers(1, 5, size=(len(sizes), n_features))
+    profiles[1, :3] = profiles[0, :3] % 4 + 1  # groups differ in at least these features
+    profiles[2, 3:6] = profiles[1, 3:6] % 4 + 1
+    codes = np.repeat(profiles, sizes, axis=0)
+    noisy = rng.random(codes.shape) < 0.1
+    codes[noisy] = rng.integers(1, 5, size=np.count_nonzero(noisy))
+    codes[rng.random(codes.shape) < 0.1] = MISSING
+    return codes.astype(np.int16), np.repeat(np.arange(len(sizes)), sizes)
+
+
+def _same_partition(a, b):
+    return len(set(zip(a, b))) == len(set(a)) == len(set(b))
+
+
+def test_kmodes_is_stable_for_a_seed():
+    codes, _ = _planted()
+    first = clustering.kmodes(codes, k=3, seed=1, workers=1)
+    again = clustering.kmodes(codes, k=3, seed=1, workers=1)
+    split = clustering.kmodes(codes, k=3, seed=1, workers=2)
+    for other in (again, split):
+        np.testing.assert_array_equal(first[0], other[0])
+        np.testing.assert_array_equal(first[1], other[1])
+        assert first[2] == other[2]
+
+
+def test_kmodes_recovers_planted_groups():
+    codes, groups = _planted()
+    labels, modes, cost, iterations = clustering.kmodes(codes, k=3, n_init=8, seed=0, workers=1)
+    assert _same_partition(labels, groups)
+    assert modes.shape == (3, codes.shape[1]) and iterations <= clustering.MAX_ITER
+
+
+def test_kmodes_rejects_more_clusters_than_languages():
+    codes, _ = _planted()
+    with pytest.raises(ValueError):
+        clustering.kmodes(codes[:3], k=4)
+
+
+def test_build_numbers_clusters_by_size_and_skips_sparse_languages(make_matrix):
+    codes, groups = _planted()
+    codes = np.vstack([codes, np.full((1, codes.shape[1]), MISSING)])
+    result = clustering.Clustering.build(make_matrix(codes), k=3, n_init=8, workers=1)
+    assert result.labels[-1] == -1
+    assert list(result.sizes()) == [12, 9, 6]
+    assert _same_partition(result.labels[:-1], groups)
+
+
+def test_build_needs_enough_languages(make_matrix):
+    codes, _ = _planted()
+    codes[:2, 0], codes[2:, 0] = 1, MISSING
+    matrix = make_matrix(codes)
+    with pytest.raises(ValueError, match='only 2 languages'):
+        clustering.Clustering.build(matrix, k=3, feature_ids=['1A'], min_coverage=1.0)
+    with pytest.raises(ValueError, match='between 2 and'):
+        clustering.Clustering.build(matrix, k=1)
+
+
+def test_parameters_are_normalized():
+    assert clustering.parameters(['85A', '81A'], 0.23) == (('81A', '85A'), 0.25)
+    assert clustering.parameters(None, 0.2) == ((), 0.2)
+    with pytest.raises(ValueError):
+        clustering.parameters(['81A', '81A'], 0.2)
+    with pytest.raises(ValueError):
+        clustering.parameters([], 1.5)
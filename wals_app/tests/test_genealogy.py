@@ -0,0 +1,56 @@
+import pytest
+
+from genealogy import GenealogyIndex
+
+# family-a ─┬─ genus-a1 ── L1, L2
+#           └─ subfamily-x ── genus-a2 ── L3
+# family-b ─── genus-b1 ── L4
+NODES = [
+    ('family-a', 'A', ''),
+    ('genus-a1', 'A1', 'family-a'),
+    ('subfamily-x', 'X', 'family-a'),
+    ('genus-a2', 'A2', 'subfamily-x'),
+    ('family-b', 'B', ''),
+    ('genus-b1', 'B1', 'family-b'),
+    ('L1', 'One', 'genus-a1'),
+    ('L2', 'Two', 'genus-a1'),
+    ('L3', 'Three', 'genus-a2'),
+    ('L4', 'Four', 'genus-b1'),
+]
+
+
+@pytest.fixture
+def tree():
+    return GenealogyIndex(NODES)
+
+
+def test_lca_of_siblings_is_their_parent(tree):
+    assert tree.lca('L1', 'L2') == 'genus-a1'
+    assert tree.lca('L2', 'L1') == 'genus-a1'
+
+
+def test_lca_of_cousins_is_the_shared_family(tree):
+    assert tree.lca('L1', 'L3') == 'family-a'
+    assert tree.lca('genus-a1', 'genus-a2') == 'family-a'
+
+
+def test_lca_with_an_ancestor_or_itself(tree):
+    assert tree.lca('genus-a2', 'L3') == 'genus-a2'
+    assert tree.lca('L3', 'L3') == 'L3'
+
+
+def test_lca_across_families_is_none(tree):
+    assert tree.lca('L1', 'L4') is None
+    assert tree.lca('family-a', 'family-b') is None
+
+
+def test_subtree_queries(tree):
+    assert tree.ancestors('L3') == ['genus-a2', 'subfamily-x', 'family-a']
+    assert tree.is_ancestor('family-a', 'L3') and not tree.is_ancestor('family-b', 'L3')
+    assert sorted(tree.languages_under('family-a')) == ['L1', 'L2', 'L3']
+    assert tree.language_count('family-b') == 1
+
+
+def test_unknown_node_raises_key_error(tree):
+    with pytest.raises(KeyError):
+        tree.lca('L1', 'nowhere')
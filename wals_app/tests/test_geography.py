@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import geography
+from code_matrix import MISSING
+from geography import NeighbourGraph, haversine_km
+
+
+@pytest.fixture
+def grid(make_matrix):
+    """15 x 24 grid from pole to pole across the antimeridian, plus one language without coordinates"""
+    lat, lon = np.meshgrid(np.linspace(-84, 84, 15), np.arange(-172.5, 180, 15), indexing='ij')
+    latitude = list(lat.ravel()) + [None]
+    longitude = list(lon.ravel()) + [None]
+    return make_matrix(np.full((len(latitude), 1), MISSING), latitude=latitude, longitude=longitude)
+
+
+def _brute_force(matrix, k):
+    located = np.flatnonzero(~np.isnan(matrix.latitude))
+    lat, lon = matrix.latitude[located], matrix.longitude[located]
+    distances = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    np.fill_diagonal(distances, np.inf)
+    return located, np.sort(distances, axis=1)[:, :k]
+
+
+@pytest.mark.parametrize('block_rows', [geography.BLOCK_ROWS, 7])
+def test_knn_matches_brute_force(grid, monkeypatch, block_rows):
+    # Small blocks exercise the latitude bands and the full-pass fallback
+    monkeypatch.setattr(geography, 'BLOCK_ROWS', block_rows)
+    graph = NeighbourGraph.build(grid, k=6)
+    located, expected = _brute_force(grid, 6)
+    # Grid ties make neighbour order ambiguous, so compare the distances
+    np.testing.assert_allclose(graph.distances[located], expected, rtol=1e-5)
+    found = haversine_km(grid.latitude[located, None], grid.longitude[located, None],
+                         grid.latitude[graph.neighbours[located]], grid.longitude[graph.neighbours[located]])
+    np.testing.assert_allclose(found, expected, rtol=1e-5)
+
+
+def test_language_without_coordinates_has_no_neighbours(grid):
+    graph = NeighbourGraph.build(grid, k=4)
+    assert (graph.neighbours[-1] == -1).all() and np.isinf(graph.distances[-1]).all()
+    assert not (graph.neighbours[:-1] == len(grid.latitude) - 1).any()
+
+
+def test_within_matches_brute_force(grid):
+    graph = NeighbourGraph.build(grid, k=4)
+    row = 7 * 24  # on the equator: neighbours 1334 km (latitude) and 1668 km (longitude) away
+    for radius in (1500, 5000):  # inside and beyond the k-th neighbour
+        rows, distances = graph.within(row, radius)
+        expected = graph.distances_from(row)
+        expected[row] = np.nan
+        assert sorted(rows) == sorted(np.flatnonzero(expected <= radius))
+        assert len(rows) and (np.diff(distances) >= 0).all()
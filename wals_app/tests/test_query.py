@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import query
+from bitsets import BitsetIndex
+from code_matrix import MISSING
+
+
+@pytest.fixture
+def index(make_matrix):
+    """Six languages; L4 has no value for 1A and L5 none for 2A"""
+    codes = np.array([[1, 1], [1, 2], [2, 1], [2, 2], [MISSING, 1], [3, MISSING]])
+    matrix = make_matrix(codes,
+                         family=['Bantu', 'Bantu', 'Uralic', 'Uralic', 'Bantu', 'Tupian'],
+                         macroarea=['Africa', 'Africa', 'Eurasia', 'Eurasia', 'Africa', 'South America'])
+    return BitsetIndex(matrix)
+
+
+def _rows(text, index):
+    return list(index.members(query.run(text, index)))
+
+
+@pytest.mark.parametrize('text, message', [
+    ('', 'empty query'),
+    ('NOT', 'but got end of query'),
+    ('()', 'but got ")"'),
+    ('(81A:1', 'missing closing parenthesis'),
+    ('81A:1)', 'unexpected ")"'),
+    ('81A:1 OR', 'but got end of query'),
+    ('81A:', 'missing value after "81A:"'),
+    ('81A', 'expected field:value at "81A"'),
+])
+def test_parse_errors(text, message):
+    with pytest.raises(ValueError, match=message.replace('(', r'\(').replace(')', r'\)')):
+        query.parse(text)
+
+
+def test_nesting_limit():
+    depth = query.MAX_DEPTH
+    assert query.parse('(' * depth + '81A:1' + ')' * depth) == ('term', '81A', '1')
+    with pytest.raises(ValueError, match='nested deeper'):
+        query.parse('(' * (depth + 1) + '81A:1' + ')' * (depth + 1))
+    with pytest.raises(ValueError, match='nested deeper'):
+        query.parse('NOT ' * (depth + 1) + '81A:1')
+
+
+def test_precedence():
+    assert query.parse('1A:1 OR 1A:2 macroarea:Africa') == \
+        ('or', ('term', '1A', '1'), ('and', ('term', '1A', '2'), ('term', 'macroarea', 'Africa')))
+    assert query.parse('NOT 1A:1 AND 2A:1') == ('and', ('not', ('term', '1A', '1')), ('term', '2A', '1'))
+
+
+def test_terms(index):
+    assert _rows('1A:1', index) == [0, 1]
+    assert _rows('1A:1,3', index) == [0, 1, 5]
+    assert _rows('1A:*', index) == [0, 1, 2, 3, 5]
+    assert _rows('1A:9', index) == []
+    assert _rows('macroarea:"south america"', index) == [5]
+    assert _rows('FAMILY:uralic', index) == [2, 3]
+
+
+def test_not_and_or(index):
+    # NOT complements over all languages, including those without data
+    assert _rows('NOT 1A:1', index) == [2, 3, 4, 5]
+    assert _rows('NOT 1A:*', index) == [4]
+    assert _rows('1A:1 OR 1A:3', index) == [0, 1, 5]
+    assert _rows('1A:1 OR 1A:2 AND macroarea:Eurasia', index) == [0, 1, 2, 3]
+    assert _rows('(1A:1 OR 1A:2) AND macroarea:Africa', index) == [0, 1]
+    assert _rows('family:Bantu NOT 2A:1', index) == [1]
+    assert _rows('NOT (family:Bantu OR family:Uralic)', index) == [5]
+    assert _rows('NOT NOT 2A:2', index) == [1, 3]
+
+
+def test_evaluation_errors(index):
+    with pytest.raises(ValueError, match='unknown feature: 9Z'):
+        query.run('9Z:1', index)
+    with pytest.raises(ValueError, match='expected code numbers'):
+        query.run('1A:one', index)
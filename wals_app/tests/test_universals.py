@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import universals
+from bitsets import BitsetIndex
+from code_matrix import MISSING
+
+
+@pytest.fixture
+def matrix(make_matrix):
+    """40 languages in 8 genera of 5 with three features
+
+    1A=1 (L0-L19) always has 2A=1, while 2A=1 also occurs with 1A=2
+    (L30-L39); 3A has data for L0-L14 only, all of them with 1A=1.
+    """
+    codes = np.full((40, 3), MISSING)
+    codes[:, 0] = np.repeat([1, 2], 20)
+    codes[:, 1] = [1] * 20 + [2] * 10 + [1] * 10
+    codes[:15, 2] = [1] * 10 + [2] * 5
+    return make_matrix(codes, genus=[f'g{i // 5}' for i in range(40)])
+
+
+def _pairs(rules):
+    return [(tuple(r['antecedent']), tuple(r['consequent'])) for r in rules]
+
+
+def test_mine_finds_the_known_rule(matrix):
+    rules = universals.mine(matrix, BitsetIndex(matrix), workers=1)
+    assert _pairs(rules) == [(('1A', 1), ('2A', 1))]
+    rule = rules[0]
+    assert (rule['support'], rule['antecedent_count'], rule['exceptions']) == (20, 20, 0)
+    assert rule['confidence'] == 1.0
+    assert rule['baseline'] == pytest.approx(30 / 40)
+    assert rule['lift'] == pytest.approx(4 / 3)
+    assert (rule['genera'], rule['exception_genera']) == (4, 0)
+
+
+def test_thresholds(matrix):
+    index = BitsetIndex(matrix)
+    # 2A=2 -> 1A=2 holds in only two genera
+    rules = universals.mine(matrix, index, min_genera=2, workers=1)
+    assert _pairs(rules) == [(('1A', 1), ('2A', 1)), (('2A', 2), ('1A', 2))]
+    # 2A=1 -> 1A=1 is 20 of 30 languages
+    rules = universals.mine(matrix, index, min_confidence=0.6, workers=1)
+    assert (('2A', 1), ('1A', 1)) in _pairs(rules)
+    # 3A=1 -> 1A=1 (two genera) has confidence 1 but no lift: every language with 3A data has 1A=1
+    assert (('3A', 1), ('1A', 1)) in _pairs(universals.mine(matrix, index, min_lift=1.0, min_genera=2, workers=1))
+    assert (('3A', 1), ('1A', 1)) not in _pairs(universals.mine(matrix, index, min_genera=2, workers=1))
+
+
+def test_mine_does_not_depend_on_workers(matrix):
+    index = BitsetIndex(matrix)
+    assert universals.mine(matrix, index, min_genera=1, min_support=5, workers=1) == \
+        universals.mine(matrix, index, min_genera=1, min_support=5, workers=2)
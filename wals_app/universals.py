@@ -0,0 +1,151 @@
+"""
+Implicational universal miner for WALS data
+Scores every ordered pair of feature values (A=x -> B=y) with bitset
+intersections and popcounts, then counts genera for the tendencies found
+
+Usage:
+    python universals.py                         # mine (or load) and list the strongest
+    python universals.py --min-confidence 0.95   # stricter listing
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import cache
+import parallel
+from bitsets import popcount
+
+# Mining thresholds; the cached result can be filtered further, never loosened
+MIN_SUPPORT = 10
+MIN_CONFIDENCE = 0.8
+MIN_LIFT = 1.2
+MIN_GENERA = 3
+
+# Bump when the rule fields change so stale disk cache entries are ignored
+CACHE_NAME = 'universals-v1'
+
+
+def _genera(rows, genus_of):
+    """Distinct genera among CodeMatrix rows (unclassified languages count alone)"""
+    genera = genus_of[rows]
+    return len(np.unique(genera[genera >= 0])) + int(np.count_nonzero(genera < 0))
+
+
+def _mine_chunk(antecedents, index, frequent, codes, genus_of, min_support, min_confidence, min_lift,
+                min_genera):
+    """Rules for one chunk of positions in ``frequent`` as antecedents (see mine)"""
+    bits, data_bits = index.bits[frequent], index.data_bits
+    feature_of = index.feature_of[frequent]
+    overlap = np.empty_like(bits)
+    rules = []
+    for a in antecedents:
+        feature_a = feature_of[a]
+        ante_bits = bits[a]
+        # Languages with A=x and data for each feature, and with A=x and each value
+        ante = popcount(ante_bits & data_bits)[feature_of]
+        support = popcount(np.bitwise_and(ante_bits, bits, out=overlap))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence = support / ante
+        candidates = np.flatnonzero((support >= min_support) & (confidence >= min_confidence) &
+                                    (feature_of != feature_a))
+        if not len(candidates):
+            continue
+
+        # Baseline: share of B=y among all languages with data for both features
+        both_data = popcount(data_bits[feature_a] & data_bits[feature_of[candidates]])
+        baseline = popcount(data_bits[feature_a] & bits[candidates]) / both_data
+        lift = confidence[candidates] / baseline
+        candidates, baseline, lift = (x[lift >= min_lift] for x in (candidates, baseline, lift))
+
+        ante_rows = index.members(ante_bits)
+        for b, base, rule_lift in zip(candidates, baseline, lift):
+            feature_b, code_b = feature_of[b], index.keys[frequent[b]][1]
+            values = codes[ante_rows, feature_b]
+            agree = ante_rows[values == code_b]
+            genera = _genera(agree, genus_of)
+            if genera < min_genera:
+                continue
+            disagree = ante_rows[(values != code_b) & (values >= 0)]
+            rules.append({
+                'antecedent': list(index.keys[frequent[a]]),
+                'consequent': list(index.keys[frequent[b]]),
+                'support': int(support[b]),
+                'antecedent_count': int(ante[b]),
+                'confidence': float(confidence[b]),
+                'exceptions': int(ante[b] - support[b]),
+                'baseline': float(base),
+                'lift': float(rule_lift),
+                'genera': genera,
+                'exception_genera': _genera(disagree, genus_of),
+            })
+    return rules
+
+
+def mine(matrix, index, min_support=MIN_SUPPORT, min_confidence=MIN_CONFIDENCE, min_lift=MIN_LIFT,
+         min_genera=MIN_GENERA, workers=None):
+    """Implicational tendencies A=x -> B=y over a CodeMatrix and its BitsetIndex
+
+    For every ordered pair of values of two different features, counted
+    over the languages with data for both:
+
+    - ``support``: languages with A=x and B=y
+    - ``antecedent_count``: languages with A=x
+    - ``confidence``: support / antecedent_count
+    - ``exceptions``: languages with A=x and another value of B
+    - ``baseline``: share of B=y among all those languages; ``lift`` is
+      confidence / baseline, so near-universal consequents score ~1
+    - ``genera`` / ``exception_genera``: distinct genera among the
+      supporting languages / the exceptions
+
+    Each candidate pair costs one AND and one popcount over packed words,
+    and values held by fewer than ``min_support`` languages are skipped on
+    both sides; genera are counted only for the pairs that pass the
+    thresholds. Antecedents are split over ``workers`` processes. Rules are
+    sorted by confidence, then genera.
+    """
+    frequent = np.flatnonzero(popcount(index.bits) >= min_support)
+    rules = parallel.map_chunks(_mine_chunk, len(frequent),
+                                (index, frequent, matrix.codes, matrix.genus_of, min_support, min_confidence,
+                                 min_lift, min_genera),
+                                workers)
+    rules.sort(key=lambda r: (-r['confidence'], -r['genera'], -r['support']))
+    return rules
+
+
+def universals_table(matrix, index, version, workers=None):
+    """mine with the default thresholds, cached on disk per dataset version"""
+    return cache.cached_json(CACHE_NAME, version, lambda: mine(matrix, index, workers=workers))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cldf', help='CLDF directory (default: ../cldf)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--min-confidence', type=float, default=MIN_CONFIDENCE,
+                        help=f'list rules at least this confident (default {MIN_CONFIDENCE})')
+    parser.add_argument('--min-genera', type=int, default=MIN_GENERA,
+                        help=f'list rules supported by at least this many genera (default {MIN_GENERA})')
+    parser.add_argument('--top', type=int, default=20, help='rules to list (default 20)')
+    args = parser.parse_args(argv)
+
+    from data_loader import WALSDataLoader
+    loader = WALSDataLoader(cldf_path=args.cldf)
+    start = time.perf_counter()
+    rules = universals_table(loader.get_code_matrix(), loader.get_bitset_index(), loader.dataset_version,
+                             args.workers)
+    print(f'{len(rules)} rules over {len(loader.get_bitset_index())} feature values '
+          f'in {time.perf_counter() - start:.2f}s', file=sys.stderr)
+
+    listed = [r for r in rules if r['confidence'] >= args.min_confidence and r['genera'] >= args.min_genera]
+    print(f'{"rule":24s} {"conf":>6s} {"lift":>5s} {"supp":>5s} {"exc":>4s} {"genera":>6s}')
+    for rule in listed[:args.top]:
+        (fa, ca), (fb, cb) = rule['antecedent'], rule['consequent']
+        print(f'{f"{fa}={ca} -> {fb}={cb}":24s} {rule["confidence"]:6.1%} {rule["lift"]:5.2f} '
+              f'{rule["support"]:5d} {rule["exceptions"]:4d} {rule["genera"]:6d}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Denormalized value view for WALS CLDF data
+Joins every value with its language, parameter (chapter, area) and code once
+at load time, so per-language and per-feature lookups need no further joins
+"""
+from types import MappingProxyType
+
+
+def _float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(text):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return 0
+
+
+class ValueView:
+    """Read-only, pre-joined value rows indexed by language and by feature
+
+    Each row keeps the columns of values.csv (ID, Language_ID, Parameter_ID,
+    Code_ID, Value, Comment, ...) and adds:
+
+    - Language_Name, Family, Genus, Macroarea, Latitude, Longitude
+      (coordinates as floats, None when missing)
+    - Feature_Name, Chapter_ID, Area_ID, Area_Name
+    - Code_Name, Code_Number (int, 0 when missing), Code_Icon
+
+    Rows are shared between callers and must not be modified.
+    """
+
+    def __init__(self, languages, features, codes, values, chapters=(), areas=()):
+        chapter_areas = {c.get('ID'): c.get('Area_ID', '') or '' for c in chapters}
+        area_names = {a.get('ID'): a.get('Name', '') or '' for a in areas}
+
+        # The joined columns of each language, feature and code are built once
+        # and merged into every row that refers to them
+        language_fields = {l.get('ID'): {
+            'Language_Name': l.get('Name', '') or '',
+            'Family': l.get('Family', '') or '',
+            'Genus': l.get('Genus', '') or '',
+            'Macroarea': l.get('Macroarea', '') or '',
+            'Latitude': _float(l.get('Latitude')),
+            'Longitude': _float(l.get('Longitude')),
+        } for l in languages}
+        feature_fields = {}
+        for f in features:
+            chapter_id = f.get('Chapter_ID', '') or ''
+            area_id = chapter_areas.get(chapter_id, '')
+            feature_fields[f.get('ID')] = {
+                'Feature_Name': f.get('Name', '') or '',
+                'Chapter_ID': chapter_id,
+                'Area_ID': area_id,
+                'Area_Name': area_names.get(area_id, ''),
+            }
+        code_fields = {c.get('ID'): {
+            'Code_Name': c.get('Name', '') or '',
+            'Code_Number': _int(c.get('Number')),
+            'Code_Icon': c.get('icon', '') or '',
+        } for c in codes}
+        missing_language = dict.fromkeys(('Language_Name', 'Family', 'Genus', 'Macroarea'), '')
+        missing_language.update(Latitude=None, Longitude=None)
+        missing_feature = dict.fromkeys(('Feature_Name', 'Chapter_ID', 'Area_ID', 'Area_Name'), '')
+        missing_code = {'Code_Name': '', 'Code_Number': 0, 'Code_Icon': ''}
+
+        rows = []
+        by_language = {}
+        by_feature = {}
+        for value in values:
+            language_id = value.get('Language_ID')
+            feature_id = value.get('Parameter_ID')
+            row = MappingProxyType({
+                **value,
+                'Comment': value.get('Comment') or '',
+                **language_fields.get(language_id, missing_language),
+                **feature_fields.get(feature_id, missing_feature),
+                **code_fields.get(value.get('Code_ID'), missing_code),
+            })
+            rows.append(row)
+            by_language.setdefault(language_id, []).append(row)
+            by_feature.setdefault(feature_id, []).append(row)
+
+        self.rows = tuple(rows)
+        self.by_language = MappingProxyType({k: tuple(v) for k, v in by_language.items()})
+        self.by_feature = MappingProxyType({k: tuple(v) for k, v in by_feature.items()})
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def for_language(self, language_id):
+        """All value rows of a language (in values.csv order)"""
+        return self.by_language.get(language_id, ())
+
+    def for_feature(self, feature_id):
+        """All value rows of a feature (in values.csv order)"""
+        return self.by_feature.get(feature_id, ())